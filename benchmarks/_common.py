@@ -0,0 +1,153 @@
+# benchmarks/_common.py
+"""
+Shared helpers for the benchmark scripts in this folder.
+
+The benchmarks drive the ASGI app in-process (httpx.AsyncClient + ASGITransport),
+so no server and no Postgres are required:
+- By default a throwaway SQLite database is used.
+- Set DATABASE_URL to a real Postgres instance for realistic numbers.
+
+Run from the repository root, e.g.:
+    python benchmarks/bench_principal_cache.py --requests 2000 --concurrency 32
+"""
+
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+
+# Must happen before anything from src/ is imported (database.py reads it at import time)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+# The benchmarks measure the endpoints, not the admission limits (bench_admission.py
+# sets it explicitly); servers started from here inherit it
+os.environ.setdefault("ADMISSION_ENABLED", "0")
+sys.path.insert(0, SRC)
+
+import httpx  # noqa: E402
+
+
+def load_app():
+    """Import the FastAPI app and make sure the tables exist."""
+    from main import app
+    from database import Base, engine
+    import models  # noqa: F401  (registers the ORM models)
+
+    Base.metadata.create_all(bind=engine)
+    return app
+
+
+async def close_app() -> None:
+    """Dispose the DB engines (the lifespan is not run by ASGITransport)."""
+    from database import engine, async_engine
+
+    engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+# ----- real server (benchmarks that need TCP: several workers, WebSockets) -----
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int, extra_env: dict) -> subprocess.Popen:
+    """uvicorn main:app on 127.0.0.1:port, sharing this process' DATABASE_URL (tables must exist)."""
+    env = {**os.environ, "FAST_STARTUP": "1", **extra_env}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=SRC, env=env, stdout=subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/livez")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def make_client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://bench")
+
+
+async def create_user(client: httpx.AsyncClient, username: str, password: str = "bench-pass", admin: bool = False):
+    from core.config import ADMIN_SECRET
+
+    body = {"username": username, "password": password}
+    if admin:
+        body["admin_secret"] = ADMIN_SECRET
+    r = await client.post("/users", json=body)
+    if r.status_code not in (201, 400):  # 400 = already exists (re-used DB)
+        raise RuntimeError(f"could not create {username}: {r.status_code} {r.text}")
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str = "bench-pass") -> dict:
+    """Return the Authorization header for `username`."""
+    r = await client.post("/login", data={"username": username, "password": password})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def measure(
+    name: str,
+    send: Callable[[int], Awaitable[httpx.Response]],
+    total: int,
+    concurrency: int,
+) -> dict:
+    """
+    Call send(i) `total` times with at most `concurrency` requests in flight.
+    Returns throughput and latency percentiles (milliseconds).
+    """
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            t0 = time.perf_counter()
+            r = await send(i)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if r.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "name": name,
+        "requests": total,
+        "errors": errors,
+        "rps": total / elapsed if elapsed else 0.0,
+        "p50": q[49],
+        "p95": q[94],
+        "p99": q[98],
+    }
+
+
+def print_results(results: list[dict]) -> None:
+    print(f"{'scenario':<32} {'req':>7} {'err':>5} {'req/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for r in results:
+        print(
+            f"{r['name']:<32} {r['requests']:>7} {r['errors']:>5} {r['rps']:>10.1f} "
+            f"{r['p50']:>8.2f} {r['p95']:>8.2f} {r['p99']:>8.2f}"
+        )
@@ -0,0 +1,118 @@
+# benchmarks/bench_admission.py
+"""
+Latency of cheap requests while expensive ones flood the server, with and
+without admission control (core.admission).
+
+--flood clients keep requesting GET /users (--users users: bulk class) or
+POST /login (bcrypt: auth class) for --seconds, while --probe-concurrency
+clients measure GET /me (read class). Without admission control the flood
+takes all threadpool threads / DB connections and /me waits behind it; with
+it the flood is limited to ADMISSION_BULK_LIMIT / ADMISSION_AUTH_LIMIT
+concurrent requests and the rest is answered 503 at once.
+
+The settings are read at import time, so each mode runs in its own
+subprocess. The token-bucket rate limits are off in both runs: all clients
+are one user from one address here, which would measure the 429s instead.
+
+The flood clients run in the same process (and on the same CPUs) as the app:
+without --backoff they retry a 503 immediately, so the rejections themselves
+keep the event loop busy. With --backoff they wait Retry-After seconds, as
+well-behaved clients do.
+
+    python benchmarks/bench_admission.py --flood-path /users --flood 200
+    python benchmarks/bench_admission.py --flood-path /login --flood 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+async def run_mode(args) -> dict:
+    from _common import load_app, close_app, make_client, create_user, login
+    from core.security import _hash_password
+
+    app = load_app()
+    async with make_client(app) as client:
+        await create_user(client, "bench-admin", admin=True)
+        headers = await login(client, "bench-admin")
+        if args.flood_path == "/users":
+            password_hash = _hash_password("bench-pass")
+            rows = "\n".join(json.dumps({"username": f"adm-{i}", "password_hash": password_hash})
+                             for i in range(args.users))
+            r = await client.post("/users/import", content=rows.encode(), timeout=None,
+                                  headers={**headers, "Content-Type": "application/x-ndjson"})
+            r.raise_for_status()
+            flood = lambda: client.get("/users", headers=headers)
+        else:
+            flood = lambda: client.post("/login", data={"username": "bench-admin", "password": "bench-pass"})
+
+        deadline = time.perf_counter() + args.seconds
+        flood_codes: dict[int, int] = {}
+        probe: list[float] = []
+        probe_errors = 0
+
+        async def flooder():
+            while time.perf_counter() < deadline:
+                r = await flood()
+                flood_codes[r.status_code] = flood_codes.get(r.status_code, 0) + 1
+                if args.backoff and "retry-after" in r.headers:
+                    await asyncio.sleep(min(float(r.headers["retry-after"]), deadline - time.perf_counter()))
+                else:
+                    await asyncio.sleep(0)  # a rejection returns without awaiting anything
+
+        async def prober():
+            nonlocal probe_errors
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                r = await client.get("/me", headers=headers)
+                probe.append((time.perf_counter() - t0) * 1000)
+                if r.status_code >= 400:
+                    probe_errors += 1
+
+        await asyncio.gather(*(flooder() for _ in range(args.flood)),
+                             *(prober() for _ in range(args.probe_concurrency)))
+    await close_app()
+
+    q = statistics.quantiles(probe, n=100)
+    return {
+        "probe_requests": len(probe), "probe_errors": probe_errors, "p50": q[49], "p99": q[98],
+        "flood_ok": sum(n for code, n in flood_codes.items() if code < 400),
+        "flood_503": flood_codes.get(503, 0),
+    }
+
+
+def main(args) -> None:
+    print(f"{args.flood} x {args.flood_path} flood + {args.probe_concurrency} x GET /me, {args.seconds}s"
+          f"{', flood backs off on Retry-After' if args.backoff else ''}")
+    print(f"{'admission':<10} {'/me req':>8} {'err':>5} {'p50 ms':>8} {'p99 ms':>9} {'flood ok':>9} {'flood 503':>10}")
+    for enabled in ("0", "1"):
+        env = dict(os.environ, ADMISSION_ENABLED=enabled, ADMISSION_USER_RATE="0", ADMISSION_LOGIN_IP_RATE="0")
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", *sys.argv[1:]],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{'on' if enabled == '1' else 'off':<10} {r['probe_requests']:>8} {r['probe_errors']:>5} "
+              f"{r['p50']:>8.2f} {r['p99']:>9.2f} {r['flood_ok']:>9} {r['flood_503']:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flood-path", choices=["/users", "/login"], default="/users")
+    parser.add_argument("--flood", type=int, default=200)
+    parser.add_argument("--probe-concurrency", type=int, default=4)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--backoff", action="store_true", help="flood clients wait Retry-After after a 503")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(run_mode(args))))
+    else:
+        main(args)
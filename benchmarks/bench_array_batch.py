@@ -0,0 +1,84 @@
+# benchmarks/bench_array_batch.py
+"""
+10k single array writes vs the same writes in one POST /array/batch.
+
+Single writes are sent one after the other (each one is a full request: JWT
+decode, principal lookup, admin check, one storage write). Two workloads:
+- append: POST /array             vs one batch of "append" ops
+- set:    PUT /array/{i}          vs one batch of "set" ops
+Note that POST /array returns the whole array, so single appends also pay
+for serializing a growing response.
+
+    python benchmarks/bench_array_batch.py --ops 10000 --storage database
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# ARRAY_STORAGE is read when the app is imported
+if "--storage" in sys.argv:
+    os.environ["ARRAY_STORAGE"] = sys.argv[sys.argv.index("--storage") + 1]
+
+from _common import load_app, close_app, make_client, create_user, login  # noqa: E402
+
+
+async def timed(coro) -> float:
+    started = time.perf_counter()
+    await coro
+    return time.perf_counter() - started
+
+
+async def main(args) -> None:
+    app = load_app()
+    rows = []
+    async with make_client(app) as client:
+        await create_user(client, "bench-admin", admin=True)
+        headers = await login(client, "bench-admin")
+
+        async def reset():
+            # Empty the array in one batch, so every workload starts alike
+            length = len((await client.get("/array", headers=headers)).json()["array"])
+            if length:
+                r = await client.post("/array/batch", headers=headers, json={"ops": [{"op": "pop"}] * length})
+                r.raise_for_status()
+
+        async def single_appends():
+            for i in range(args.ops):
+                (await client.post("/array", headers=headers, json={"value": i})).raise_for_status()
+
+        async def batch_appends():
+            ops = [{"op": "append", "value": i} for i in range(args.ops)]
+            (await client.post("/array/batch", headers=headers, json={"ops": ops})).raise_for_status()
+
+        async def single_sets():
+            for i in range(args.ops):
+                (await client.put(f"/array/{i}", headers=headers, json={"value": -i})).raise_for_status()
+
+        async def batch_sets():
+            ops = [{"op": "set", "index": i, "value": -i} for i in range(args.ops)]
+            (await client.post("/array/batch", headers=headers, json={"ops": ops})).raise_for_status()
+
+        await reset()
+        rows.append(("append", "single requests", await timed(single_appends())))
+        await reset()
+        rows.append(("append", "one batch", await timed(batch_appends())))
+        rows.append(("set", "single requests", await timed(single_sets())))
+        rows.append(("set", "one batch", await timed(batch_sets())))
+    await close_app()
+
+    from core.config import ARRAY_STORAGE
+
+    print(f"{args.ops} operations, ARRAY_STORAGE={ARRAY_STORAGE}")
+    print(f"{'workload':<10} {'mode':<18} {'seconds':>9} {'ops/s':>12}")
+    for workload, mode, seconds in rows:
+        print(f"{workload:<10} {mode:<18} {seconds:>9.2f} {args.ops / seconds:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=10000)
+    parser.add_argument("--storage", choices=("memory", "database"), default="memory")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,106 @@
+# benchmarks/bench_array_reads.py
+"""
+GET /array read throughput with several uvicorn worker processes sharing one
+array (ARRAY_STORAGE=database).
+
+Unlike the other benchmarks this one starts a real server (uvicorn --workers N)
+and talks to it over TCP, since the point is that every worker serves the same
+array. Scenarios:
+- no-cache:   every read loads the whole array from the DB (ARRAY_CACHE_ENABLED=0)
+- cache:      versioned cache, version checked on every read (the default)
+- cache-0.5s: version checked at most every 0.5s (ARRAY_CACHE_MAX_STALENESS_SECONDS)
+
+After each run one value is appended and the array is read again a few times,
+to show how many responses (served by any worker) already include the write.
+
+    python benchmarks/bench_array_reads.py --workers 4 --size 10000
+"""
+
+import argparse
+import asyncio
+
+from _common import (
+    load_app, close_app, make_client, create_user, measure, print_results,
+    free_port, start_server, wait_ready,
+)
+
+import httpx
+
+SCENARIOS = (
+    ("no-cache", {"ARRAY_CACHE_ENABLED": "0"}),
+    ("cache", {"ARRAY_CACHE_ENABLED": "1", "ARRAY_CACHE_MAX_STALENESS_SECONDS": "0"}),
+    ("cache-0.5s", {"ARRAY_CACHE_ENABLED": "1", "ARRAY_CACHE_MAX_STALENESS_SECONDS": "0.5"}),
+)
+
+
+async def prepare(size: int) -> None:
+    """Schema, an admin user and an array of `size` numbers."""
+    app = load_app()
+    async with make_client(app) as client:
+        await create_user(client, "bench-admin", admin=True)
+    await close_app()
+
+    from sqlalchemy import delete, insert
+    from database import engine
+    from models import ArrayItemDB, ArrayMetaDB
+
+    with engine.begin() as conn:
+        conn.execute(delete(ArrayItemDB))
+        conn.execute(delete(ArrayMetaDB))
+        conn.execute(insert(ArrayMetaDB).values(id=1, version=1, length=size))
+        conn.execute(insert(ArrayItemDB), [{"position": i, "value": i * 0.5} for i in range(size)])
+    engine.dispose()
+
+
+async def run_scenario(name: str, extra_env: dict, args) -> tuple[dict, str]:
+    port = free_port()
+    server = start_server(args.workers, port, {"ARRAY_STORAGE": "database", **extra_env})
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await wait_ready(client)
+            r = await client.post("/login", data={"username": "bench-admin", "password": "bench-pass"})
+            r.raise_for_status()
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+            # Warm every worker's cache before measuring
+            for _ in range(args.workers * 4):
+                await client.get("/array", headers=headers)
+
+            result = await measure(
+                f"{name} ({args.workers} workers)",
+                lambda i: client.get("/array", headers=headers),
+                args.requests, args.concurrency,
+            )
+
+            # Cross-worker visibility of a write
+            posted = await client.post("/array", headers=headers, json={"value": -1})
+            expected = len(posted.json()["array"])
+            reads = await asyncio.gather(*(client.get("/array", headers=headers) for _ in range(20)))
+            fresh = sum(len(r.json()["array"]) == expected for r in reads)
+            (await client.delete("/array", headers=headers)).raise_for_status()
+            return result, f"{name}: {fresh}/20 reads right after a write saw it"
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def main(args) -> None:
+    await prepare(args.size)
+    results, notes = [], []
+    for name, extra_env in SCENARIOS:
+        result, note = await run_scenario(name, extra_env, args)
+        results.append(result)
+        notes.append(note)
+    print(f"GET /array, {args.size} elements, {args.concurrency} concurrent clients")
+    print_results(results)
+    print("\n".join(notes))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    asyncio.run(main(parser.parse_args()))
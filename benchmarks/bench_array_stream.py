@@ -0,0 +1,118 @@
+# benchmarks/bench_array_stream.py
+"""
+Fan-out of the /array/stream change feed to many WebSocket subscribers.
+
+Starts a real server (uvicorn, one worker), connects --subscribers clients
+to WS /array/stream, then makes --writes single writes (PUT /array/{i}) one
+after the other. For each write it measures how long it took until every
+subscriber had received the change event ("all"), and the median delivery
+time ("p50 subscriber").
+
+The egress line compares what the subscribers received with what the same
+clients would have downloaded by polling GET /array once per write.
+
+    python benchmarks/bench_array_stream.py --subscribers 1000 --writes 50 --size 10000
+"""
+
+import argparse
+import asyncio
+import resource
+import statistics
+import time
+
+from _common import (
+    load_app, close_app, make_client, create_user, login,
+    free_port, start_server, wait_ready,
+)
+
+import httpx
+import websockets
+
+
+async def subscriber(url: str, arrivals: dict, received: list, ready: asyncio.Event, counter: list, total: int):
+    async with websockets.connect(url, max_size=None) as ws:
+        received[0] += len(await ws.recv())  # snapshot
+        counter[0] += 1
+        if counter[0] == total:
+            ready.set()
+        async for message in ws:
+            now = time.perf_counter()
+            received[1] += len(message)
+            # '{"type":"change","id":"<epoch>.<version>",...': read the version cheaply
+            version = int(message.split('"version":', 1)[1].split(",", 1)[0])
+            arrivals.setdefault(version, []).append(now)
+
+
+async def main(args) -> None:
+    # 1 socket per subscriber here and in the server
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    app = load_app()
+    async with make_client(app) as client:
+        await create_user(client, "bench-admin", admin=True)
+    await close_app()
+
+    port = free_port()
+    server = start_server(1, port, {"ARRAY_STORAGE": "memory", "ARRAY_FEED_MAX_SUBSCRIBERS": str(args.subscribers)})
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            await wait_ready(client)
+            headers = await login(client, "bench-admin")
+            token = headers["Authorization"].split()[1]
+
+            # Array of --size numbers
+            ops = [{"op": "append", "value": i * 0.5} for i in range(args.size)]
+            (await client.post("/array/batch", headers=headers, json={"ops": ops})).raise_for_status()
+            full_size = len((await client.get("/array", headers=headers)).content)
+
+            arrivals: dict[int, list[float]] = {}
+            received = [0, 0]  # snapshot bytes, change bytes
+            ready, counter = asyncio.Event(), [0]
+            url = f"ws://127.0.0.1:{port}/array/stream?access_token={token}"
+            started = time.perf_counter()
+            tasks = [
+                asyncio.create_task(subscriber(url, arrivals, received, ready, counter, args.subscribers))
+                for _ in range(args.subscribers)
+            ]
+            await asyncio.wait_for(ready.wait(), 300)
+            connect_time = time.perf_counter() - started
+
+            fan_out, median = [], []
+            for i in range(args.writes):
+                t0 = time.perf_counter()
+                r = await client.put(f"/array/{i}", headers=headers, json={"value": -i})
+                r.raise_for_status()
+                version = int(r.headers["ETag"].strip('"').rsplit(".", 1)[1])
+                while len(arrivals.get(version, ())) < args.subscribers:
+                    await asyncio.sleep(0.001)
+                times = sorted(t - t0 for t in arrivals[version])
+                fan_out.append(times[-1] * 1000)
+                median.append(times[len(times) // 2] * 1000)
+
+            stats = (await client.get("/metrics/array-feed", headers=headers)).json()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        server.terminate()
+        server.wait()
+
+    q = lambda values, p: statistics.quantiles(values, n=100)[p - 1] if len(values) > 1 else values[0]
+    print(f"{args.subscribers} subscribers, array of {args.size} elements ({full_size} bytes), {args.writes} writes")
+    print(f"connect + snapshot:  {connect_time:.2f}s for all subscribers")
+    print(f"{'per write':<20} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for name, values in (("all subscribers", fan_out), ("p50 subscriber", median)):
+        print(f"{name:<20} {q(values, 50):>8.2f} {q(values, 95):>8.2f} {max(values):>8.2f}")
+    polled = full_size * args.subscribers * args.writes
+    print(f"egress for the writes: {received[1]} bytes streamed vs {polled} bytes polling GET /array "
+          f"({polled / max(received[1], 1):.0f}x)")
+    print(f"feed: {stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--writes", type=int, default=50)
+    parser.add_argument("--size", type=int, default=10000)
+    asyncio.run(main(parser.parse_args()))
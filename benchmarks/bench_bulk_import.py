@@ -0,0 +1,81 @@
+# benchmarks/bench_bulk_import.py
+"""
+Bulk user import (POST /users/import) vs one POST /users per user.
+
+Rows carry a pre-computed bcrypt hash by default, so the run measures the
+parse / insert path; use --plain to include N rows with plain passwords that
+the server hashes in parallel (bcrypt costs ~250ms per password and core).
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from _common import load_app, close_app, make_client, create_user, login, measure, print_results
+
+
+async def main(users: int, plain: int, singles: int, chunk_rows: int):
+    app = load_app()
+    from core.security import _hash_password
+
+    password_hash = _hash_password("bench-pass")
+    run_id = int(time.time())
+
+    async def body():
+        # Stream the NDJSON in chunks, like a client uploading a large file
+        lines = []
+        for i in range(users):
+            row = {"username": f"imp-{run_id}-{i}"}
+            if i < plain:
+                row["password"] = "bench-pass"
+            else:
+                row["password_hash"] = password_hash
+            lines.append(json.dumps(row))
+            if len(lines) == chunk_rows:
+                yield ("\n".join(lines) + "\n").encode()
+                lines = []
+        if lines:
+            yield "\n".join(lines).encode()
+
+    async with make_client(app) as client:
+        await create_user(client, "bench-admin", admin=True)
+        headers = await login(client, "bench-admin")
+
+        started = time.perf_counter()
+        r = await client.post(
+            "/users/import",
+            content=body(),
+            headers={**headers, "Content-Type": "application/x-ndjson"},
+            timeout=None,
+        )
+        elapsed = time.perf_counter() - started
+        report = r.json()
+        print(
+            f"bulk import: {users} rows ({plain} plain) in {elapsed:.2f}s "
+            f"= {users / elapsed:.0f} users/s; created={report['created']} "
+            f"existing={report['existing']} invalid={report['invalid']} "
+            f"response={len(r.content) / 1e6:.1f} MB"
+        )
+
+        if singles:
+            result = await measure(
+                "POST /users (one per user)",
+                lambda i: client.post("/users", json={"username": f"single-{run_id}-{i}", "password": "bench-pass"}),
+                singles,
+                8,
+            )
+            print_results([result])
+            print(f"single-request rate: {result['rps']:.1f} users/s")
+
+    await close_app()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--plain", type=int, default=0, help="rows with plain passwords (hashed by the server)")
+    parser.add_argument("--singles", type=int, default=20, help="users created one by one for comparison")
+    parser.add_argument("--chunk-rows", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.plain, args.singles, args.chunk_rows))
@@ -0,0 +1,93 @@
+# benchmarks/bench_cold_start.py
+"""
+Time-to-first-request of a fresh process, default startup vs FAST_STARTUP=1.
+
+Each run starts a new interpreter that imports the app, runs the lifespan
+startup and then serves its first requests (POST /login, then GET /me) - what
+a new Cloud Run instance does during scale-out. The schema and the user are
+created once up front, since FAST_STARTUP skips DDL.
+"""
+
+import time
+
+_process_started = time.perf_counter()
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import statistics  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import tempfile  # noqa: E402
+
+
+async def child() -> dict:
+    from _common import make_client  # sets sys.path, does not import the app
+
+    t0 = time.perf_counter()
+    from main import app
+    imported = time.perf_counter()
+
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        async with make_client(app) as client:
+            r = await client.post("/login", data={"username": "bench-user", "password": "bench-pass"})
+            r.raise_for_status()
+            first_login = time.perf_counter()
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+            (await client.get("/me", headers=headers)).raise_for_status()
+            first_me = time.perf_counter()
+
+    return {
+        "interpreter_ms": (t0 - _process_started) * 1000,
+        "import_ms": (imported - t0) * 1000,
+        "lifespan_ms": (started - imported) * 1000,
+        "first_login_ms": (first_login - started) * 1000,
+        "first_me_ms": (first_me - first_login) * 1000,
+        "ready_to_first_response_ms": (first_login - _process_started) * 1000,
+    }
+
+
+async def prepare():
+    from _common import load_app, close_app, make_client, create_user
+
+    app = load_app()
+    async with make_client(app) as client:
+        await create_user(client, "bench-user")
+    await close_app()
+
+
+def main(runs: int):
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    subprocess.run([sys.executable, __file__, "--prepare"], env=env, check=True, capture_output=True)
+
+    print(f"{'mode':<14} {'process start->first login response (median of %d)' % runs}")
+    for mode, extra in (("default", {"FAST_STARTUP": "0"}), ("fast", {"FAST_STARTUP": "1"})):
+        samples = []
+        for _ in range(runs):
+            wall0 = time.perf_counter()
+            out = subprocess.run(
+                [sys.executable, __file__, "--child"], env={**env, **extra},
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            result["wall_ms"] = (time.perf_counter() - wall0) * 1000
+            samples.append(result)
+        summary = {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+        print(f"{mode:<14} " + "  ".join(f"{k}={v:.0f}" for k, v in summary.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--prepare", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(child())))
+    elif args.prepare:
+        asyncio.run(prepare())
+    else:
+        main(args.runs)
@@ -0,0 +1,59 @@
+# benchmarks/bench_db_modes.py
+"""
+Sync (threadpool) vs async (AsyncSession) database mode at high concurrency.
+
+The DB mode is fixed at import time (DB_ASYNC), so each mode runs in its own
+subprocess. The principal cache is disabled so that every GET /me really
+performs the user lookup against the database.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+
+async def run_mode(total: int, concurrency: int) -> list[dict]:
+    from _common import load_app, close_app, make_client, create_user, login, measure
+
+    app = load_app()
+    async with make_client(app) as client:
+        await create_user(client, "bench-user")
+        headers = await login(client, "bench-user")
+        mode = "async" if os.environ.get("DB_ASYNC") == "1" else "sync"
+        results = [
+            await measure(f"GET /me [{mode}] c={concurrency}",
+                          lambda i: client.get("/me", headers=headers), total, concurrency),
+            await measure(f"GET /array [{mode}] c={concurrency}",
+                          lambda i: client.get("/array", headers=headers), total, concurrency),
+        ]
+    await close_app()
+    return results
+
+
+def main(total: int, concurrency: int):
+    from _common import print_results
+
+    results = []
+    for db_async in ("0", "1"):
+        env = dict(os.environ, DB_ASYNC=db_async, PRINCIPAL_CACHE_ENABLED="0")
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", "--requests", str(total), "--concurrency", str(concurrency)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        results += json.loads(out.strip().splitlines()[-1])
+    print_results(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(run_mode(args.requests, args.concurrency))))
+    else:
+        main(args.requests, args.concurrency)
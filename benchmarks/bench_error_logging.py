@@ -0,0 +1,141 @@
+# benchmarks/bench_error_logging.py
+"""
+Latency cost of logging during an error storm.
+
+Drives the app in-process: one task fires GET /bench-error (a route that
+raises) at --error-rate per second, while --concurrency clients keep calling
+GET /livez and their latency is measured. Modes:
+- none:   no errors (baseline)
+- print:  the previous 500 handler - print() on the event loop, plus the
+          traceback the server used to write to the console synchronously
+- queue:  the app's handler - JSON record with traceback through the
+          QueueHandler; formatting and writing on the listener thread
+
+stdout goes to a pipe drained by a child process at --drain-kbps KB/s
+(0 = as fast as it can read), i.e. a log collector that may fall behind.
+
+    python benchmarks/bench_error_logging.py --error-rate 500 --seconds 5 --drain-kbps 512
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+import traceback
+
+from _common import load_app, make_client
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from core import app_logging
+
+# Child process: read stdin at a limited rate (a slow log collector)
+DRAIN = """
+import sys, time
+rate = {kbps} * 1024
+chunk = 4096
+while True:
+    data = sys.stdin.buffer.read1(chunk)
+    if not data:
+        break
+    if rate:
+        time.sleep(len(data) / rate)
+"""
+
+
+async def old_exception_handler(request: Request, exc: Exception):
+    # main.py before the logging change (+ the server's traceback on the console)
+    print(f"CRITICAL UNEXPECTED ERROR: {exc}")
+    traceback.print_exception(exc, file=sys.stdout)
+    return JSONResponse(status_code=500, content={"success": False, "detail": "An unexpected error occurred."})
+
+
+def use_exception_handler(app, handler) -> None:
+    app.exception_handlers[Exception] = handler
+    app.middleware_stack = None  # rebuilt with the handler on the next request
+
+
+async def run(client, args, error_rate: int) -> tuple[list[float], int]:
+    latencies: list[float] = []
+    errors_sent = 0
+    deadline = time.perf_counter() + args.seconds
+
+    async def probe():
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            (await client.get("/livez")).raise_for_status()
+            latencies.append((time.perf_counter() - t0) * 1000)
+            await asyncio.sleep(0)  # in-process requests may not yield on their own
+
+    async def storm():
+        nonlocal errors_sent
+        interval, pending = 1 / error_rate, set()
+        next_at = time.perf_counter()
+        while next_at < deadline:
+            pending.add(asyncio.create_task(client.get("/bench-error")))
+            errors_sent += 1
+            next_at += interval
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        await asyncio.gather(*pending)
+
+    tasks = [probe() for _ in range(args.concurrency)]
+    if error_rate:
+        tasks.append(storm())
+    await asyncio.gather(*tasks)
+    return latencies, errors_sent
+
+
+async def main(args) -> None:
+    app = load_app()
+
+    async def bench_error():
+        raise RuntimeError("bench error")
+
+    app.add_api_route("/bench-error", bench_error)
+    new_handler = app.exception_handlers[Exception]
+
+    # stdout -> pipe -> drain process (the app's listener thread writes there too)
+    drain = subprocess.Popen([sys.executable, "-c", DRAIN.format(kbps=args.drain_kbps)], stdin=subprocess.PIPE)
+    console = os.dup(1)
+    os.dup2(drain.stdin.fileno(), 1)
+    report = os.fdopen(console, "w", buffering=1)
+
+    results = []
+    try:
+        async with make_client(app) as client:
+            for mode in args.modes:
+                use_exception_handler(app, old_exception_handler if mode == "print" else new_handler)
+                dropped_before = app_logging.stats()["dropped"]
+                latencies, errors = await run(client, args, 0 if mode == "none" else args.error_rate)
+                sys.stdout.flush()
+                q = statistics.quantiles(latencies, n=100)
+                dropped = app_logging.stats()["dropped"] - dropped_before
+                results.append((mode, errors / args.seconds, len(latencies) / args.seconds,
+                                q[49], q[98], max(latencies), dropped))
+    finally:
+        sys.stdout.flush()
+        os.dup2(console, 1)
+        drain.stdin.close()
+        drain.wait()
+
+    report.write(f"error storm: {args.error_rate}/s, {args.concurrency} probes, stdout drained at "
+                 f"{args.drain_kbps or 'unlimited'} KB/s, {args.seconds}s per mode\n")
+    report.write(f"{'mode':<8} {'errors/s':>9} {'probe/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+                 f"{'dropped':>8}\n")
+    for mode, error_rate, probe_rate, p50, p99, worst, dropped in results:
+        report.write(f"{mode:<8} {error_rate:>9.0f} {probe_rate:>9.0f} {p50:>8.2f} {p99:>8.2f} {worst:>8.2f} "
+                     f"{dropped:>8}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--error-rate", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--drain-kbps", type=int, default=0)
+    parser.add_argument("--modes", nargs="+", default=["none", "print", "queue"], choices=["none", "print", "queue"])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,63 @@
+# benchmarks/bench_login_storm.py
+"""
+GET /me latency during a login storm, with bcrypt inline vs on the hashing pool.
+
+"inline" reproduces the old behaviour (bcrypt runs in FastAPI's shared
+threadpool). "pool" uses core.hashing_pool with the configured limits; excess
+logins are rejected with 503 instead of stalling other endpoints.
+"""
+
+import argparse
+import asyncio
+
+from _common import load_app, make_client, create_user, login, measure, print_results
+
+
+async def main(logins: int, storm_concurrency: int, me_requests: int):
+    app = load_app()
+    from core import hashing_pool
+    from core.config import (
+        PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE, PASSWORD_HASH_EXECUTOR,
+    )
+
+    async with make_client(app) as client:
+        await create_user(client, "bench-user")
+        headers = await login(client, "bench-user")
+        form = {"username": "bench-user", "password": "bench-pass"}
+
+        results = []
+        modes = {
+            "inline": hashing_pool.BoundedExecutor(0, 0),
+            "pool": hashing_pool.BoundedExecutor(
+                PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE, PASSWORD_HASH_EXECUTOR
+            ),
+        }
+        for mode, pool in modes.items():
+            hashing_pool.password_pool = pool
+            storm = asyncio.create_task(measure(
+                f"POST /login storm [{mode}]",
+                lambda i: client.post("/login", data=form),
+                logins,
+                storm_concurrency,
+            ))
+            await asyncio.sleep(0.05)  # let the storm fill the threadpool first
+            me = await measure(
+                f"GET /me during storm [{mode}]",
+                lambda i: client.get("/me", headers=headers),
+                me_requests,
+                4,
+            )
+            results += [await storm, me]
+            print(f"[{mode}] logins rejected with 503: {pool.rejected}")
+            pool.shutdown()
+
+        print_results(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--storm-concurrency", type=int, default=100)
+    parser.add_argument("--me-requests", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.storm_concurrency, args.me_requests))
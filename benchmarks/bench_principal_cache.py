@@ -0,0 +1,43 @@
+# benchmarks/bench_principal_cache.py
+"""
+Authenticated-request throughput with the principal cache ON vs OFF.
+
+Every request hits GET /me, which only needs get_current_user, so the
+difference between the two runs is the per-request user lookup.
+"""
+
+import argparse
+import asyncio
+
+from _common import load_app, make_client, create_user, login, measure, print_results
+
+
+async def main(total: int, concurrency: int):
+    app = load_app()
+    from core.principal_cache import principal_cache
+
+    async with make_client(app) as client:
+        await create_user(client, "bench-user")
+        headers = await login(client, "bench-user")
+
+        results = []
+        for enabled in (False, True):
+            principal_cache.enabled = enabled
+            principal_cache.clear()
+            results.append(await measure(
+                f"GET /me cache={'on' if enabled else 'off'}",
+                lambda i: client.get("/me", headers=headers),
+                total,
+                concurrency,
+            ))
+
+        print_results(results)
+        print("cache stats:", principal_cache.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,71 @@
+# benchmarks/bench_response_formats.py
+"""
+Bytes on the wire and server CPU per response format / compression.
+
+Encodes the bodies of GET /array (1M elements) and GET /users (100k users)
+with the same functions the endpoints use (services.array_service.encode_items,
+services.user_service.encode_users) in every format:
+- json / msgpack / arrow (Accept)
+- identity / gzip / br (Accept-Encoding)
+CPU is process time for one encode + compress, median of --repeat runs
+(the DB query and the socket write are not included).
+
+    python benchmarks/bench_response_formats.py --size 1000000 --users 100000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from _common import SRC  # noqa: F401  (puts src/ on sys.path)
+
+from core.encoding import JSON, MSGPACK, ARROW
+from schemas.user_schema import UserOut
+from services import array_service, user_service
+
+FORMATS = (("json", JSON), ("msgpack", MSGPACK), ("arrow", ARROW))
+ENCODINGS = (("identity", None), ("gzip", "gzip"), ("br", "br"))
+
+
+def run(encode, repeat: int) -> tuple[int, float]:
+    """(body size, median CPU ms) of encode() -> (body, content_encoding)."""
+    times = []
+    for _ in range(repeat):
+        started = time.process_time()
+        body, _ = encode()
+        times.append((time.process_time() - started) * 1000)
+    return len(body), statistics.median(times)
+
+
+def main(args) -> None:
+    rng = random.Random(42)
+    payloads = {
+        "array, floats": [rng.random() * 1000 for _ in range(args.size)],
+        "array, mixed": [
+            rng.randrange(10**6) if i % 3 == 0 else f"item-{i}" if i % 3 == 1 else rng.random()
+            for i in range(args.size)
+        ],
+    }
+    users = [UserOut(username=f"user-{i:07d}", is_admin=i % 10 == 0) for i in range(args.users)]
+
+    print(f"{'payload':<16} {'format':<8} {'encoding':<9} {'bytes':>12} {'vs json':>8} {'cpu ms':>9}")
+    cases = [(name, lambda items=items, m=None, e=None: array_service.encode_items(items, m, e))
+             for name, items in payloads.items()]
+    cases.append((f"users ({args.users})", lambda m=None, e=None: user_service.encode_users(users, m, e)))
+    for name, encode in cases:
+        baseline = None
+        for format_name, media_type in FORMATS:
+            for encoding_name, encoding in ENCODINGS:
+                size, cpu = run(lambda: encode(m=media_type, e=encoding), args.repeat)
+                baseline = baseline or size
+                print(f"{name:<16} {format_name:<8} {encoding_name:<9} {size:>12} "
+                      f"{size / baseline:>7.2f}x {cpu:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,104 @@
+# benchmarks/bench_serialization.py
+"""
+Response serialization cost per endpoint: FastAPI's default path vs the app's.
+
+For each payload, the body is produced the way FastAPI would without the
+app's changes, and the way the routes now do it:
+- response_model routes (login, register, bulk promote, list of users):
+  old = fastapi.routing.serialize_response on the route's response field
+        (validate the returned object again, dump to dicts) + JSONResponse
+  new = core.encoding.model_response (pydantic-core straight to JSON bytes)
+- dict routes (array writes) and error responses:
+  old = jsonable_encoder + JSONResponse (stdlib json)
+  new = FastJSONResponse (orjson)
+Both sides must produce equivalent JSON; times are the median per call.
+
+    python benchmarks/bench_serialization.py --users 100000
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from _common import load_app
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from core.encoding import FastJSONResponse, model_response
+from schemas.token_schema import TokenResponse
+from schemas.user_schema import BulkRoleChangeResult, UserOut
+
+
+def route_field(app, method: str, path: str):
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path == path and method in route.methods:
+            return route.response_field
+    raise LookupError(f"{method} {path}")
+
+
+async def timed(fn, repeat: int) -> tuple[bytes, float]:
+    """(body, median µs) of an async fn() -> body."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = await fn()
+        times.append((time.perf_counter() - started) * 1e6)
+    return body, statistics.median(times)
+
+
+async def main(args) -> None:
+    app = load_app()
+
+    def model_case(method, path, content):
+        field = route_field(app, method, path)
+
+        async def old():
+            return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+        async def new():
+            return model_response(content).body
+
+        return old, new
+
+    def dict_case(content):
+        async def old():
+            return JSONResponse(jsonable_encoder(content)).body
+
+        async def new():
+            return FastJSONResponse(content).body
+
+        return old, new
+
+    names = [f"user-{i:07d}" for i in range(max(args.users, 1000))]
+    users = [UserOut(username=n, is_admin=i % 10 == 0) for i, n in enumerate(names)]
+    big = max(args.repeat // 100, 3)  # the big list takes ~100x longer per call
+    cases = [
+        ("POST /login", model_case(
+            "POST", "/login", TokenResponse(access_token="x" * 180, token_type="bearer")), args.repeat),
+        ("POST /users", model_case("POST", "/users", users[1]), args.repeat),
+        ("PUT /users/promote", model_case("PUT", "/users/promote", BulkRoleChangeResult(
+            updated=names[:400], unchanged=names[400:450], not_found=names[450:500])), args.repeat),
+        ("GET /users (1k)", model_case("GET", "/users", users[:1000]), args.repeat),
+        (f"GET /users ({args.users})", model_case("GET", "/users", users[:args.users]), big),
+        ("PUT /array/{index}", dict_case({"message": "Element at index 3 updated", "array": [1.5, 0, "third"] * 10}),
+         args.repeat),
+        ("error 422", dict_case({"detail": [
+            {"type": "missing", "loc": ["body", "value"], "msg": "Field required", "input": None}]}), args.repeat),
+    ]
+
+    print(f"{'endpoint':<22} {'old µs':>10} {'new µs':>10} {'speedup':>8} {'bytes':>10}")
+    for name, (old, new), repeat in cases:
+        old_body, old_time = await timed(old, repeat)
+        new_body, new_time = await timed(new, repeat)
+        assert json.loads(old_body) == json.loads(new_body), name
+        print(f"{name:<22} {old_time:>10.1f} {new_time:>10.1f} {old_time / new_time:>7.1f}x {len(new_body):>10}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
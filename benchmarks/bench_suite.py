@@ -0,0 +1,219 @@
+# benchmarks/bench_suite.py
+"""
+End-to-end benchmark of the main endpoints, with saved baselines and a
+regression gate (exit status 1) for CI / before a release.
+
+Scenarios (--only to pick some):
+- login        POST /login (bcrypt: fewer requests and clients, see
+               --login-requests / --login-concurrency; more clients than
+               hashing workers + PASSWORD_HASH_MAX_QUEUE get 503s)
+- me           GET /me
+- array        GET /array (whole array, --array-size elements)
+- array-page   GET /array?limit=100
+- users        GET /users (all users, --users of them; admin)
+- users-page   GET /users?limit=100
+
+Targets:
+- in-process (default): httpx + ASGITransport, no server
+- --server: a local uvicorn (--workers N) on a free port, over TCP
+Both use the throwaway SQLite database of _common (set DATABASE_URL for
+Postgres). Each scenario is warmed up, then run --repeat times; the run
+with the best throughput is kept.
+
+Baselines are JSON files (default benchmarks/baselines/<target>.json, not
+committed: numbers only compare on the same machine):
+
+    python benchmarks/bench_suite.py --save-baseline     # record
+    python benchmarks/bench_suite.py                     # compare, exit 1 on a regression
+    python benchmarks/bench_suite.py --server --workers 2 --threshold 0.15
+
+A scenario regresses when its p95 latency is more than --threshold
+(default 0.25 = 25%) above the baseline or its throughput more than
+--threshold below it, or when any of its requests failed.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+from _common import (
+    ROOT, load_app, close_app, make_client, create_user, login, measure, print_results,
+    free_port, start_server, wait_ready,
+)
+
+import httpx
+
+SCENARIOS = ("login", "me", "array", "array-page", "users", "users-page")
+
+BASELINE_DIR = os.path.join(ROOT, "benchmarks", "baselines")
+
+
+async def seed(client: httpx.AsyncClient, headers: dict, users: int, array_size: int) -> None:
+    """`users` users (bulk import, pre-hashed) and an array of exactly `array_size` numbers."""
+    from core.security import _hash_password
+
+    password_hash = _hash_password("bench-pass")
+    rows = "\n".join(json.dumps({"username": f"suite-{i}", "password_hash": password_hash}) for i in range(users))
+    r = await client.post("/users/import", content=rows.encode(), timeout=None,
+                          headers={**headers, "Content-Type": "application/x-ndjson"})
+    r.raise_for_status()
+
+    r = await client.get("/array", headers=headers)
+    r.raise_for_status()
+    length = int(r.headers["X-Total-Count"])
+    if length < array_size:
+        ops = [{"op": "append", "value": i * 0.5} for i in range(length, array_size)]
+    else:
+        ops = [{"op": "pop"}] * (length - array_size)
+    if ops:
+        (await client.post("/array/batch", headers=headers, json={"ops": ops}, timeout=None)).raise_for_status()
+
+
+def requests_for(client: httpx.AsyncClient, headers: dict) -> dict:
+    """Scenario -> (label, send(i))."""
+    return {
+        "login": ("POST /login", lambda i: client.post(
+            "/login", data={"username": "bench-admin", "password": "bench-pass"})),
+        "me": ("GET /me", lambda i: client.get("/me", headers=headers)),
+        "array": ("GET /array", lambda i: client.get("/array", headers=headers)),
+        "array-page": ("GET /array?limit=100", lambda i: client.get("/array?limit=100", headers=headers)),
+        "users": ("GET /users", lambda i: client.get("/users", headers=headers)),
+        "users-page": ("GET /users?limit=100", lambda i: client.get("/users?limit=100", headers=headers)),
+    }
+
+
+async def run_suite(client: httpx.AsyncClient, args) -> list[dict]:
+    await create_user(client, "bench-admin", admin=True)
+    headers = await login(client, "bench-admin")
+    await seed(client, headers, args.users, args.array_size)
+
+    scenarios = requests_for(client, headers)
+    results = []
+    for key in args.only:
+        label, send = scenarios[key]
+        total, concurrency = (
+            (args.login_requests, args.login_concurrency) if key == "login" else (args.requests, args.concurrency)
+        )
+        await measure(label, send, min(args.warmup, total), concurrency)
+        runs = [await measure(label, send, total, concurrency) for _ in range(args.repeat)]
+        results.append({"scenario": key, **max(runs, key=lambda run: run["rps"])})
+    return results
+
+
+async def run_in_process(args) -> list[dict]:
+    app = load_app()
+    async with make_client(app) as client:
+        results = await run_suite(client, args)
+    await close_app()
+    return results
+
+
+async def run_server(args) -> list[dict]:
+    # Schema first: the workers share this process' DATABASE_URL
+    load_app()
+    await close_app()
+
+    port = free_port()
+    server = start_server(args.workers, port, {})
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await wait_ready(client)
+            return await run_suite(client, args)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> list[str]:
+    """Regression messages (empty when the run is within the threshold)."""
+    failures = []
+    print(f"\n{'scenario':<14} {'p95 ms':>8} {'base':>8} {'change':>8} {'req/s':>10} {'base':>10} {'change':>8}")
+    for r in results:
+        if r["errors"]:
+            failures.append(f"{r['scenario']}: {r['errors']} failed requests")
+        base = baseline["results"].get(r["scenario"])
+        if base is None:
+            print(f"{r['scenario']:<14} (no baseline)")
+            continue
+        p95_change = r["p95"] / base["p95"] - 1 if base["p95"] else 0.0
+        rps_change = r["rps"] / base["rps"] - 1 if base["rps"] else 0.0
+        print(f"{r['scenario']:<14} {r['p95']:>8.2f} {base['p95']:>8.2f} {p95_change:>+8.0%} "
+              f"{r['rps']:>10.1f} {base['rps']:>10.1f} {rps_change:>+8.0%}")
+        if p95_change > threshold:
+            failures.append(f"{r['scenario']}: p95 {r['p95']:.2f} ms vs {base['p95']:.2f} ms ({p95_change:+.0%})")
+        if rps_change < -threshold:
+            failures.append(f"{r['scenario']}: {r['rps']:.1f} req/s vs {base['rps']:.1f} req/s ({rps_change:+.0%})")
+    return failures
+
+
+def save_baseline(path: str, results: list[dict], args) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    baseline = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "settings": {
+            key: getattr(args, key)
+            for key in (
+                "server", "workers", "requests", "login_requests", "concurrency", "login_concurrency",
+                "users", "array_size",
+            )
+        },
+        "results": {
+            r["scenario"]: {key: r[key] for key in ("requests", "rps", "p50", "p95", "p99")} for r in results
+        },
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+    print(f"\nbaseline saved to {path}")
+
+
+def main(args) -> int:
+    started = time.perf_counter()
+    results = asyncio.run(run_server(args) if args.server else run_in_process(args))
+    target = f"uvicorn, {args.workers} workers" if args.server else "in-process"
+    print(f"{target}, {args.concurrency} concurrent clients, {args.users} users, "
+          f"{args.array_size} array elements ({time.perf_counter() - started:.0f}s)")
+    print_results(results)
+
+    path = args.baseline or os.path.join(BASELINE_DIR, "server.json" if args.server else "in-process.json")
+    if args.save_baseline:
+        save_baseline(path, results, args)
+        return 0
+    if not os.path.exists(path):
+        print(f"\nno baseline at {path} (record one with --save-baseline)")
+        return 0
+    with open(path) as f:
+        baseline = json.load(f)
+    failures = compare(results, baseline, args.threshold)
+    if failures:
+        print(f"\nREGRESSION (threshold {args.threshold:.0%}):")
+        print("\n".join(f"  {failure}" for failure in failures))
+        return 1
+    print(f"\nno regression (threshold {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--login-requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--login-concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--array-size", type=int, default=1000)
+    parser.add_argument("--server", action="store_true", help="benchmark a local uvicorn instead of in-process")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--baseline", help="baseline file (default benchmarks/baselines/<target>.json)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    sys.exit(main(parser.parse_args()))
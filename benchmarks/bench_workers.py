@@ -0,0 +1,136 @@
+# benchmarks/bench_workers.py
+"""
+Throughput of the production launcher (src/serve.py) from 1 to N workers,
+with the default asyncio + h11 stack and with uvloop + httptools.
+
+For every combination a server is started (SERVER_WORKERS=n, FAST_STARTUP=1)
+and --clients client processes (one Python client cannot saturate several
+workers) each keep --concurrency requests in flight for --seconds against
+every --paths entry as the admin user. Requests/s are summed over the
+clients; latencies are percentiles over all requests.
+
+    python benchmarks/bench_workers.py --max-workers 4 --clients 4
+
+Scaling needs the cores: on a machine with fewer CPUs than --max-workers
+(or --clients + workers competing for the same ones) the extra workers only
+add context switches.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from _common import SRC, load_app, close_app, make_client, create_user, free_port, wait_ready
+
+import httpx
+
+STACKS = {
+    "asyncio+h11": {"SERVER_LOOP": "asyncio", "SERVER_HTTP": "h11"},
+    "uvloop+httptools": {"SERVER_LOOP": "uvloop", "SERVER_HTTP": "httptools"},
+}
+
+
+async def client_process(port: int, path: str, token: str, concurrency: int, seconds: float) -> dict:
+    """One client: `concurrency` loops for `seconds`; request count and latencies (ms)."""
+    latencies: list[float] = []
+    errors = 0
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + seconds
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                r = await client.get(path, headers=headers)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                if r.status_code >= 400:
+                    errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"latencies": latencies, "errors": errors}
+
+
+def start_launcher(workers: int, port: int, extra_env: dict) -> subprocess.Popen:
+    env = {**os.environ, "FAST_STARTUP": "1", "SERVER_WORKERS": str(workers), "PORT": str(port),
+           "SERVER_HOST": "127.0.0.1", "LOG_LEVEL": "WARNING", **extra_env}
+    return subprocess.Popen([sys.executable, os.path.join(SRC, "serve.py")], cwd=SRC, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def run(stack: str, workers: int, args) -> list[dict]:
+    port = free_port()
+    server = start_launcher(workers, port, STACKS[stack])
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            await wait_ready(client)
+            r = await client.post("/login", data={"username": "bench-admin", "password": "bench-pass"})
+            r.raise_for_status()
+            token = r.json()["access_token"]
+            # Warm every worker (principal cache, pools)
+            await asyncio.gather(*(client.get(path, headers={"Authorization": f"Bearer {token}"})
+                                   for path in args.paths for _ in range(workers * 8)))
+
+        results = []
+        for path in args.paths:
+            command = [sys.executable, __file__, "--child", str(port), path, token,
+                       str(args.concurrency), str(args.seconds)]
+            children = [subprocess.Popen(command, stdout=subprocess.PIPE, text=True) for _ in range(args.clients)]
+            outputs = [json.loads(child.communicate()[0]) for child in children]
+            latencies = sorted(l for out in outputs for l in out["latencies"])
+            q = statistics.quantiles(latencies, n=100)
+            results.append({
+                "name": f"{stack} x{workers} GET {path}",
+                "requests": len(latencies),
+                "errors": sum(out["errors"] for out in outputs),
+                "rps": len(latencies) / args.seconds,
+                "p50": q[49], "p95": q[94], "p99": q[98],
+            })
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def main(args) -> None:
+    # Schema and the admin user, in the database the servers will share
+    app = load_app()
+    async with make_client(app) as client:
+        await create_user(client, "bench-admin", admin=True)
+    await close_app()
+
+    results = []
+    for stack in args.stacks:
+        for workers in range(1, args.max_workers + 1):
+            results += await run(stack, workers, args)
+
+    print(f"{args.clients} client processes x {args.concurrency} concurrent requests, "
+          f"{args.seconds}s per run, {os.cpu_count()} CPUs")
+    print(f"{'scenario':<46} {'req':>7} {'err':>5} {'req/s':>9} {'x1':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    single = {}
+    for r in results:
+        key = r["name"].split(" x")[0] + r["name"].split(" GET")[1]
+        single.setdefault(key, r["rps"])
+        print(f"{r['name']:<46} {r['requests']:>7} {r['errors']:>5} {r['rps']:>9.0f} "
+              f"{r['rps'] / single[key]:>6.2f} {r['p50']:>8.2f} {r['p99']:>8.2f}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        port, path, token, concurrency, seconds = sys.argv[2:7]
+        print(json.dumps(asyncio.run(client_process(int(port), path, token, int(concurrency), float(seconds)))))
+        sys.exit(0)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--paths", nargs="+", default=["/me", "/users?limit=100"])
+    parser.add_argument("--stacks", nargs="+", choices=list(STACKS), default=list(STACKS))
+    asyncio.run(main(parser.parse_args()))
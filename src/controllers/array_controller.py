@@ -1,34 +1,71 @@
 from fastapi import Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from database import get_db
+from database import DB_ASYNC, get_db, get_async_db
 from services import array_service
 
 class ArrayController:
-    def __init__(self, db: Session):
+    # The array store may hit the database (ARRAY_STORAGE=database; reads are
+    # usually served by its in-process cache), so calls run on the threadpool.
+    def __init__(self, db: Session | AsyncSession):
     
         if not db:
             raise HTTPException(status_code=500, detail="Database session is missing")
         self.db = db
 
-    def get_all(self):
-        return {"array": array_service.get_all()}
+    async def get_all(self):
+        return {"array": await run_in_threadpool(array_service.get_all)}
 
-    def get_by_index(self, index: int):
-        return array_service.get_by_index(index)
+    async def get_all_encoded(self, media_type: str, encoding: str | None):
+        return await run_in_threadpool(array_service.get_all_encoded, media_type, encoding)
 
-    def add_value(self, value):
-        return {"array": array_service.add(value)}
+    async def encode_items(self, items: list, media_type: str, encoding: str | None):
+        return await run_in_threadpool(array_service.encode_items, items, media_type, encoding)
 
-    def update_value(self, index: int, value):
-        return array_service.update(index, value)
+    async def get_page(self, start=None, stop=None, step=None, offset: int = 0, limit: int | None = None):
+        return await run_in_threadpool(array_service.get_page, start, stop, step, offset, limit)
 
-    def delete_last(self):
-        return array_service.delete_last()
+    async def get_by_index(self, index: int):
+        return await run_in_threadpool(array_service.get_by_index, index)
 
-    def reset_index(self, index: int):
-        return array_service.reset_index(index)
+    async def get_many(self, indices: list[int]):
+        return {"values": await run_in_threadpool(array_service.get_many, indices)}
 
+    async def get_stats(self, percentiles: list[float], bins: int):
+        return await run_in_threadpool(array_service.get_stats, percentiles, bins)
 
-def get_array_controller(db: Session = Depends(get_db)) -> ArrayController:
-    return ArrayController(db)
\ No newline at end of file
+    # Change feed: runs on the event loop (no threadpool thread per subscriber)
+    async def subscribe(self, since: str | None = None):
+        return await array_service.subscribe(since)
+
+    def unsubscribe(self, subscription) -> None:
+        array_service.unsubscribe(subscription)
+
+    # Writes return (response body, ETag of the new version)
+    async def add_value(self, value, if_match: str | None = None):
+        items, etag = await run_in_threadpool(array_service.add, value, if_match)
+        return {"array": items}, etag
+
+    async def update_value(self, index: int, value, if_match: str | None = None):
+        return await run_in_threadpool(array_service.update, index, value, if_match)
+
+    async def delete_last(self, if_match: str | None = None):
+        return await run_in_threadpool(array_service.delete_last, if_match)
+
+    async def reset_index(self, index: int, if_match: str | None = None):
+        return await run_in_threadpool(array_service.reset_index, index, if_match)
+
+    async def apply_batch(self, ops, if_match: str | None = None):
+        return await run_in_threadpool(array_service.apply_batch, ops, if_match)
+
+
+def get_sync_array_controller(db: Session = Depends(get_db)) -> ArrayController:
+    return ArrayController(db)
+
+async def get_async_array_controller(db: AsyncSession = Depends(get_async_db)) -> ArrayController:
+    return ArrayController(db)
+
+# The dependency used by the router: picks the session type for the DB mode
+get_array_controller = get_async_array_controller if DB_ASYNC else get_sync_array_controller
\ No newline at end of file
@@ -1,8 +1,10 @@
 from fastapi import Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from database import get_db
-from services import auth_service
+from database import DB_ASYNC, get_db, get_async_db
+from services import auth_service, async_auth_service
 from schemas.token_schema import TokenResponse
 
 class AuthController:
@@ -13,11 +15,30 @@ class AuthController:
             raise HTTPException(status_code=500, detail="Database session is missing")
         self.db = db
 
-    def login(self, username: str, password: str) -> TokenResponse:
+    async def login(self, username: str, password: str) -> TokenResponse:
         """
         הקונטרולר מקבל את השם והסיסמה ומעביר לטיפול הסרוויס
+        (sync service -> runs on the threadpool)
         """
-        return auth_service.login(self.db, username, password)
+        return await run_in_threadpool(auth_service.login, self.db, username, password)
 
-def get_auth_controller(db: Session = Depends(get_db)) -> AuthController:
-    return AuthController(db)
\ No newline at end of file
+
+class AsyncAuthController:
+    # Same interface as AuthController, backed by the async service (DB_ASYNC=1)
+    def __init__(self, db: AsyncSession):
+        if not db:
+            raise HTTPException(status_code=500, detail="Database session is missing")
+        self.db = db
+
+    async def login(self, username: str, password: str) -> TokenResponse:
+        return await async_auth_service.login(self.db, username, password)
+
+
+def get_sync_auth_controller(db: Session = Depends(get_db)) -> AuthController:
+    return AuthController(db)
+
+async def get_async_auth_controller(db: AsyncSession = Depends(get_async_db)) -> AsyncAuthController:
+    return AsyncAuthController(db)
+
+# The dependency used by the router: picks the implementation for the DB mode
+get_auth_controller = get_async_auth_controller if DB_ASYNC else get_sync_auth_controller
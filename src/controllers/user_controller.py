@@ -1,27 +1,98 @@
+from typing import AsyncIterator, Iterator
+
 from fastapi import Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from database import get_db
-from services import user_service
-from schemas.user_schema import RegisterRequest, UserOut
+from database import DB_ASYNC, get_db, get_read_db, get_async_db, get_async_read_db
+from services import user_service, async_user_service, user_import_service
+from schemas.user_schema import BulkRoleChangeResult, RegisterRequest, UserOut, UserPage, UserImportReport
 
 class UserController:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, read_db: Session | None = None):
         #  הקונטרולר מקבל את ה-Session ומוודא שהוא קיים
         if not db:
             raise HTTPException(status_code=500, detail="Database session is missing")
         self.db = db
+        # Listings are read-only and may be served by a replica (get_read_db)
+        self.read_db = read_db or db
 
-    def register(self, data: RegisterRequest) -> UserOut:
+    # The sync services block on the DB, so they run on the threadpool
+    async def register(self, data: RegisterRequest) -> UserOut:
         # הקונטרולר מפעיל את הסרוויס
-        return user_service.register_user(self.db, data)
+        return await run_in_threadpool(user_service.register_user, self.db, data)
 
-    def update_admin_status(self, username: str, make_admin: bool) -> UserOut:
+    async def update_admin_status(self, username: str, make_admin: bool) -> UserOut:
         # הקונטרולר מפעיל את פונקציית העדכון
-        return user_service.update_admin_status(self.db, username, make_admin)
+        return await run_in_threadpool(user_service.update_admin_status, self.db, username, make_admin)
+
+    async def update_admin_status_bulk(self, usernames: list[str], make_admin: bool) -> BulkRoleChangeResult:
+        return await run_in_threadpool(user_service.update_admin_status_bulk, self.db, usernames, make_admin)
+
+    async def list_all(self, limit: int | None = None, after: int | None = None) -> UserPage:
+        return await run_in_threadpool(user_service.list_users, self.read_db, limit, after)
+
+    async def encode(self, users: list[UserOut], media_type: str, encoding: str | None) -> tuple[bytes, str | None]:
+        return await run_in_threadpool(user_service.encode_users, users, media_type, encoding)
+
+    def stream_all(self) -> Iterator[bytes]:
+        # Sync generator: StreamingResponse iterates it on the threadpool
+        return user_service.stream_users(self.read_db)
+
+
+class AsyncUserController:
+    # Same interface as UserController, backed by the async service (DB_ASYNC=1)
+    def __init__(self, db: AsyncSession, read_db: AsyncSession | None = None):
+        if not db:
+            raise HTTPException(status_code=500, detail="Database session is missing")
+        self.db = db
+        self.read_db = read_db or db
+
+    async def register(self, data: RegisterRequest) -> UserOut:
+        return await async_user_service.register_user(self.db, data)
+
+    async def update_admin_status(self, username: str, make_admin: bool) -> UserOut:
+        return await async_user_service.update_admin_status(self.db, username, make_admin)
+
+    async def update_admin_status_bulk(self, usernames: list[str], make_admin: bool) -> BulkRoleChangeResult:
+        return await async_user_service.update_admin_status_bulk(self.db, usernames, make_admin)
+
+    async def list_all(self, limit: int | None = None, after: int | None = None) -> UserPage:
+        return await async_user_service.list_users(self.read_db, limit, after)
+
+    async def encode(self, users: list[UserOut], media_type: str, encoding: str | None) -> tuple[bytes, str | None]:
+        # CPU-bound (serialization / compression): kept off the event loop
+        return await run_in_threadpool(user_service.encode_users, users, media_type, encoding)
+
+    def stream_all(self) -> AsyncIterator[bytes]:
+        return async_user_service.stream_users(self.read_db)
+
+
+class UserImportController:
+    # Bulk import always uses a sync Session (batched COPY / INSERT on the threadpool)
+    def __init__(self, db: Session):
+        if not db:
+            raise HTTPException(status_code=500, detail="Database session is missing")
+        self.db = db
+
+    async def import_users(self, chunks: AsyncIterator[bytes], content_type: str | None) -> UserImportReport:
+        fmt = user_import_service.format_from_content_type(content_type)
+        return await user_import_service.import_users(self.db, chunks, fmt)
+
+
+def get_sync_user_controller(
+    db: Session = Depends(get_db), read_db: Session = Depends(get_read_db)
+) -> UserController:
+    return UserController(db, read_db)
+
+async def get_async_user_controller(
+    db: AsyncSession = Depends(get_async_db), read_db: AsyncSession = Depends(get_async_read_db)
+) -> AsyncUserController:
+    return AsyncUserController(db, read_db)
 
-    def list_all(self) -> list[UserOut]:
-        return user_service.list_users(self.db)
+# The dependency used by the router: picks the implementation for the DB mode
+get_user_controller = get_async_user_controller if DB_ASYNC else get_sync_user_controller
 
-def get_user_controller(db: Session = Depends(get_db)) -> UserController:
-    return UserController(db)
\ No newline at end of file
+def get_user_import_controller(db: Session = Depends(get_db)) -> UserImportController:
+    return UserImportController(db)
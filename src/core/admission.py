@@ -0,0 +1,336 @@
+# src/core/admission.py
+"""
+Admission control: keep cheap requests fast while expensive ones pile up.
+
+Without it every request waits for the same threadpool / DB pool, so a
+burst of POST /login (bcrypt) or GET /array (whole array) makes GET /me and
+admin writes time out too. AdmissionMiddleware sorts requests into classes
+by method + path:
+
+    auth    POST /login, POST /users (bcrypt)
+    bulk    GET /array, GET /array/stats, GET /users, POST /array/batch,
+            POST /users/import, PUT /users/promote|demote
+    write   other POST / PUT / PATCH / DELETE under /array and /users
+    read    everything else
+(/, /livez, /readyz, /metrics..., /array/stream and the docs are never limited)
+
+Each class has its own concurrency limit (ADMISSION_<CLASS>_LIMIT) and a
+bounded FIFO queue in front of it (ADMISSION_QUEUE_SIZE, waiting at most
+ADMISSION_QUEUE_TIMEOUT_MS). A request that cannot get a slot is answered
+503 + Retry-After right away instead of holding a connection:
+- queue_full:  the class queue is full
+- timeout:     no slot within ADMISSION_QUEUE_TIMEOUT_MS
+- overloaded:  the class is saturated for a while (the average time requests
+               waited for a slot is above ADMISSION_TARGET_WAIT_MS), so new
+               requests are not queued at all until waits drop again - under
+               sustained overload queueing only adds latency to what is then
+               still rejected
+
+Rate limits (token buckets, 429 + Retry-After):
+- per client IP on the auth class (ADMISSION_LOGIN_IP_RATE / _BURST), against
+  password guessing and login floods; login and registration have separate
+  buckets. The IP is taken from X-Forwarded-For, ADMISSION_FORWARDED_HOPS
+  entries from the right (default 1, the Cloud Run front end): keyed on the
+  peer address instead, every client behind the proxy would share one bucket
+- per user (JWT sub) on every authenticated request (ADMISSION_USER_RATE /
+  _BURST), checked by get_current_user once the token is verified
+
+Limits, queues and buckets are per process (with several workers, each one
+admits its own share). Counters are in GET /metrics and /metrics/admission.
+"""
+
+import asyncio
+import collections
+import re
+import threading
+import time
+
+from fastapi import HTTPException
+
+from core.config import (
+    ADMISSION_AUTH_LIMIT,
+    ADMISSION_BULK_LIMIT,
+    ADMISSION_WRITE_LIMIT,
+    ADMISSION_READ_LIMIT,
+    ADMISSION_QUEUE_SIZE,
+    ADMISSION_QUEUE_TIMEOUT_MS,
+    ADMISSION_TARGET_WAIT_MS,
+    ADMISSION_USER_RATE,
+    ADMISSION_USER_BURST,
+    ADMISSION_LOGIN_IP_RATE,
+    ADMISSION_LOGIN_IP_BURST,
+    ADMISSION_FORWARDED_HOPS,
+    ADMISSION_RETRY_AFTER_SECONDS,
+)
+from core.encoding import FastJSONResponse
+from core.request_metrics import Histogram
+
+# (methods, path) -> class; first match wins, no match = "read"
+_RULES = (
+    ({"POST"}, re.compile(r"/login|/users"), "auth"),
+    ({"GET", "HEAD"}, re.compile(r"/array(?:/stats)?|/users"), "bulk"),
+    ({"POST"}, re.compile(r"/users/import|/array/batch"), "bulk"),
+    ({"PUT"}, re.compile(r"/users/(?:promote|demote)"), "bulk"),
+    ({"POST", "PUT", "PATCH", "DELETE"}, re.compile(r"/(?:array|users)(?:/.*)?"), "write"),
+)
+_EXEMPT = re.compile(r"/|/livez|/readyz|/metrics(?:/.*)?|/array/stream|/docs.*|/redoc|/openapi\.json")
+
+# Weight of the newest wait in the average that decides "overloaded"
+_WAIT_EWMA_WEIGHT = 0.1
+
+
+def classify(method: str, path: str) -> str | None:
+    """The admission class of a request, None when it is never limited."""
+    if _EXEMPT.fullmatch(path):
+        return None
+    for methods, pattern, name in _RULES:
+        if method in methods and pattern.fullmatch(path):
+            return name
+    return "read"
+
+
+class TokenBuckets:
+    """One token bucket per key: `rate` tokens per second, at most `burst`.
+
+    Thread-safe: the per-user buckets are taken from the sync get_current_user,
+    which runs in the threadpool.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> [tokens, last refill (monotonic)]
+        self._buckets: dict[str, list] = {}
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def acquire(self, key: str) -> float:
+        """Take a token: 0.0 when allowed, else the seconds until one is available."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._purge(now)
+                bucket = self._buckets[key] = [self.burst, now]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            self.rejected += 1
+            return (1 - bucket[0]) / self.rate
+
+    def _purge(self, now: float) -> None:
+        # Buckets that refilled completely are the same as no bucket
+        full = [key for key, (tokens, last) in self._buckets.items()
+                if tokens + (now - last) * self.rate >= self.burst]
+        for key in full:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_keys:
+            self._buckets.clear()  # many keys all limited at once: start over rather than grow
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class ClassLimiter:
+    """Concurrency limit + bounded FIFO queue of one class (event loop only, no locks)."""
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float, target_wait: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.target_wait = target_wait
+        self.in_flight = 0
+        self._waiters: collections.deque[asyncio.Future] = collections.deque()
+        self.avg_wait = 0.0
+        self.wait = Histogram()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = {"queue_full": 0, "timeout": 0, "overloaded": 0}
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def overloaded(self) -> bool:
+        return self.avg_wait > self.target_wait
+
+    def _admit(self, waited: float) -> None:
+        self.admitted += 1
+        self.wait.observe(waited)
+        self.avg_wait += _WAIT_EWMA_WEIGHT * (waited - self.avg_wait)
+
+    async def acquire(self) -> str | None:
+        """Take a slot, waiting in the queue if allowed; the rejection reason otherwise."""
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self._admit(0.0)
+            return None
+        if self.overloaded:
+            self.rejected["overloaded"] += 1
+            return "overloaded"
+        if len(self._waiters) >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # release() handed the slot over in the same loop iteration the
+                # timeout fired (3.12's wait_for raises anyway): in_flight already
+                # counts this request, so take the slot rather than leak it
+                self._admit(time.monotonic() - started)
+                return None
+            # release() may have popped the cancelled waiter in the meantime
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self.rejected["timeout"] += 1
+            # Waited the whole timeout: counts towards "overloaded"
+            self.avg_wait += _WAIT_EWMA_WEIGHT * (self.queue_timeout - self.avg_wait)
+            return "timeout"
+        except asyncio.CancelledError:
+            # Client went away while queued; if the slot was handed over already, pass it on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+        # release() handed its slot over: in_flight already counts this request
+        self._admit(time.monotonic() - started)
+        return None
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "overloaded": self.overloaded,
+            "avg_wait_ms": round(self.avg_wait * 1000, 3),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": dict(self.rejected),
+            "wait_seconds": self.wait.snapshot(),
+        }
+
+
+class AdmissionController:
+    def __init__(self, limits: dict[str, int], max_queue: int, queue_timeout: float, target_wait: float,
+                 user_buckets: TokenBuckets, ip_buckets: TokenBuckets, forwarded_hops: int, retry_after: int):
+        self.classes = {
+            name: ClassLimiter(name, limit, max_queue, queue_timeout, target_wait) for name, limit in limits.items()
+        }
+        self.user_buckets = user_buckets
+        self.ip_buckets = ip_buckets
+        self.forwarded_hops = forwarded_hops
+        self.retry_after = retry_after
+
+    def client_ip(self, scope: dict) -> str:
+        """The peer address, or the address the N-th proxy from us saw (X-Forwarded-For)."""
+        if self.forwarded_hops > 0:
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    hops = [hop.strip() for hop in value.decode("latin-1").split(",")]
+                    if len(hops) >= self.forwarded_hops:
+                        return hops[-self.forwarded_hops]
+                    break
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def check_user_rate(self, username: str) -> None:
+        """Per-user token bucket (called by get_current_user); 429 when exhausted."""
+        wait = self.user_buckets.acquire(username)
+        if wait:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests for this user",
+                headers={"Retry-After": str(int(wait) + 1)},
+            )
+
+    def stats(self) -> dict:
+        return {
+            "classes": {name: limiter.stats() for name, limiter in self.classes.items()},
+            "rate_limited": {"user": self.user_buckets.rejected, "login_ip": self.ip_buckets.rejected},
+            "buckets": {"user": len(self.user_buckets), "login_ip": len(self.ip_buckets)},
+        }
+
+
+admission_controller = AdmissionController(
+    limits={
+        "auth": ADMISSION_AUTH_LIMIT,
+        "bulk": ADMISSION_BULK_LIMIT,
+        "write": ADMISSION_WRITE_LIMIT,
+        "read": ADMISSION_READ_LIMIT,
+    },
+    max_queue=ADMISSION_QUEUE_SIZE,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+    target_wait=ADMISSION_TARGET_WAIT_MS / 1000,
+    user_buckets=TokenBuckets(ADMISSION_USER_RATE, ADMISSION_USER_BURST),
+    ip_buckets=TokenBuckets(ADMISSION_LOGIN_IP_RATE, ADMISSION_LOGIN_IP_BURST),
+    forwarded_hops=ADMISSION_FORWARDED_HOPS,
+    retry_after=ADMISSION_RETRY_AFTER_SECONDS,
+)
+
+
+def _rejection(status: int, detail: str, retry_after: int) -> FastJSONResponse:
+    # Same body as the app's HTTPException handler
+    return FastJSONResponse(
+        status_code=status,
+        content={"detail": detail, "success": False},
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: AdmissionController = admission_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = classify(scope["method"], scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        if name == "auth":
+            # Per route: a registration flood does not lock out logins
+            key = f"{scope['path']} {self.controller.client_ip(scope)}"
+            wait = self.controller.ip_buckets.acquire(key)
+            if wait:
+                response = _rejection(429, "Too many attempts from this address", int(wait) + 1)
+                await response(scope, receive, send)
+                return
+
+        limiter = self.controller.classes[name]
+        reason = await limiter.acquire()
+        if reason is not None:
+            response = _rejection(503, f"Server busy ({name}: {reason}), try again later", self.controller.retry_after)
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
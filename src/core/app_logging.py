@@ -0,0 +1,221 @@
+# src/core/app_logging.py
+"""
+Non-blocking, structured application logging.
+
+Code logs through logging.getLogger("app.<module>"); setup_logging() wires
+the "app" logger as:
+
+    logger -> QueueHandler (bounded queue, never blocks)
+           -> QueueListener thread -> formatter -> stdout
+
+- Writing to stdout (a pipe to the container's log collector) happens on
+  the listener thread, so a slow collector or an error storm does not add
+  latency to the requests on the event loop. Tracebacks are also formatted
+  there. When the queue is full the record is dropped and counted.
+- Records are JSON lines (LOG_FORMAT=json, default) or plain text
+  (LOG_FORMAT=text, for local development), with the request they belong
+  to: request_id (X-Request-ID), method, route, user, elapsed_ms and the
+  spans timed so far (core.request_metrics), plus any extra={"fields": {...}}
+  (except keys the record already uses: ts, level, message, request_id, ...).
+- uvicorn's own loggers (access log, unhandled exceptions) use the same queue.
+- Repeated identical warnings / errors (same logger, message and exception
+  type) are rate limited: LOG_ERROR_BURST per LOG_ERROR_WINDOW_SECONDS, then
+  only every LOG_ERROR_SAMPLE_EVERY-th; the next record that gets through
+  carries the number suppressed meanwhile.
+"""
+
+import atexit
+import logging
+import queue
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from core.config import (
+    LOG_LEVEL,
+    LOG_FORMAT,
+    LOG_QUEUE_SIZE,
+    LOG_ERROR_BURST,
+    LOG_ERROR_WINDOW_SECONDS,
+    LOG_ERROR_SAMPLE_EVERY,
+)
+from core.encoding import encode_json
+from core.request_metrics import current_request
+
+# Request attributes copied onto each record (empty outside requests)
+_REQUEST_FIELDS = ("request_id", "method", "route", "user", "elapsed_ms", "spans_ms")
+
+# Keys of a JSON record that extra={"fields": {...}} cannot overwrite
+_RESERVED = frozenset((
+    "ts", "level", "logger", "message", "suppressed", "exc_type", "exc_message", "traceback", *_REQUEST_FIELDS,
+))
+
+
+class RequestContextFilter(logging.Filter):
+    """Copies the current request's details onto the record (runs in the caller's context)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request = current_request()
+        if request is not None:
+            record.request_id = request.request_id
+            record.method = request.scope["method"]
+            record.route = request.route()
+            record.user = request.user
+            record.elapsed_ms = round(request.elapsed() * 1000, 3)
+            record.spans_ms = {name: round(seconds * 1000, 3) for name, seconds in request.spans.items()}
+        return True
+
+
+class ErrorRateLimiter(logging.Filter):
+    """Rate limits repeated identical WARNING+ records (see module docstring)."""
+
+    def __init__(self, burst: int, window: float, sample_every: int, max_keys: int = 1000):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.sample_every = max(sample_every, 0)
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> [window start, records in window, suppressed since last emitted]
+        self._seen: dict[tuple, list] = {}
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else None
+        key = (record.name, record.msg, exc_type)
+        now = time.monotonic()
+        with self._lock:
+            state = self._seen.get(key)
+            if state is None or now - state[0] >= self.window:
+                if state is None and len(self._seen) >= self.max_keys:
+                    self._seen.clear()  # many distinct errors: start over rather than grow
+                suppressed = state[2] if state is not None else 0
+                state = self._seen[key] = [now, 0, suppressed]
+            state[1] += 1
+            over = state[1] - self.burst
+            if over > 0 and (self.sample_every == 0 or over % self.sample_every):
+                state[2] += 1
+                self.suppressed += 1
+                return False
+            record.suppressed = state[2]
+            state[2] = 0
+            return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller and keeps the exception for the listener."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments now (they may change later); leave exc_info
+        # as is: formatting the traceback is the listener thread's job
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name in _REQUEST_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        for key, value in (getattr(record, "fields", None) or {}).items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info and record.exc_info[0] is not None:
+            entry["exc_type"] = record.exc_info[0].__name__
+            entry["exc_message"] = str(record.exc_info[1])
+            entry["traceback"] = "".join(traceback.format_exception(*record.exc_info))
+        return encode_json(entry).decode("utf-8")
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            line += f" [{record.method} {record.route} request_id={request_id}]"
+        if getattr(record, "suppressed", 0):
+            line += f" (+{record.suppressed} suppressed)"
+        return line
+
+
+_listener: QueueListener | None = None
+_handler: DroppingQueueHandler | None = None
+_rate_limiter: ErrorRateLimiter | None = None
+
+
+def setup_logging() -> None:
+    """Configure the "app" logger and start the listener thread (idempotent)."""
+    global _listener, _handler, _rate_limiter
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    _handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _rate_limiter = ErrorRateLimiter(LOG_ERROR_BURST, LOG_ERROR_WINDOW_SECONDS, LOG_ERROR_SAMPLE_EVERY)
+    # Order matters: drop rate-limited records before enriching them
+    _handler.addFilter(_rate_limiter)
+    _handler.addFilter(RequestContextFilter())
+
+    logger = logging.getLogger("app")
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(_handler)
+    logger.propagate = False
+
+    # uvicorn's access log and its "Exception in ASGI application" tracebacks
+    # are console writes on the event loop too: same queue. Loggers uvicorn
+    # left without handlers (--no-access-log) stay that way.
+    for name in ("uvicorn", "uvicorn.access"):
+        server_logger = logging.getLogger(name)
+        if server_logger.handlers:
+            server_logger.handlers = [_handler]
+
+    _listener = QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush what is queued and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        logging.getLogger("app").removeHandler(_handler)
+
+
+def stats() -> dict:
+    return {
+        "queued": _handler.queue.qsize() if _handler is not None else 0,
+        "dropped": _handler.dropped if _handler is not None else 0,
+        "rate_limited": _rate_limiter.suppressed if _rate_limiter is not None else 0,
+    }
@@ -0,0 +1,172 @@
+# src/core/array_cache.py
+"""
+Versioned write-through cache in front of an array storage backend.
+
+GET /array must not re-read the whole array from the database on every
+request. This cache keeps the items in process memory, tagged with the
+backend version they belong to:
+
+- reads compare the cached version with backend.version() (one tiny query,
+  at most once per ARRAY_CACHE_MAX_STALENESS_SECONDS) and reload the items
+  only when another worker / instance changed the array
+- writes go to the backend first (write-through); when the new version is
+  exactly cached version + 1 the same change is applied to a copy of the
+  items, which then replaces the cached list (copy-on-write), otherwise
+  (someone else wrote in between) the next read reloads
+- the cached (version, items) pair is swapped as one tuple and a published
+  list is never modified: readers get a consistent snapshot without the lock
+  and can index it, cache bodies under its version etc. while writes go on
+- listeners (ArrayListener) are told about every change of the cached copy,
+  so derived state (numeric stats, change feed) can be updated incrementally
+- hit / reload / check counters (see stats())
+"""
+
+import threading
+import time
+from typing import Any, Callable
+
+from repositories.array_repository import ArrayBackend, ArrayOp, apply_ops
+
+
+class ArrayListener:
+    """
+    Receives the changes of the cached copy, in order, while the cache lock
+    is held (keep the callbacks short).
+    """
+
+    def reloaded(self, version: int, items: list) -> None:
+        """The whole copy was replaced (first load, or another process wrote)."""
+
+    def applied(self, version: int, ops: list[ArrayOp]) -> None:
+        """`ops` were applied to the copy, which is now at `version`."""
+
+
+class VersionedArrayCache:
+    def __init__(self, backend: ArrayBackend, enabled: bool = True, max_staleness: float = 0.0):
+        self.backend = backend
+        self.enabled = enabled
+        self.max_staleness = max_staleness
+
+        # Serializes reloads and write-through updates (not plain cached reads)
+        self._lock = threading.Lock()
+        # (version, items); version -1 = nothing loaded / must reload
+        self._snapshot: tuple[int, list] = (-1, [])
+        self._checked_at = float("-inf")
+
+        self._listeners: list[ArrayListener] = []
+
+        self.hits = 0
+        self.reloads = 0
+        self.version_checks = 0
+
+    def add_listener(self, listener: ArrayListener) -> None:
+        self._listeners.append(listener)
+
+    @property
+    def epoch(self) -> str:
+        return self.backend.epoch
+
+    def read(self) -> tuple[int, list]:
+        """
+        (version, items) - current as of the last version check.
+        An immutable snapshot: the list is shared (callers must not modify it)
+        but never changes, and always holds exactly that version.
+        """
+        if not self.enabled:
+            self.reloads += 1
+            return self.backend.load()
+
+        if time.monotonic() - self._checked_at < self.max_staleness:
+            self.hits += 1
+            return self._snapshot
+
+        # Query outside the lock: concurrent readers do not queue behind each other
+        self.version_checks += 1
+        current = self.backend.version()
+        with self._lock:
+            # current < cached is possible after our own write-through: keep ours
+            if current > self._snapshot[0]:
+                version, items = self.backend.load()
+                self._snapshot = (version, items)
+                self.reloads += 1
+                for listener in self._listeners:
+                    listener.reloaded(version, items)
+            else:
+                self.hits += 1
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def read_locked(self, fn: Callable[[int, list], Any]) -> Any:
+        """
+        read(), then fn(version, items) with the lock held: no write lands in
+        between, and listeners see every later change. Returns fn's result.
+        """
+        while True:
+            version, items = self.read()
+            if not self.enabled:
+                # Nothing cached: the loaded copy is private to this call
+                return fn(version, items)
+            with self._lock:
+                # -1: a write from elsewhere invalidated the copy meanwhile
+                if self._snapshot[0] >= 0:
+                    return fn(*self._snapshot)
+
+    def resync(self, listener: ArrayListener) -> None:
+        """
+        Hand the current copy to `listener` (reloaded), consistently with the
+        applied() calls that follow. Used to (re)start a listener lazily.
+        """
+        self.read_locked(listener.reloaded)
+
+    def _write_through(self, version: int, ops: list[ArrayOp]) -> None:
+        # Caller holds self._lock. Apply the write to a copy if it directly
+        # follows the cached version, otherwise make the next read reload.
+        cached_version, items = self._snapshot
+        if self.enabled and cached_version >= 0 and version == cached_version + 1:
+            items = list(items)
+            apply_ops(items, ops)
+            self._snapshot = (version, items)
+            for listener in self._listeners:
+                listener.applied(version, ops)
+        else:
+            self._snapshot = (-1, [])
+            self._checked_at = float("-inf")
+
+    def append(self, value: Any, expected_version: int | None = None) -> int:
+        with self._lock:
+            version = self.backend.append(value, expected_version)
+            self._write_through(version, [("append", value)])
+            return version
+
+    def set(self, index: int, value: Any, expected_version: int | None = None) -> int | None:
+        with self._lock:
+            version = self.backend.set(index, value, expected_version)
+            if version is not None:
+                self._write_through(version, [("set", index, value)])
+            return version
+
+    def pop(self, expected_version: int | None = None) -> tuple[int, Any] | None:
+        with self._lock:
+            popped = self.backend.pop(expected_version)
+            if popped is not None:
+                self._write_through(popped[0], [("pop",)])
+            return popped
+
+    def apply(self, ops: list[ArrayOp], expected_version: int | None = None) -> tuple[int, list]:
+        with self._lock:
+            version, popped = self.backend.apply(ops, expected_version)
+            self._write_through(version, ops)
+            return version, popped
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "epoch": self.epoch,
+            "version": self._snapshot[0],
+            "size": len(self._snapshot[1]),
+            "max_staleness_seconds": self.max_staleness,
+            "hits": self.hits,
+            "reloads": self.reloads,
+            "version_checks": self.version_checks,
+        }
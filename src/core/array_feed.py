@@ -0,0 +1,286 @@
+# src/core/array_feed.py
+"""
+Live change feed of the shared array (WebSocket / SSE on /array/stream).
+
+Instead of polling GET /array for the whole list, a client subscribes once:
+it gets a snapshot (version + items), then one small "change" event per
+write, carrying the same operations the write applied (see ArrayOp).
+
+- the feed is an ArrayListener of the array cache: events are encoded once,
+  on the writer's thread, and the same text is handed to every subscriber
+- each subscriber has a bounded queue; one that falls ARRAY_FEED_QUEUE_SIZE
+  events behind is evicted (gets an "evicted" message and is disconnected)
+  instead of making the server buffer without limit
+- the last ARRAY_FEED_HISTORY events are kept, so a client that reconnects
+  with the id of the last event it saw gets only what it missed (resume);
+  when that is too old a fresh snapshot is sent instead
+- writes made by other workers / instances are picked up by a version check
+  every ARRAY_FEED_POLL_SECONDS while someone is subscribed; they arrive as
+  a new snapshot, as does everything when the cache is disabled
+
+The feed starts with the first subscriber and stops again when the last one
+leaves, so writes cost nothing extra while nobody is listening (a client that
+resumes after writes made in such a gap gets a snapshot).
+"""
+
+import asyncio
+import collections
+import logging
+import threading
+from functools import partial
+from typing import AsyncIterator
+
+from starlette.concurrency import run_in_threadpool
+
+from core.array_cache import ArrayListener, VersionedArrayCache
+from core.encoding import encode_json
+from repositories.array_repository import ArrayOp
+
+logger = logging.getLogger("app.array_feed")
+
+
+def _dumps(message: dict) -> str:
+    # WebSocket text frames / SSE lines take str
+    return encode_json(message).decode("utf-8")
+
+
+class FeedEvent:
+    """One message (snapshot / change), encoded once and shared by all subscribers."""
+
+    __slots__ = ("id", "version", "kind", "data", "_sse")
+
+    def __init__(self, epoch: str, version: int, kind: str, body: dict):
+        self.id = f"{epoch}.{version}"
+        self.version = version
+        self.kind = kind
+        self.data = _dumps({"type": kind, "id": self.id, "version": version, **body})
+        self._sse = None
+
+    @property
+    def sse(self) -> str:
+        """The event as a text/event-stream frame (built on first use)."""
+        if self._sse is None:
+            self._sse = f"id: {self.id}\nevent: {self.kind}\ndata: {self.data}\n\n"
+        return self._sse
+
+
+class FeedFull(Exception):
+    """ARRAY_FEED_MAX_SUBSCRIBERS reached."""
+
+
+class FeedSubscription:
+    def __init__(self, feed: "ArrayFeed", queue_size: int):
+        self.feed = feed
+        # None = end of the feed (evicted / server shutting down)
+        self.queue: asyncio.Queue[FeedEvent | None] = asyncio.Queue(queue_size)
+        # Snapshot or missed events, delivered before the queue
+        self.backlog: collections.deque[FeedEvent] = collections.deque()
+        self.last_version = -1
+        self.evicted = False
+
+    async def events(self, heartbeat: float | None = None) -> AsyncIterator[FeedEvent | None]:
+        """
+        Yield events in order until the feed ends. With `heartbeat`, None is
+        yielded after that many idle seconds (to keep the connection alive).
+        """
+        try:
+            while True:
+                if self.backlog:
+                    event = self.backlog.popleft()
+                else:
+                    try:
+                        event = await asyncio.wait_for(self.queue.get(), heartbeat)
+                    except asyncio.TimeoutError:
+                        yield None
+                        continue
+                if event is None:
+                    return
+                # Skip what the initial snapshot / backlog already covered
+                if event.version > self.last_version:
+                    self.last_version = event.version
+                    yield event
+        finally:
+            self.feed.unsubscribe(self)
+
+    def end_message(self) -> str:
+        """Last message before closing: tells the client how to resume."""
+        reason = "evicted" if self.evicted else "closed"
+        return _dumps({"type": reason, "resume": f"{self.feed.epoch}.{self.last_version}"})
+
+
+class ArrayFeed(ArrayListener):
+    def __init__(
+        self,
+        cache: VersionedArrayCache,
+        queue_size: int = 256,
+        history: int = 1024,
+        poll_interval: float = 1.0,
+        max_subscribers: int = 10000,
+    ):
+        self.cache = cache
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.max_subscribers = max_subscribers
+
+        # Guards version / history / snapshot. Taken inside the cache lock
+        # (listener callbacks), never the other way round.
+        self._lock = threading.Lock()
+        self.active = False
+        self.version = -1
+        self._history: collections.deque[FeedEvent] = collections.deque(maxlen=history)
+        self._snapshot: FeedEvent | None = None  # snapshot of self.version, if built
+
+        # Only touched on the event loop
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._subscribers: set[FeedSubscription] = set()
+        self._poller: asyncio.Task | None = None
+
+        self.published = 0
+        self.evictions = 0
+        self.resumes = 0
+        self.snapshots_sent = 0
+
+    @property
+    def epoch(self) -> str:
+        return self.cache.epoch
+
+    # ----- ArrayListener (called under the cache lock, on writer threads) -----
+    def reloaded(self, version: int, items: list) -> None:
+        if not self.active or version == self.version:
+            return
+        # Only worth encoding when someone is listening
+        event = self._snapshot_event(version, items) if self._subscribers else None
+        with self._lock:
+            self.version = version
+            self._history.clear()
+            self._snapshot = event
+        if event is not None:
+            self._publish(event)
+
+    def applied(self, version: int, ops: list[ArrayOp]) -> None:
+        if not self.active:
+            return
+        if version != self.version + 1:
+            # Missed a change: the next version check sends a snapshot
+            with self._lock:
+                self.version = -1
+            return
+        event = FeedEvent(self.epoch, version, "change", {"ops": ops})
+        with self._lock:
+            self.version = version
+            self._history.append(event)
+            self._snapshot = None
+        self._publish(event)
+
+    # ----- internals -----
+    def _snapshot_event(self, version: int, items: list) -> FeedEvent:
+        return FeedEvent(self.epoch, version, "snapshot", {"array": items})
+
+    def _publish(self, event: FeedEvent) -> None:
+        self.published += 1
+        if self._loop is not None:
+            # Listener callbacks run in order under the cache lock, and
+            # call_soon_threadsafe keeps that order on the loop
+            self._loop.call_soon_threadsafe(self._fan_out, event)
+
+    def _fan_out(self, event: FeedEvent) -> None:
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.evicted = True
+                self.evictions += 1
+                self._close(subscription)
+
+    def _discard(self, subscription: FeedSubscription) -> None:
+        self._subscribers.discard(subscription)
+        if not self._subscribers:
+            # Last one gone: writes stop building events. The history is kept
+            # for clients that reconnect; if writes were missed meanwhile, the
+            # next subscriber finds self.version behind and restarts it (_initial).
+            self.active = False
+
+    def _close(self, subscription: FeedSubscription) -> None:
+        # Drop what is queued: the client resumes from its last event
+        self._discard(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    def _initial(self, since: int | None, version: int, items: list) -> list[FeedEvent]:
+        # Runs under the cache lock (read_locked): consistent with later events
+        with self._lock:
+            if version != self.version:
+                # Not following the cache yet (first subscriber, missed change,
+                # cache disabled): restart the history here
+                self.version = version
+                self._history.clear()
+                self._snapshot = None
+
+            if since is not None and since <= version:
+                missed = [event for event in self._history if event.version > since]
+                if since == version or (missed and missed[0].version == since + 1):
+                    self.resumes += 1
+                    return missed
+
+            if self._snapshot is None:
+                self._snapshot = self._snapshot_event(version, items)
+            self.snapshots_sent += 1
+            return [self._snapshot]
+
+    async def _poll(self) -> None:
+        # Other processes' writes only show up through a version check
+        while self._subscribers:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await run_in_threadpool(self.cache.read_locked, self.reloaded)
+            except Exception:
+                logger.warning("Array feed: version check failed", exc_info=True)
+        self._poller = None
+
+    # ----- public (event loop) -----
+    async def subscribe(self, since: int | None = None) -> FeedSubscription:
+        """
+        New subscription. Starts with the events after version `since` when
+        they are still known, otherwise with a snapshot. Raises FeedFull.
+        """
+        if len(self._subscribers) >= self.max_subscribers:
+            raise FeedFull()
+        self._loop = asyncio.get_running_loop()
+        self.active = True
+
+        subscription = FeedSubscription(self, self.queue_size)
+        # Registered first: nothing published from now on can be missed
+        self._subscribers.add(subscription)
+        try:
+            initial = await run_in_threadpool(self.cache.read_locked, partial(self._initial, since))
+        except BaseException:
+            self._discard(subscription)
+            raise
+        subscription.backlog.extend(initial)
+        if not initial:
+            subscription.last_version = since  # already up to date
+
+        if self._poller is None and self.poll_interval > 0:
+            self._poller = asyncio.create_task(self._poll())
+        return subscription
+
+    def unsubscribe(self, subscription: FeedSubscription) -> None:
+        self._discard(subscription)
+
+    def close(self) -> None:
+        """End every subscription (server shutdown)."""
+        for subscription in list(self._subscribers):
+            self._close(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "version": self.version,
+            "subscribers": len(self._subscribers),
+            "history": len(self._history),
+            "published": self.published,
+            "snapshots_sent": self.snapshots_sent,
+            "resumes": self.resumes,
+            "evictions": self.evictions,
+        }
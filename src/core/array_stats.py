@@ -0,0 +1,176 @@
+# src/core/array_stats.py
+"""
+Numeric aggregates over the shared array (GET /array/stats).
+
+Only int / float elements count (strings are skipped). Their values are kept
+in a float64 NumPy buffer parallel to the array (NaN = not a number), updated
+as an ArrayListener of the array cache:
+- count / sum / min / max: maintained incrementally, O(1) per change
+  (min / max are recomputed with one vectorized pass only after the current
+  extreme was overwritten or popped)
+- percentiles / histogram: one vectorized pass over the buffer, computed on
+  demand and reused until the version changes
+
+The tracker starts on the first stats request (NumPy is imported then), so
+it costs nothing for deployments that never ask for stats.
+"""
+
+import math
+import threading
+from functools import cache
+
+from core.array_cache import ArrayListener, VersionedArrayCache
+from repositories.array_repository import ArrayOp
+
+
+@cache
+def _np():
+    # Imported lazily: keeps NumPy out of the app's startup path
+    import numpy
+    return numpy
+
+
+def _number(value) -> float:
+    # bool is an int subclass, but True is not a number here
+    return float(value) if type(value) in (int, float) else math.nan
+
+
+class ArrayStats(ArrayListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = False
+        self.version = -1  # -1 = not in sync with the cache
+        self._buf = None   # float64 buffer; positions >= _length are unused
+        self._length = 0
+        self._count = 0
+        self._sum = 0.0
+        self._min = math.nan
+        self._max = math.nan
+        self._extremes_stale = False
+        # (percentiles, bins) -> result, for self.version
+        self._results: dict[tuple, dict] = {}
+
+    # ----- ArrayListener (called under the cache lock) -----
+    def reloaded(self, version: int, items: list) -> None:
+        with self._lock:
+            if self.active:
+                self._rebuild(version, items)
+
+    def applied(self, version: int, ops: list[ArrayOp]) -> None:
+        with self._lock:
+            if not self.active or self.version < 0:
+                return
+            if version != self.version + 1:
+                self.version = -1  # missed a change: resync on the next request
+                return
+            for op in ops:
+                if op[0] == "append":
+                    self._grow()
+                    self._buf[self._length] = math.nan
+                    self._length += 1
+                    self._put(self._length - 1, _number(op[1]))
+                elif op[0] == "set":
+                    self._put(op[1], _number(op[2]))
+                else:
+                    self._put(self._length - 1, math.nan)
+                    self._length -= 1
+            self.version = version
+            self._results.clear()
+
+    # ----- internals (caller holds self._lock) -----
+    def _rebuild(self, version: int, items: list) -> None:
+        np = _np()
+        self._length = len(items)
+        self._buf = np.empty(max(16, 2 * self._length), dtype=np.float64)
+        if set(map(type, items)) <= {int, float}:
+            # All numbers (the common case): one C-level conversion
+            self._buf[:self._length] = items
+        else:
+            self._buf[:self._length] = np.fromiter(map(_number, items), dtype=np.float64, count=self._length)
+        numeric = self._numeric()
+        self._count = int(numeric.size)
+        self._sum = float(numeric.sum())
+        self._min = float(numeric.min()) if self._count else math.nan
+        self._max = float(numeric.max()) if self._count else math.nan
+        self._extremes_stale = False
+        self.version = version
+        self._results.clear()
+
+    def _numeric(self):
+        values = self._buf[:self._length]
+        return values[~_np().isnan(values)]
+
+    def _grow(self) -> None:
+        if self._length == len(self._buf):
+            bigger = _np().empty(2 * len(self._buf), dtype=self._buf.dtype)
+            bigger[:self._length] = self._buf[:self._length]
+            self._buf = bigger
+
+    def _put(self, position: int, number: float) -> None:
+        old = float(self._buf[position])
+        if not math.isnan(old):
+            self._count -= 1
+            self._sum -= old
+            if old <= self._min or old >= self._max:
+                self._extremes_stale = True
+        if not math.isnan(number):
+            self._count += 1
+            self._sum += number
+            if not self._extremes_stale:
+                self._min = number if self._count == 1 else min(self._min, number)
+                self._max = number if self._count == 1 else max(self._max, number)
+        self._buf[position] = number
+
+    def _result(self, percentiles: tuple[float, ...], bins: int) -> dict:
+        key = (percentiles, bins)
+        if key in self._results:
+            return self._results[key]
+
+        np = _np()
+        result = {
+            "version": self.version,
+            "length": self._length,
+            "count": self._count,
+            "sum": self._sum if self._count else 0.0,
+            "min": None,
+            "max": None,
+            "mean": None,
+            "percentiles": {},
+            "histogram": {"edges": [], "counts": []},
+        }
+        if self._count:
+            numeric = self._numeric()
+            if self._extremes_stale:
+                self._min, self._max = float(numeric.min()), float(numeric.max())
+                self._extremes_stale = False
+            counts, edges = np.histogram(numeric, bins=bins)
+            result.update(
+                min=self._min,
+                max=self._max,
+                mean=self._sum / self._count,
+                percentiles={
+                    f"p{p:g}": float(q) for p, q in zip(percentiles, np.percentile(numeric, percentiles))
+                },
+                histogram={"edges": edges.tolist(), "counts": counts.tolist()},
+            )
+        self._results[key] = result
+        return result
+
+    # ----- public -----
+    def snapshot(self, cache: VersionedArrayCache, percentiles: tuple[float, ...], bins: int) -> dict:
+        """Stats of the current array (reads through `cache`)."""
+        if not cache.enabled:
+            # No cached copy to follow: recompute when the version moves
+            version, items = cache.read()
+            with self._lock:
+                if version != self.version:
+                    self._rebuild(version, items)
+                return self._result(percentiles, bins)
+
+        self.active = True
+        if self.version < 0:
+            cache.resync(self)
+        else:
+            cache.read()  # picks up other processes' writes (-> reloaded)
+        with self._lock:
+            return self._result(percentiles, bins)
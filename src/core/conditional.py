@@ -0,0 +1,53 @@
+# src/core/conditional.py
+"""
+HTTP conditional requests for versioned resources (the shared array).
+
+The ETag of a representation is "<epoch>.<version>" (see array_repository):
+- If-None-Match: the client already has this version -> 304 Not Modified
+  (weak comparison: W/"x" matches "x")
+- If-Match: only write if the resource is still at that version -> else 412
+  (strong comparison, RFC 9110: a weak tag never matches)
+"""
+
+from fastapi import HTTPException
+
+
+def make_etag(epoch: str, version: int) -> str:
+    return f'"{epoch}.{version}"'
+
+
+def _tags(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def none_match(if_none_match: str | None, etag: str) -> bool:
+    """True if the client's copy is current (-> 304)."""
+    if not if_none_match:
+        return False
+    # Weak comparison: W/"x" and "x" are the same tag
+    tags = [tag.removeprefix("W/") for tag in _tags(if_none_match)]
+    return "*" in tags or etag in tags
+
+
+def tag_version(tag: str, epoch: str) -> int | None:
+    """The version in an "<epoch>.<version>" tag (quotes optional), None if not of this epoch."""
+    tag_epoch, _, version = tag.strip().strip('"').rpartition(".")
+    if tag_epoch == epoch and version.isdigit():
+        return int(version)
+    return None
+
+
+def expected_version(if_match: str | None, epoch: str) -> int | None:
+    """
+    The version an If-Match header requires (None = no precondition).
+    Raises 412 when no tag can match this array (other epoch, malformed).
+    """
+    if not if_match or if_match.strip() == "*":
+        return None
+    for tag in _tags(if_match):
+        if tag.startswith("W/"):
+            continue  # strong comparison: a weak tag cannot match
+        version = tag_version(tag, epoch)
+        if version is not None:
+            return version
+    raise HTTPException(status_code=412, detail="Precondition failed: If-Match does not match the array")
@@ -5,10 +5,47 @@ Everything here is *static configuration*:
 - cryptographic settings for JWTs (SECRET_KEY, ALGORITHM, EXPIRATION)
 - an admin registration secret (ADMIN_SECRET)
 - FastAPI's OAuth2 "where to get a token" declaration (oauth2_scheme)
+- tuning knobs for in-process caches (PRINCIPAL_CACHE_*)
+- the bcrypt worker pool (PASSWORD_HASH_*)
+- the shared array storage and its cache (ARRAY_*)
+- response compression of the bulk endpoints (COMPRESSION_*)
+- request metrics / Server-Timing and GET /metrics access (METRICS_*, SERVER_TIMING_ENABLED)
+- SQL accounting: query budget, slow-query log (QUERY_*, SLOW_QUERY_*)
+- application logging: level, format, queue, error rate limiting (LOG_*)
+- admin profiling of single requests and continuous sampling (PROFILE_*)
+- the production server launcher, src/serve.py (SERVER_*, PORT, THREADPOOL_SIZE)
+- admission control: per-class concurrency limits, queues, rate limits (ADMISSION_*)
+- startup behaviour (FAST_STARTUP) and the background health prober
 
 NOW WITH ENV SUPPORT:
 - You can override defaults via environment variables:
-  SECRET_KEY, ACCESS_TOKEN_EXPIRE_MINUTES, ADMIN_SECRET
+  SECRET_KEY, ACCESS_TOKEN_EXPIRE_MINUTES, ADMIN_SECRET,
+  PRINCIPAL_CACHE_ENABLED, PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS,
+  PASSWORD_HASH_WORKERS, PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_MAX_QUEUE,
+  PASSWORD_HASH_RETRY_AFTER_SECONDS, BULK_IMPORT_BATCH_SIZE,
+  USERS_PAGE_MAX_LIMIT, USERS_STREAM_BATCH_SIZE, USERS_BULK_ROLE_MAX,
+  ARRAY_STORAGE, ARRAY_CACHE_ENABLED, ARRAY_CACHE_MAX_STALENESS_SECONDS,
+  ARRAY_PAGE_MAX_LIMIT, ARRAY_MAX_INDICES, ARRAY_BATCH_MAX_OPS, ARRAY_STATS_MAX_BINS,
+  ARRAY_FEED_QUEUE_SIZE, ARRAY_FEED_HISTORY, ARRAY_FEED_POLL_SECONDS,
+  ARRAY_FEED_HEARTBEAT_SECONDS, ARRAY_FEED_MAX_SUBSCRIBERS,
+  COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY,
+  METRICS_ENABLED, SERVER_TIMING_ENABLED, METRICS_TOKEN,
+  QUERY_BUDGET_PER_REQUEST, QUERY_STATS_MAX_FINGERPRINTS,
+  SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_SAMPLE_RATE, SLOW_QUERY_LOG_SIZE,
+  LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE,
+  LOG_ERROR_BURST, LOG_ERROR_WINDOW_SECONDS, LOG_ERROR_SAMPLE_EVERY,
+  PROFILING_ENABLED, PROFILE_DIR, PROFILE_MAX_FILES, PROFILE_SAMPLE_INTERVAL_MS,
+  PROFILE_CONTINUOUS_INTERVAL_MS, PROFILE_WINDOW_SECONDS,
+  PROFILE_CONTINUOUS_MAX_SECONDS, PROFILE_CONTINUOUS_COOLDOWN_SECONDS,
+  PORT, SERVER_HOST, SERVER_WORKERS, SERVER_LOOP, SERVER_HTTP, SERVER_BACKLOG,
+  SERVER_KEEPALIVE_SECONDS, SERVER_GRACEFUL_TIMEOUT_SECONDS, THREADPOOL_SIZE,
+  ADMISSION_ENABLED, ADMISSION_AUTH_LIMIT, ADMISSION_BULK_LIMIT, ADMISSION_WRITE_LIMIT,
+  ADMISSION_READ_LIMIT, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT_MS,
+  ADMISSION_TARGET_WAIT_MS, ADMISSION_USER_RATE, ADMISSION_USER_BURST,
+  ADMISSION_LOGIN_IP_RATE, ADMISSION_LOGIN_IP_BURST, ADMISSION_FORWARDED_HOPS,
+  ADMISSION_RETRY_AFTER_SECONDS,
+  FAST_STARTUP, DB_POOL_WARM_CONNECTIONS,
+  HEALTH_CHECK_INTERVAL_SECONDS, HEALTH_CHECK_TIMEOUT_SECONDS
 """
 
 import os
@@ -33,4 +70,241 @@ ADMIN_SECRET = os.getenv("ADMIN_SECRET", "SUPER_ADMIN_SECRET")
 # Authorization: Bearer <token>
 # And that the token is obtained via POST /login.
 # (This affects docs + dependency resolution; it does NOT implement login.)
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
\ No newline at end of file
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
+
+# ===== PRINCIPAL CACHE =====
+# get_current_user keeps recently resolved users in memory so that an
+# authenticated request does not need a DB round trip every time.
+# Set PRINCIPAL_CACHE_ENABLED=0 to always hit the DB.
+PRINCIPAL_CACHE_ENABLED = os.getenv("PRINCIPAL_CACHE_ENABLED", "1") == "1"
+
+# Maximum number of users kept in the cache (least recently used are evicted).
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+
+# How long (in seconds) a cached user stays valid before it is reloaded.
+# This is also how stale a role change can be: a promote / demote invalidates
+# the cache of the worker that handled it only, so on the other workers and
+# instances a demoted admin keeps admin rights for up to this long.
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "5"))
+
+
+# ===== PASSWORD HASHING POOL =====
+# bcrypt hashing / verification runs in a dedicated executor so that a login
+# burst cannot occupy FastAPI's shared threadpool.
+# Number of hashing workers. 0 = hash inline in the request thread (no pool).
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+
+# "thread" (bcrypt releases the GIL) or "process".
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+
+# Max hashing jobs waiting for a worker. Beyond that requests get 503.
+# Keep workers + queue well below the anyio threadpool size (40 by default),
+# otherwise waiting callers can still starve cheap endpoints.
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "16"))
+
+# Value of the Retry-After header (seconds) sent with the 503.
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", "1"))
+
+
+# ===== BULK USER IMPORT =====
+# Rows hashed + inserted per round trip by POST /users/import.
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "1000"))
+
+
+# ===== USER LISTING =====
+# Max page size for GET /users?limit=..., and rows fetched per round trip
+# (and per response chunk) in streaming mode (GET /users?stream=true).
+USERS_PAGE_MAX_LIMIT = int(os.getenv("USERS_PAGE_MAX_LIMIT", "1000"))
+USERS_STREAM_BATCH_SIZE = int(os.getenv("USERS_STREAM_BATCH_SIZE", "1000"))
+
+# ===== BULK ROLE CHANGES =====
+# Max usernames per PUT /users/promote or /users/demote (one UPDATE statement).
+USERS_BULK_ROLE_MAX = int(os.getenv("USERS_BULK_ROLE_MAX", "1000"))
+
+
+# ===== ARRAY STORAGE =====
+# Where the shared array (/array) lives:
+#   "memory"   - a list in each process (demo; not shared between workers)
+#   "database" - the array_items / array_meta tables (shared, persistent)
+ARRAY_STORAGE = os.getenv("ARRAY_STORAGE", "memory")
+
+# Versioned in-process cache in front of the storage (see core/array_cache).
+ARRAY_CACHE_ENABLED = os.getenv("ARRAY_CACHE_ENABLED", "1") == "1"
+# How long a cached copy may be served before the version is checked again.
+# 0 = check on every read (one tiny query); >0 = writes made by other
+# workers become visible after at most this many seconds.
+ARRAY_CACHE_MAX_STALENESS_SECONDS = float(os.getenv("ARRAY_CACHE_MAX_STALENESS_SECONDS", "0"))
+
+# Max page size for GET /array?limit=..., and max indices per GET /array/items.
+ARRAY_PAGE_MAX_LIMIT = int(os.getenv("ARRAY_PAGE_MAX_LIMIT", "10000"))
+ARRAY_MAX_INDICES = int(os.getenv("ARRAY_MAX_INDICES", "1000"))
+# Max operations per POST /array/batch (applied in one transaction).
+ARRAY_BATCH_MAX_OPS = int(os.getenv("ARRAY_BATCH_MAX_OPS", "100000"))
+# Max histogram bins for GET /array/stats.
+ARRAY_STATS_MAX_BINS = int(os.getenv("ARRAY_STATS_MAX_BINS", "1000"))
+
+# Change feed (/array/stream, see core/array_feed).
+# Events a subscriber may fall behind before it is disconnected.
+ARRAY_FEED_QUEUE_SIZE = int(os.getenv("ARRAY_FEED_QUEUE_SIZE", "256"))
+# Recent events kept so reconnecting clients can resume without a snapshot.
+ARRAY_FEED_HISTORY = int(os.getenv("ARRAY_FEED_HISTORY", "1024"))
+# Version check interval while someone is subscribed (writes made by other
+# workers / instances). 0 = only this process' writes are streamed.
+ARRAY_FEED_POLL_SECONDS = float(os.getenv("ARRAY_FEED_POLL_SECONDS", "1"))
+# SSE keep-alive comment after this many idle seconds.
+ARRAY_FEED_HEARTBEAT_SECONDS = float(os.getenv("ARRAY_FEED_HEARTBEAT_SECONDS", "15"))
+# Max concurrent subscribers per process (beyond that: 503).
+ARRAY_FEED_MAX_SUBSCRIBERS = int(os.getenv("ARRAY_FEED_MAX_SUBSCRIBERS", "10000"))
+
+
+# ===== RESPONSE COMPRESSION =====
+# GET /array and GET /users are compressed (br / gzip, per Accept-Encoding)
+# when the body is at least this many bytes.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# gzip level 1-9 and brotli quality 0-11: higher = smaller but slower.
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+
+# ===== REQUEST METRICS =====
+# Per-route latency / status / in-flight metrics and timing spans (jwt, bcrypt,
+# db, encode) for every request. Set METRICS_ENABLED=0 to skip the middleware.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Send the spans back as a Server-Timing header (browser dev tools show them).
+# Only to admins and METRICS_TOKEN callers, never on POST /login or POST /users:
+# the timings would reveal which usernames exist.
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "0") == "1"
+
+# GET /metrics (Prometheus) normally needs an admin JWT, which expires.
+# With METRICS_TOKEN set it needs "Authorization: Bearer <METRICS_TOKEN>" instead
+# (bearer_token / authorization in the Prometheus scrape config).
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+# ===== SQL QUERY ACCOUNTING =====
+# Every statement is timed and counted per request / route (core.query_stats).
+# Requests running more statements than this are counted per route and logged.
+QUERY_BUDGET_PER_REQUEST = int(os.getenv("QUERY_BUDGET_PER_REQUEST", "10"))
+
+# Distinct normalized statements kept for GET /metrics/queries (others: "<other>").
+QUERY_STATS_MAX_FINGERPRINTS = int(os.getenv("QUERY_STATS_MAX_FINGERPRINTS", "1000"))
+
+# Statements taking at least this long are slow; SLOW_QUERY_SAMPLE_RATE (0..1)
+# of them are logged and kept (the last SLOW_QUERY_LOG_SIZE).
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+
+
+# ===== LOGGING =====
+# App logs go through a queue to a background thread (core.app_logging),
+# as JSON lines ("json") or readable text for local development ("text").
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+# Records waiting for the writer thread; beyond that they are dropped (and
+# counted) instead of slowing down requests.
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Identical warnings / errors: the first LOG_ERROR_BURST per window are
+# logged, then one in LOG_ERROR_SAMPLE_EVERY (0 = none) until the window ends.
+LOG_ERROR_BURST = int(os.getenv("LOG_ERROR_BURST", "5"))
+LOG_ERROR_WINDOW_SECONDS = float(os.getenv("LOG_ERROR_WINDOW_SECONDS", "10"))
+LOG_ERROR_SAMPLE_EVERY = int(os.getenv("LOG_ERROR_SAMPLE_EVERY", "100"))
+
+
+# ===== PROFILING =====
+# Admins can profile one request with ?profile=1 or "X-Profile: 1" (core.profiling):
+# its stacks are sampled every PROFILE_SAMPLE_INTERVAL_MS and saved as
+# collapsed stacks in PROFILE_DIR (newest PROFILE_MAX_FILES kept).
+# PROFILING_ENABLED=0 removes the middleware (and ignores the flag).
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "1") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "100"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))
+
+# Continuous sampling (POST /metrics/profiles/continuous): coarser interval,
+# one file per window, runs at most PROFILE_CONTINUOUS_MAX_SECONDS and can
+# only be started again PROFILE_CONTINUOUS_COOLDOWN_SECONDS after the last start.
+PROFILE_CONTINUOUS_INTERVAL_MS = float(os.getenv("PROFILE_CONTINUOUS_INTERVAL_MS", "10"))
+PROFILE_WINDOW_SECONDS = float(os.getenv("PROFILE_WINDOW_SECONDS", "10"))
+PROFILE_CONTINUOUS_MAX_SECONDS = float(os.getenv("PROFILE_CONTINUOUS_MAX_SECONDS", "300"))
+PROFILE_CONTINUOUS_COOLDOWN_SECONDS = float(os.getenv("PROFILE_CONTINUOUS_COOLDOWN_SECONDS", "600"))
+
+
+# ===== SERVER (src/serve.py) =====
+# Listening address; Cloud Run passes the port in PORT.
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("PORT", "8000"))
+
+# Worker processes. 0 = one per CPU of the container's CPU quota.
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "0"))
+
+# "auto" = uvloop / httptools when installed, else asyncio / h11.
+SERVER_LOOP = os.getenv("SERVER_LOOP", "auto")
+SERVER_HTTP = os.getenv("SERVER_HTTP", "auto")
+
+# Pending connections the kernel queues for accept() during a burst.
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+
+# Idle keep-alive connections are closed after this many seconds. Longer
+# than uvicorn's 5s, so clients / proxies reuse connections between requests.
+SERVER_KEEPALIVE_SECONDS = int(os.getenv("SERVER_KEEPALIVE_SECONDS", "75"))
+
+# After SIGTERM, running requests get this long to finish before they are
+# cancelled (Cloud Run kills the container 10s after SIGTERM).
+SERVER_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("SERVER_GRACEFUL_TIMEOUT_SECONDS", "8"))
+
+# Threads per worker for sync endpoints / dependencies (anyio's default is 40).
+# Keep it above PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_QUEUE and at least
+# DB_POOL_SIZE + DB_MAX_OVERFLOW, so threads do not queue for connections.
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+
+
+# ===== ADMISSION CONTROL =====
+# Concurrent requests per class and worker (core.admission): auth (bcrypt:
+# login, registration), bulk (whole array / user list, batches, import, bulk roles),
+# write (other admin writes) and read (the rest). ADMISSION_ENABLED=0 turns
+# the middleware off (and the per-user rate limit with it).
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_AUTH_LIMIT = int(os.getenv("ADMISSION_AUTH_LIMIT", "16"))
+ADMISSION_BULK_LIMIT = int(os.getenv("ADMISSION_BULK_LIMIT", "4"))
+ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", "16"))
+ADMISSION_READ_LIMIT = int(os.getenv("ADMISSION_READ_LIMIT", "64"))
+
+# Requests waiting for a slot, per class, and how long they may wait; beyond
+# that: 503 + Retry-After. When the average wait goes above the target, new
+# requests of the class are rejected instead of queued until waits drop.
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "100"))
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "1000"))
+ADMISSION_TARGET_WAIT_MS = float(os.getenv("ADMISSION_TARGET_WAIT_MS", "100"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+
+# Token buckets (requests per second, burst; rate 0 = no limit) -> 429:
+# per user (JWT sub) on authenticated requests, per client IP on login and on
+# registration (separate buckets). The client IP is the ADMISSION_FORWARDED_HOPS-th
+# X-Forwarded-For entry from the right: 1 = behind one proxy (Cloud Run's front
+# end). With 0 the peer address is used - behind a proxy that is the proxy, and
+# all clients would share one bucket; only use 0 when clients connect directly
+# (with 1 they could pick their own IP by sending X-Forwarded-For).
+ADMISSION_USER_RATE = float(os.getenv("ADMISSION_USER_RATE", "50"))
+ADMISSION_USER_BURST = float(os.getenv("ADMISSION_USER_BURST", "100"))
+ADMISSION_LOGIN_IP_RATE = float(os.getenv("ADMISSION_LOGIN_IP_RATE", "1"))
+ADMISSION_LOGIN_IP_BURST = float(os.getenv("ADMISSION_LOGIN_IP_BURST", "20"))
+ADMISSION_FORWARDED_HOPS = int(os.getenv("ADMISSION_FORWARDED_HOPS", "1"))
+
+
+# ===== STARTUP =====
+# FAST_STARTUP=1 (production on Cloud Run): the schema is managed out of band,
+# so startup skips Base.metadata.create_all, does not block on a DB check, and
+# warms DB_POOL_WARM_CONNECTIONS pooled connections in the background instead.
+FAST_STARTUP = os.getenv("FAST_STARTUP", "0") == "1"
+DB_POOL_WARM_CONNECTIONS = int(os.getenv("DB_POOL_WARM_CONNECTIONS", "2"))
+
+
+# ===== HEALTH PROBER =====
+# A background task checks the DB every HEALTH_CHECK_INTERVAL_SECONDS and
+# caches the result for /, /livez and /readyz (probes never touch the pool).
+HEALTH_CHECK_INTERVAL_SECONDS = float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "10"))
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "3"))
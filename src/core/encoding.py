@@ -0,0 +1,283 @@
+# src/core/encoding.py
+"""
+Response encoding: the app-wide JSON encoder, plus formats and compression
+for the bulk endpoints (GET /array, GET /users).
+
+JSON everywhere goes through encode_json (orjson, stdlib json as fallback):
+- FastJSONResponse: the app's default response class (and error responses)
+- model_response: returns pydantic objects the services already built,
+  serialized by pydantic-core - without FastAPI's response_model round trip
+  (dump to dicts, validate again, serialize, json.dumps)
+
+Content negotiation (Accept):
+- application/json (default)
+- application/msgpack (or application/x-msgpack): same structure as the JSON
+- application/vnd.apache.arrow.stream: an Arrow IPC stream, one column per field
+  (the array: a single "value" column, typed when all elements share a type,
+  otherwise a dense union of int / float / str)
+An Accept header that allows none of these -> 406, and so does an array with
+integers beyond 64 bits in msgpack / Arrow (JSON has no such limit).
+
+Compression (Accept-Encoding): br or gzip, only for bodies of at least
+COMPRESSION_MIN_SIZE bytes (small bodies are not worth the CPU).
+
+msgpack, pyarrow and brotli are imported on first use; a format whose
+library is not installed is simply not offered.
+
+Serialization and compression are timed as "encode" / "compress" spans
+(core.request_metrics: Server-Timing, GET /metrics).
+"""
+
+import array
+import gzip
+import importlib
+import importlib.util
+import json
+from functools import cache
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+from core.config import COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY
+from core.request_metrics import span
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used instead
+    orjson = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+_ALIASES = {"application/x-msgpack": MSGPACK}
+# Library behind each optional format / encoding
+_REQUIRES = {MSGPACK: "msgpack", ARROW: "pyarrow", "br": "brotli"}
+
+# Bodies vary with both headers: shared caches must key on them
+VARY = "Accept, Accept-Encoding"
+
+
+@cache
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+@cache
+def _module(name: str):
+    # Imported lazily: none of these is needed for plain JSON responses
+    return importlib.import_module(name)
+
+
+def _offered(candidates: tuple[str, ...]) -> list[str]:
+    return [c for c in candidates if c not in _REQUIRES or _installed(_REQUIRES[c])]
+
+
+# ----- negotiation -----
+def _parse(header: str) -> list[tuple[str, float]]:
+    """'a/b;q=0.5, c/d' -> [("a/b", 0.5), ("c/d", 1.0)]"""
+    ranges = []
+    for part in header.split(","):
+        value, *params = [p.strip() for p in part.split(";")]
+        if not value:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, number = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        ranges.append((_ALIASES.get(value.lower(), value.lower()), q))
+    return ranges
+
+
+def _best(ranges: list[tuple[str, float]], offered: list[str], wildcards) -> str | None:
+    # Rank each offered value by its most specific matching range:
+    # (q, specificity, earlier in the client's list); ties keep our order
+    best, best_rank = None, None
+    for value in offered:
+        match = None
+        for index, (pattern, q) in enumerate(ranges):
+            specificity = 2 if pattern == value else 1 if pattern in wildcards(value) else None
+            if specificity is not None and (match is None or specificity > match[1]):
+                match = (q, specificity, -index)
+        if match is not None and match[0] > 0 and (best_rank is None or match > best_rank):
+            best, best_rank = value, match
+    return best
+
+
+def negotiate_media_type(accept: str | None) -> str:
+    """The response format for an Accept header (406 if none is acceptable)."""
+    if not accept:
+        return JSON
+    offered = _offered((JSON, MSGPACK, ARROW))
+    media_type = _best(
+        _parse(accept), offered,
+        lambda value: ("*/*", value.split("/")[0] + "/*"),
+    )
+    if media_type is None:
+        raise HTTPException(status_code=406, detail=f"Supported formats: {', '.join(offered)}")
+    return media_type
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """"br", "gzip" or None (identity) for an Accept-Encoding header."""
+    if not accept_encoding:
+        return None
+    return _best(_parse(accept_encoding), _offered(("br", "gzip")), lambda value: ("*",))
+
+
+# ----- encoders -----
+def _json_default(value):
+    # Models nested in dicts / lists (e.g. {"items": [UserOut, ...]})
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_json(content) -> bytes:
+    """Compact UTF-8 JSON (same output as JSONResponse.render, only faster)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # e.g. an integer beyond 64 bits: stdlib json handles it
+    return json.dumps(
+        content, default=_json_default, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by encode_json."""
+
+    def render(self, content) -> bytes:
+        with span("encode"):
+            return encode_json(content)
+
+
+@cache
+def _list_adapter(model: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[model])
+
+
+def dump_models(content: BaseModel | list[BaseModel]) -> bytes:
+    """JSON of a model or a list of models of one type, by pydantic-core (no validation)."""
+    with span("encode"):
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        if not content:
+            return b"[]"
+        return _list_adapter(type(content[0])).dump_json(content)
+
+
+def model_response(
+    content: BaseModel | list[BaseModel],
+    status_code: int = 200,
+    headers: dict | None = None,
+) -> Response:
+    """
+    Response for objects that are already instances of the route's
+    response_model (which still documents the endpoint in OpenAPI).
+    """
+    return Response(dump_models(content), status_code=status_code, media_type="application/json", headers=headers)
+
+
+def _arrow_ipc(columns: dict) -> bytes:
+    pa = _module("pyarrow")
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+_UNION_CODES = {int: 0, float: 1, str: 2}
+
+
+def _arrow_values(items: list):
+    pa = _module("pyarrow")
+    types = set(map(type, items))
+    if types <= {float}:
+        return pa.array(items, type=pa.float64())
+    if types == {int}:
+        return pa.array(items, type=pa.int64())
+    if types == {str}:
+        return pa.array(items, type=pa.string())
+
+    # Mixed: dense union, each element stored in the child of its type
+    children = ([], [], [])
+    type_ids = bytearray(len(items))
+    offsets = array.array("i", bytes(4 * len(items)))
+    for position, value in enumerate(items):
+        code = _UNION_CODES[type(value)]
+        child = children[code]
+        type_ids[position] = code
+        offsets[position] = len(child)
+        child.append(value)
+    return pa.UnionArray.from_dense(
+        pa.Array.from_buffers(pa.int8(), len(items), [None, pa.py_buffer(type_ids)]),
+        pa.Array.from_buffers(pa.int32(), len(items), [None, pa.py_buffer(offsets)]),
+        [pa.array(children[0], pa.int64()), pa.array(children[1], pa.float64()), pa.array(children[2], pa.string())],
+        ["int", "float", "str"],
+    )
+
+
+def encode_array(items: list, media_type: str) -> bytes:
+    """The array ({"array": [...]} / msgpack of the same / Arrow "value" column)."""
+    with span("encode"):
+        try:
+            if media_type == ARROW:
+                return _arrow_ipc({"value": _arrow_values(items)})
+            if media_type == MSGPACK:
+                return _module("msgpack").packb({"array": items})
+        except OverflowError:
+            # Python ints are unbounded; Arrow int64 and msgpack stop at 64 bits
+            raise HTTPException(
+                status_code=406, detail=f"The array holds integers too large for {media_type}; use {JSON}"
+            )
+        return encode_json({"array": items})
+
+
+def encode_records(records: list[dict], media_type: str, arrow_types: dict[str, str]) -> bytes:
+    """
+    A list of flat objects. For Arrow, `arrow_types` maps each field to a
+    pyarrow type name ("string", "bool_", ...) and the list becomes columns.
+    """
+    with span("encode"):
+        if media_type == ARROW:
+            pa = _module("pyarrow")
+            return _arrow_ipc({
+                name: pa.array([r[name] for r in records], type=getattr(pa, type_name)())
+                for name, type_name in arrow_types.items()
+            })
+        if media_type == MSGPACK:
+            return _module("msgpack").packb(records)
+        return encode_json(records)
+
+
+# ----- compression -----
+def compress(body: bytes, encoding: str | None) -> tuple[bytes, str | None]:
+    """(body, Content-Encoding): compressed when worth it and accepted."""
+    if encoding is None or len(body) < COMPRESSION_MIN_SIZE:
+        return body, None
+    with span("compress"):
+        if encoding == "br":
+            return _module("brotli").compress(body, quality=COMPRESSION_BROTLI_QUALITY), "br"
+        # mtime=0: the same body always compresses to the same bytes
+        return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0), "gzip"
+
+
+def encoded_response(
+    body: bytes,
+    media_type: str,
+    content_encoding: str | None,
+    headers: dict | None = None,
+    status_code: int = 200,
+) -> Response:
+    headers = {**(headers or {}), "Vary": VARY}
+    if content_encoding is not None:
+        headers["Content-Encoding"] = content_encoding
+    return Response(body, status_code=status_code, media_type=media_type, headers=headers)
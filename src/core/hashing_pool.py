@@ -0,0 +1,133 @@
+# src/core/hashing_pool.py
+"""
+Dedicated, bounded executor for password hashing (bcrypt).
+
+bcrypt is deliberately slow (~250ms per call). Running it directly inside
+FastAPI's shared threadpool means a login burst can occupy every thread and
+stall cheap endpoints. Instead, password work is submitted here:
+
+- a fixed number of workers (threads or processes, PASSWORD_HASH_*)
+- at most `max_queue` jobs waiting on top of the running ones
+- when full -> HTTP 503 with a Retry-After header (backpressure)
+  instead of queueing forever
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from core.config import (
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_EXECUTOR,
+    PASSWORD_HASH_MAX_QUEUE,
+    PASSWORD_HASH_RETRY_AFTER_SECONDS,
+)
+
+
+class BoundedExecutor:
+    def __init__(self, workers: int, max_queue: int, kind: str = "thread", retry_after: int = 1):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self.retry_after = retry_after
+
+        # One slot per running job plus one per waiting job
+        self._slots = threading.BoundedSemaphore(workers + max_queue) if workers > 0 else None
+        self._executor: Executor | None = None
+        self._executor_lock = threading.Lock()
+
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        # Created lazily so importing the app does not spawn workers
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers, thread_name_prefix="password-hash"
+                        )
+        return self._executor
+
+    def _acquire_slot(self) -> None:
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+    def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run fn(*args) on the pool and wait for the result.
+        Raises 503 immediately if the pool and its queue are full.
+        """
+        if self._slots is None:
+            return fn(*args)
+
+        self._acquire_slot()
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    async def run_async(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Same as run(), for async callers: awaits the worker without blocking
+        the event loop or holding a threadpool thread.
+        """
+        if self._slots is None:
+            return await run_in_threadpool(fn, *args)
+
+        self._acquire_slot()
+        try:
+            return await asyncio.wrap_future(self._get_executor().submit(fn, *args))
+        finally:
+            self._slots.release()
+
+    def map(self, fn: Callable[[Any], Any], items: list, max_in_flight: int | None = None) -> list:
+        """
+        Run fn(item) for many items in parallel (bulk jobs, e.g. user import).
+        Waits for free slots instead of failing with 503, and keeps at most
+        `max_in_flight` (default: number of workers) slots so interactive
+        callers (login / register) still find room in the queue.
+        """
+        if self._slots is None:
+            return [fn(item) for item in items]
+
+        executor = self._get_executor()
+        in_flight = threading.BoundedSemaphore(max_in_flight or self.workers)
+
+        def release(_future):
+            self._slots.release()
+            in_flight.release()
+
+        futures = []
+        for item in items:
+            in_flight.acquire()
+            self._slots.acquire()
+            future = executor.submit(fn, item)
+            future.add_done_callback(release)
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Process-wide pool used by core.security
+password_pool = BoundedExecutor(
+    workers=PASSWORD_HASH_WORKERS,
+    max_queue=PASSWORD_HASH_MAX_QUEUE,
+    kind=PASSWORD_HASH_EXECUTOR,
+    retry_after=PASSWORD_HASH_RETRY_AFTER_SECONDS,
+)
@@ -0,0 +1,83 @@
+# src/core/health.py
+"""
+Background DB health prober.
+
+Probes (load balancer, Docker HEALTHCHECK, monitoring) must not open DB
+connections themselves: a DB hiccup would turn into slow probes, and probe
+traffic would compete with real requests for the tiny connection pool.
+Instead, one background task runs SELECT 1 every HEALTH_CHECK_INTERVAL_SECONDS
+(primary + read replicas) and caches the result; /, /livez and /readyz only
+read that cached state.
+"""
+
+import asyncio
+import time
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from core.config import HEALTH_CHECK_INTERVAL_SECONDS, HEALTH_CHECK_TIMEOUT_SECONDS
+from database import engine, replicas
+
+
+class DBHealth:
+    def __init__(self):
+        self.ok: bool | None = None  # None = not checked yet
+        self.error: str | None = None
+        self.latency_ms: float | None = None
+        self.checked_at: float | None = None  # time.monotonic()
+
+    def record(self, ok: bool, latency_ms: float | None, error: str | None = None) -> None:
+        self.ok = ok
+        self.latency_ms = latency_ms
+        self.error = error
+        self.checked_at = time.monotonic()
+
+    @property
+    def stale(self) -> bool:
+        # Several missed checks in a row -> the prober itself is stuck
+        return self.checked_at is None or time.monotonic() - self.checked_at > 3 * HEALTH_CHECK_INTERVAL_SECONDS
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.ok) and not self.stale
+
+    def snapshot(self) -> dict:
+        return {
+            "ok": self.ok,
+            "latency_ms": self.latency_ms,
+            "error": self.error,
+            "age_seconds": None if self.checked_at is None else round(time.monotonic() - self.checked_at, 3),
+        }
+
+
+db_health = DBHealth()
+
+
+def _ping(target) -> None:
+    with target.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+async def check_once() -> None:
+    """Probe the primary (-> db_health) and every replica (-> replica routing)."""
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(run_in_threadpool(_ping, engine), HEALTH_CHECK_TIMEOUT_SECONDS)
+        db_health.record(True, (time.perf_counter() - started) * 1000)
+    except Exception as e:
+        db_health.record(False, None, str(e) or type(e).__name__)
+
+    for index, replica in enumerate(replicas.engines):
+        try:
+            await asyncio.wait_for(run_in_threadpool(_ping, replica), HEALTH_CHECK_TIMEOUT_SECONDS)
+            replicas.mark_healthy(index)
+        except Exception:
+            replicas.mark_unhealthy(index)
+
+
+async def run_prober() -> None:
+    """Background loop started by the app lifespan (cancelled on shutdown)."""
+    while True:
+        await check_once()
+        await asyncio.sleep(HEALTH_CHECK_INTERVAL_SECONDS)
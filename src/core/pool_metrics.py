@@ -0,0 +1,136 @@
+# src/core/pool_metrics.py
+"""
+Connection pool statistics for the SQLAlchemy engines.
+
+For every instrumented engine we record, through SQLAlchemy pool events:
+- connects / checkouts / checkins / invalidations
+- connections currently checked out (and overflow, for QueuePool)
+and, through a thin pool subclass (SQLAlchemy has no "before checkout" event):
+- how long callers waited for a connection (histogram) and pool timeouts
+
+database.py instruments its engines; GET /metrics/pool exposes snapshot().
+"""
+
+import threading
+import time
+
+from sqlalchemy import event, exc as sa_exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+# Upper bounds (seconds) of the checkout wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+
+
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.engine: Engine | None = None
+        self._lock = threading.Lock()
+
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+
+        # Non-cumulative counts per bucket; the last slot is +Inf
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self.wait_count = 0
+        self.wait_sum = 0.0
+
+    def count(self, counter: str) -> None:
+        """+1 on connects / checkouts / ... (pool events fire on many threads)."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def observe_wait(self, seconds: float) -> None:
+        with self._lock:
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+            self.wait_count += 1
+            self.wait_sum += seconds
+
+    def snapshot(self) -> dict:
+        pool = self.engine.pool if self.engine is not None else None
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip((*WAIT_BUCKETS, float("inf")), self.wait_buckets):
+                cumulative += count
+                buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+            return {
+                "pool_class": type(pool).__name__ if pool is not None else None,
+                "pool_size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": self.checkouts - self.checkins,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_seconds": {
+                    "count": self.wait_count,
+                    "sum": self.wait_sum,
+                    "buckets": buckets,
+                },
+            }
+
+
+# engine name ("primary", "primary-async", ...) -> metrics
+registry: dict[str, PoolMetrics] = {}
+
+
+def metrics_for(name: str) -> PoolMetrics:
+    if name not in registry:
+        registry[name] = PoolMetrics(name)
+    return registry[name]
+
+
+def timed_pool_class(base: type[Pool], metrics: PoolMetrics) -> type[Pool]:
+    """
+    Subclass of `base` that times every wait for a connection.
+    Pool.recreate() (engine.dispose) re-uses self.__class__, so timing survives.
+    """
+
+    class TimedPool(base):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return super()._do_get()
+            except sa_exc.TimeoutError:
+                metrics.count("timeouts")
+                raise
+            finally:
+                metrics.observe_wait(time.perf_counter() - started)
+
+    TimedPool.__name__ = TimedPool.__qualname__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+def instrument_engine(engine: Engine, metrics: PoolMetrics) -> None:
+    """Attach the pool event listeners (pass AsyncEngine.sync_engine for async)."""
+    metrics.engine = engine
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.count("connects")
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.count("checkouts")
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        metrics.count("checkins")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.count("invalidations")
+
+
+def snapshot() -> dict:
+    return {name: m.snapshot() for name, m in registry.items()}
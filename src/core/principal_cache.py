@@ -0,0 +1,210 @@
+# src/core/principal_cache.py
+"""
+In-process cache of authenticated principals.
+
+get_current_user used to hit the DB on every authenticated request just to
+confirm that the user from the JWT still exists (and to read is_admin).
+This module keeps those answers in memory:
+
+- bounded LRU (PRINCIPAL_CACHE_SIZE entries) with a TTL per entry
+- single-flight: concurrent misses for the same username share ONE DB query
+  (threads via get(), coroutines via get_async())
+- explicit invalidation, called by UserRepository whenever a user row changes -
+  in this process only: other workers / instances see a role change (or a
+  deleted user) when their entry expires, i.e. after PRINCIPAL_CACHE_TTL_SECONDS
+- hit / miss / coalesced / eviction counters (see stats())
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from core.config import (
+    PRINCIPAL_CACHE_ENABLED,
+    PRINCIPAL_CACHE_SIZE,
+    PRINCIPAL_CACHE_TTL_SECONDS,
+)
+from schemas.user_schema import UserOut
+
+
+class _Flight:
+    """A DB load in progress; followers wait on `done` and reuse the result."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: UserOut | None = None
+        self.error: BaseException | None = None
+        # Set by invalidate() while the load is running -> result is not cached.
+        self.stale = False
+
+
+class _AsyncFlight:
+    """Async variant of _Flight: followers await `future`."""
+
+    def __init__(self):
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.stale = False
+
+
+class PrincipalCache:
+    def __init__(self, maxsize: int, ttl_seconds: float, enabled: bool = True):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled and maxsize > 0 and ttl_seconds > 0
+
+        self._lock = threading.Lock()
+        # username -> (expires_at, UserOut), oldest first
+        self._entries: OrderedDict[str, tuple[float, UserOut]] = OrderedDict()
+        self._inflight: dict[str, _Flight] = {}
+        self._async_inflight: dict[str, _AsyncFlight] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, username: str, loader: Callable[[], UserOut | None]) -> UserOut | None:
+        """
+        Return the cached principal for `username`, or call `loader` once
+        (even under concurrent misses) and cache what it returns.
+        Unknown users (loader returns None) are never cached.
+        """
+        if not self.enabled:
+            return loader()
+
+        with self._lock:
+            cached = self._lookup(username)
+            if cached is not None:
+                return cached
+
+            flight = self._inflight.get(username)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[username] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(username, None)
+                if flight.error is None and flight.value is not None and not flight.stale:
+                    self._store(username, flight.value)
+            flight.done.set()
+
+        return flight.value
+
+    async def get_async(
+        self, username: str, loader: Callable[[], Awaitable[UserOut | None]]
+    ) -> UserOut | None:
+        """
+        Same as get(), for the async stack: `loader` is awaited once and
+        concurrent coroutines missing on the same username await its result.
+        """
+        if not self.enabled:
+            return await loader()
+
+        with self._lock:
+            cached = self._lookup(username)
+            if cached is not None:
+                return cached
+
+            flight = self._async_inflight.get(username)
+            leader = flight is None
+            if leader:
+                flight = _AsyncFlight()
+                self._async_inflight[username] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            # shield: a cancelled follower must not cancel the shared load
+            return await asyncio.shield(flight.future)
+
+        try:
+            value = await loader()
+        except BaseException as e:
+            with self._lock:
+                self._async_inflight.pop(username, None)
+            flight.future.set_exception(e)
+            # Mark as retrieved so an unawaited failure is not logged
+            flight.future.exception()
+            raise
+
+        with self._lock:
+            self._async_inflight.pop(username, None)
+            if value is not None and not flight.stale:
+                self._store(username, value)
+        flight.future.set_result(value)
+        return value
+
+    def _lookup(self, username: str) -> UserOut | None:
+        # Caller holds self._lock
+        entry = self._entries.get(username)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[username]
+            return None
+        self._entries.move_to_end(username)
+        self.hits += 1
+        return entry[1]
+
+    def _store(self, username: str, value: UserOut) -> None:
+        # Caller holds self._lock
+        self._entries[username] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(username)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, username: str) -> None:
+        """Drop a user (e.g. after create / role change / delete)."""
+        with self._lock:
+            self._entries.pop(username, None)
+            for inflight in (self._inflight, self._async_inflight):
+                flight = inflight.get(username)
+                if flight is not None:
+                    flight.stale = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            for flight in (*self._inflight.values(), *self._async_inflight.values()):
+                flight.stale = True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+            }
+
+
+# Process-wide instance used by get_current_user and UserRepository
+principal_cache = PrincipalCache(
+    maxsize=PRINCIPAL_CACHE_SIZE,
+    ttl_seconds=PRINCIPAL_CACHE_TTL_SECONDS,
+    enabled=PRINCIPAL_CACHE_ENABLED,
+)
@@ -0,0 +1,381 @@
+# src/core/profiling.py
+"""
+Sampling profiler for production: where does the time of a slow request go
+(get_current_user, controller / service / repository, serialization)?
+
+A background thread takes the Python stack of every busy thread every few
+milliseconds (sys._current_frames; threads waiting in a selector, a lock or
+a queue are idle and skipped) and counts identical stacks. The result is
+written in the "collapsed stacks" format
+
+    MainThread;asyncio/base_events.py:BaseEventLoop.run_forever;...;routers/users.py:list_all_users 12
+
+which speedscope (https://www.speedscope.app), flamegraph.pl or inferno turn
+into a flame graph. The event loop thread and the threadpool / hashing
+threads a request hands work to all show up, labelled with their thread name.
+
+Two modes, admin only, files in PROFILE_DIR (the newest PROFILE_MAX_FILES
+are kept), listed and downloaded through GET /metrics/profiles[/<name>]:
+- one request: add ?profile=1 or "X-Profile: 1" to an authenticated request.
+  Sampling starts with the request (so get_current_user is included), but
+  only for a valid admin JWT - other requests run unprofiled; get_current_user
+  answers 403 if the user is no longer an admin. The response carries
+  "X-Profile: /metrics/profiles/<name>". One request at a time per process;
+  while another one is profiled the request just runs unprofiled.
+- continuous: POST /metrics/profiles/continuous?seconds=N samples everything
+  the process does at PROFILE_CONTINUOUS_INTERVAL_MS, one file per
+  PROFILE_WINDOW_SECONDS, for at most PROFILE_CONTINUOUS_MAX_SECONDS. A new
+  run cannot start within PROFILE_CONTINUOUS_COOLDOWN_SECONDS of the last.
+
+Other requests running at the same time are sampled too: profile on a quiet
+instance, or compare against a profile of the same request under no load.
+Profiles are per process (with several workers, the one that served the request).
+"""
+
+import collections
+import logging
+import os
+import re
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Callable
+from urllib.parse import parse_qsl
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+
+from core.config import (
+    SECRET_KEY,
+    ALGORITHM,
+    PROFILE_DIR,
+    PROFILE_MAX_FILES,
+    PROFILE_SAMPLE_INTERVAL_MS,
+    PROFILE_CONTINUOUS_INTERVAL_MS,
+    PROFILE_WINDOW_SECONDS,
+    PROFILE_CONTINUOUS_MAX_SECONDS,
+    PROFILE_CONTINUOUS_COOLDOWN_SECONDS,
+)
+from core.request_metrics import request_context
+
+logger = logging.getLogger("app.profiling")
+
+SUFFIX = ".collapsed"
+
+# Profile names as generated below (and the only ones GET /metrics/profiles/<name> serves)
+_NAME = re.compile(r"[\w.-]{1,200}\.collapsed")
+_UNSAFE = re.compile(r"[^\w.-]+")
+
+# A thread whose innermost Python frame is in one of these is waiting, not working
+_IDLE_FILES = ("selectors.py", "threading.py", "queue.py", os.path.join("concurrent", "futures", "thread.py"))
+
+_SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Longest first: site-packages lives inside the stdlib directory on most installs
+_PREFIXES = sorted(
+    {_SRC, sysconfig.get_paths()["purelib"], sysconfig.get_paths()["platlib"], sysconfig.get_paths()["stdlib"]},
+    key=len, reverse=True,
+)
+
+
+@lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    for prefix in _PREFIXES:
+        if filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return os.path.basename(filename)
+
+
+@lru_cache(maxsize=16384)
+def _label(code) -> str:
+    # ";" separates frames in the collapsed format, " " the count
+    return f"{_short_path(code.co_filename)}:{code.co_qualname}".replace(";", ":").replace(" ", "_")
+
+
+def _idle(frame) -> bool:
+    return frame.f_code.co_filename.endswith(_IDLE_FILES)
+
+
+class StackSampler:
+    """
+    Samples all busy threads every `interval` seconds on its own thread.
+    With `window` / `on_window`, the stacks collected are handed over (and
+    reset) every `window` seconds, and once more when sampling ends.
+    """
+
+    def __init__(self, interval: float, window: float | None = None,
+                 on_window: Callable[[str], None] | None = None):
+        self.interval = interval
+        self.window = window
+        self.on_window = on_window
+        self.samples = 0
+        self._counts: collections.Counter[str] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self, duration: float | None = None) -> None:
+        self._thread = threading.Thread(target=self._run, args=(duration,), name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        """Stop sampling; the stacks not handed to on_window yet."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.collapsed()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self, duration: float | None) -> None:
+        own = threading.get_ident()
+        started = window_started = time.monotonic()
+        while not self._stop.wait(self.interval):
+            self.sample(own)
+            now = time.monotonic()
+            if duration is not None and now - started >= duration:
+                break
+            if self.on_window is not None and now - window_started >= self.window:
+                self.on_window(self.take())
+                window_started = now
+        if self.on_window is not None and self._counts:
+            self.on_window(self.take())
+
+    def sample(self, own: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own or _idle(frame):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)).replace(" ", "_"))
+            self._counts[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self._counts.most_common())
+
+    def take(self) -> str:
+        text = self.collapsed()
+        self._counts = collections.Counter()
+        return text
+
+
+class ProfileStore:
+    """Profile files in one directory, newest `max_files` kept."""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+
+    @staticmethod
+    def new_name(label: str) -> str:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%f")[:-3]
+        label = _UNSAFE.sub("_", label).strip("_")[:150]
+        return f"{stamp}-{label}{SUFFIX}"
+
+    def save(self, name: str, collapsed: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, name)
+        with open(path + ".tmp", "w") as f:
+            f.write(collapsed)
+        os.replace(path + ".tmp", path)
+        self._prune()
+
+    def _prune(self) -> None:
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(SUFFIX))
+        for name in names[:-self.max_files] if self.max_files > 0 else names:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass  # another worker pruned it first
+
+    def list(self) -> list[dict]:
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if _NAME.fullmatch(name):
+                stat = os.stat(os.path.join(self.directory, name))
+                profiles.append({"name": name, "bytes": stat.st_size})
+        return profiles
+
+    def read(self, name: str) -> str:
+        path = os.path.join(self.directory, name)
+        if not _NAME.fullmatch(name) or not os.path.isfile(path):
+            raise HTTPException(status_code=404, detail="Profile not found")
+        with open(path) as f:
+            return f.read()
+
+
+profile_store = ProfileStore(PROFILE_DIR, PROFILE_MAX_FILES)
+
+
+# ----- one request -----
+class RequestProfile:
+    __slots__ = ("authorized", "name")
+
+    def __init__(self):
+        self.authorized = False  # set by get_current_user for admins
+        self.name: str | None = None
+
+
+_current: ContextVar[RequestProfile | None] = ContextVar("request_profile", default=None)
+_request_lock = threading.Lock()
+
+
+def current_profile() -> RequestProfile | None:
+    """The profile of the current request, while it still needs the admin check."""
+    return _current.get()
+
+
+def _admin_token(authorization: bytes | None) -> bool:
+    """Whether the Bearer token is a valid JWT with the is_admin claim set."""
+    from jose import jwt, JWTError
+
+    scheme, _, token = (authorization or b"").decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("is_admin") is True
+    except JWTError:
+        return False
+
+
+def _requested(scope: dict) -> bool:
+    headers = dict(scope["headers"])
+    if headers.get(b"x-profile") not in (b"1", b"true") and (
+        ("profile", "1") not in parse_qsl(scope["query_string"].decode("latin-1"))
+    ):
+        return False
+    # Sampling, the lower switch interval and the lock affect the whole process:
+    # verify the token before any of it. get_current_user still checks that the
+    # user is an admin now (the claim is from login time).
+    return _admin_token(headers.get(b"authorization"))
+
+
+def _label_for(scope: dict) -> str:
+    route = getattr(scope.get("route"), "path", scope["path"])
+    context = request_context(scope)
+    request_id = context.request_id if context is not None else uuid.uuid4().hex
+    return f"{scope['method']}-{route}-{request_id}"
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, interval: float = PROFILE_SAMPLE_INTERVAL_MS / 1000, store: ProfileStore = profile_store):
+        self.app = app
+        self.interval = interval
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _requested(scope) or not _request_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        sampler = StackSampler(self.interval)
+        token = _current.set(profile)
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start" and profile.authorized:
+                profile.name = self.store.new_name(_label_for(scope))
+                MutableHeaders(scope=message).append("X-Profile", f"/metrics/profiles/{profile.name}")
+            await send(message)
+
+        # CPU-bound threads hold the GIL for the switch interval (5ms): the
+        # sampler would not get to run every millisecond otherwise
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(switch_interval, self.interval))
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            _current.reset(token)
+            collapsed = sampler.stop()
+            sys.setswitchinterval(switch_interval)
+            _request_lock.release()
+            if profile.authorized:
+                name = profile.name or self.store.new_name(_label_for(scope))
+                await run_in_threadpool(self.store.save, name, collapsed)
+
+
+# ----- continuous -----
+class ContinuousProfiler:
+    """Time-boxed sampling of the whole process into one file per window."""
+
+    def __init__(self, store: ProfileStore, interval: float, window: float, max_seconds: float, cooldown: float):
+        self.store = store
+        self.interval = interval
+        self.window = window
+        self.max_seconds = max_seconds
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._sampler: StackSampler | None = None
+        self._started = float("-inf")
+        self._until: float | None = None
+        self.runs = 0
+        self.files = 0
+
+    def _save_window(self, collapsed: str) -> None:
+        try:
+            self.store.save(self.store.new_name("continuous"), collapsed)
+            self.files += 1
+        except OSError:
+            logger.warning("Could not write a continuous profile to %s", self.store.directory, exc_info=True)
+
+    def start(self, seconds: float) -> dict:
+        with self._lock:
+            if self._sampler is not None and self._sampler.running:
+                raise HTTPException(status_code=409, detail="Continuous profiling is already running")
+            wait = self._started + self.cooldown - time.monotonic()
+            if wait > 0:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Continuous profiling ran recently",
+                    headers={"Retry-After": str(int(wait) + 1)},
+                )
+            seconds = min(seconds, self.max_seconds)
+            self._sampler = StackSampler(self.interval, self.window, self._save_window)
+            self._sampler.start(duration=seconds)
+            self._started = time.monotonic()
+            self._until = time.time() + seconds
+            self.runs += 1
+        return self.status()
+
+    def stop(self) -> dict:
+        with self._lock:
+            sampler = self._sampler
+        if sampler is not None:
+            sampler.stop()
+        return self.status()
+
+    def status(self) -> dict:
+        running = self._sampler is not None and self._sampler.running
+        cooldown = max(0.0, self._started + self.cooldown - time.monotonic())
+        return {
+            "running": running,
+            "until": datetime.fromtimestamp(self._until, timezone.utc).isoformat(timespec="seconds")
+            if running else None,
+            "cooldown_seconds": round(cooldown, 1),
+            "interval_ms": self.interval * 1000,
+            "window_seconds": self.window,
+            "runs": self.runs,
+            "files": self.files,
+        }
+
+
+continuous_profiler = ContinuousProfiler(
+    profile_store,
+    interval=PROFILE_CONTINUOUS_INTERVAL_MS / 1000,
+    window=PROFILE_WINDOW_SECONDS,
+    max_seconds=PROFILE_CONTINUOUS_MAX_SECONDS,
+    cooldown=PROFILE_CONTINUOUS_COOLDOWN_SECONDS,
+)
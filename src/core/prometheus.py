@@ -0,0 +1,171 @@
+# src/core/prometheus.py
+"""
+Prometheus text exposition (format 0.0.4) for GET /metrics.
+
+One scrape covers what the JSON endpoints under /metrics/ report separately:
+- HTTP requests: latency per route, responses per status, in flight, spans,
+  SQL statements / DB time / query budget per route (core.request_metrics)
+- SQL statements and slow statements (core.query_stats; the per-fingerprint
+  top N stays in GET /metrics/queries, one series per query would be too many)
+- DB connection pools (core.pool_metrics)
+- principal cache, password hashing pool, array cache and change feed
+- the log queue (core.app_logging)
+- admission control: in flight / waiting / admitted / queued / rejected per
+  class, queue wait, rate-limited requests (core.admission)
+Counters end in _total; per-process values, like the sources.
+"""
+
+from core import app_logging, pool_metrics
+from core.admission import admission_controller
+from core.hashing_pool import password_pool
+from core.principal_cache import principal_cache
+from core.query_stats import query_stats
+from core.request_metrics import request_metrics
+from services import array_service
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value) -> str:
+    # Counters stay exact (no float rounding of large integers)
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class _Writer:
+    def __init__(self):
+        self.lines: list[str] = []
+
+    def metric(self, name: str, kind: str, help_text: str, samples: list[tuple[dict, float]]) -> None:
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self.lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def histogram(self, name: str, help_text: str, samples: list[tuple[dict, dict]]) -> None:
+        """samples: (labels, {"count", "sum", "buckets": {le: cumulative count}})"""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} histogram")
+        for labels, snapshot in samples:
+            for le, count in snapshot["buckets"].items():
+                self.lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {count}")
+            self.lines.append(f"{name}_sum{_labels(labels)} {_number(snapshot['sum'])}")
+            self.lines.append(f"{name}_count{_labels(labels)} {snapshot['count']}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def _requests(w: _Writer) -> None:
+    snapshot = request_metrics.snapshot()
+    w.metric("http_requests_in_flight", "gauge", "HTTP requests being handled.",
+             [({}, snapshot["in_flight"])])
+    w.histogram("http_request_duration_seconds", "HTTP request latency per route.", [
+        ({"method": r["method"], "route": r["route"]}, r["seconds"]) for r in snapshot["routes"]
+    ])
+    w.metric("http_responses_total", "counter", "HTTP responses per route and status.", [
+        ({"method": r["method"], "route": r["route"], "status": r["status"]}, r["count"])
+        for r in snapshot["responses"]
+    ])
+    for name, key, help_text in (
+        ("http_request_db_queries_total", "queries", "SQL statements run by requests, per route."),
+        ("http_request_db_seconds_total", "db_seconds", "Time spent in SQL statements, per route."),
+        ("http_request_query_budget_exceeded_total", "over_budget",
+         "Requests that ran more statements than QUERY_BUDGET_PER_REQUEST."),
+    ):
+        w.metric(name, "counter", help_text, [
+            ({"method": r["method"], "route": r["route"]}, r[key]) for r in snapshot["queries"]
+        ])
+    w.histogram("app_span_duration_seconds", "Time spent per step (jwt, bcrypt, db, encode, ...) inside requests.", [
+        ({"span": name}, histogram) for name, histogram in snapshot["spans"].items()
+    ])
+
+
+def _pools(w: _Writer) -> None:
+    pools = pool_metrics.snapshot()
+    for name, key, kind, help_text in (
+        ("db_pool_checked_out", "checked_out", "gauge", "Connections currently checked out."),
+        ("db_pool_connects_total", "connects", "counter", "New DB connections opened."),
+        ("db_pool_checkouts_total", "checkouts", "counter", "Connection checkouts."),
+        ("db_pool_invalidations_total", "invalidations", "counter", "Connections invalidated."),
+        ("db_pool_timeouts_total", "timeouts", "counter", "Checkouts that timed out waiting."),
+    ):
+        w.metric(name, kind, help_text, [({"pool": pool}, stats[key]) for pool, stats in pools.items()])
+    w.histogram("db_pool_wait_seconds", "Time spent waiting for a pooled connection.", [
+        ({"pool": pool}, stats["wait_seconds"]) for pool, stats in pools.items()
+    ])
+    w.metric("db_statements_total", "counter", "SQL statements executed (requests and background).",
+             [({}, query_stats.statements)])
+    w.metric("db_slow_statements_total", "counter", "SQL statements at or above SLOW_QUERY_THRESHOLD_MS.",
+             [({}, query_stats.slow)])
+
+
+def _caches(w: _Writer) -> None:
+    principals = principal_cache.stats()
+    w.metric("principal_cache_size", "gauge", "Users in the principal cache.", [({}, principals["size"])])
+    for key in ("hits", "misses", "coalesced", "evictions"):
+        w.metric(f"principal_cache_{key}_total", "counter", f"Principal cache {key}.", [({}, principals[key])])
+
+    w.metric("password_hash_rejected_total", "counter", "Password jobs rejected (hashing pool full, 503).",
+             [({}, password_pool.rejected)])
+
+    array = array_service.store.stats()
+    w.metric("array_version", "gauge", "Version of the cached array.", [({}, array["version"])])
+    w.metric("array_cache_size", "gauge", "Elements in the cached array.", [({}, array["size"])])
+    for key in ("hits", "reloads", "version_checks"):
+        w.metric(f"array_cache_{key}_total", "counter", f"Array cache {key.replace('_', ' ')}.", [({}, array[key])])
+
+    feed = array_service.feed.stats()
+    w.metric("array_feed_subscribers", "gauge", "Open /array/stream subscriptions.", [({}, feed["subscribers"])])
+    for key in ("published", "snapshots_sent", "resumes", "evictions"):
+        w.metric(f"array_feed_{key}_total", "counter", f"Array feed {key.replace('_', ' ')}.", [({}, feed[key])])
+
+
+def _logging(w: _Writer) -> None:
+    stats = app_logging.stats()
+    w.metric("log_queue_size", "gauge", "Log records waiting for the writer thread.", [({}, stats["queued"])])
+    w.metric("log_records_dropped_total", "counter", "Log records dropped because the queue was full.",
+             [({}, stats["dropped"])])
+    w.metric("log_records_rate_limited_total", "counter", "Repeated warnings / errors not logged (rate limit).",
+             [({}, stats["rate_limited"])])
+
+
+def _admission(w: _Writer) -> None:
+    stats = admission_controller.stats()
+    classes = stats["classes"]
+    for name, key, kind, help_text in (
+        ("admission_in_flight", "in_flight", "gauge", "Requests holding an admission slot, per class."),
+        ("admission_waiting", "waiting", "gauge", "Requests queued for an admission slot, per class."),
+        ("admission_admitted_total", "admitted", "counter", "Requests admitted, per class."),
+        ("admission_queued_total", "queued", "counter", "Requests that had to queue for a slot, per class."),
+    ):
+        w.metric(name, kind, help_text, [({"class": cls}, c[key]) for cls, c in classes.items()])
+    w.metric("admission_rejected_total", "counter", "Requests shed with a 503, per class and reason.", [
+        ({"class": cls, "reason": reason}, count)
+        for cls, c in classes.items() for reason, count in c["rejected"].items()
+    ])
+    w.metric("admission_rate_limited_total", "counter", "Requests rejected with a 429 by a token bucket.", [
+        ({"bucket": bucket}, count) for bucket, count in stats["rate_limited"].items()
+    ])
+    w.histogram("admission_queue_wait_seconds", "Time admitted requests waited for a slot.", [
+        ({"class": cls}, c["wait_seconds"]) for cls, c in classes.items()
+    ])
+
+
+def render() -> str:
+    w = _Writer()
+    _requests(w)
+    _pools(w)
+    _caches(w)
+    _logging(w)
+    _admission(w)
+    return w.text()
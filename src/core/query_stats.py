@@ -0,0 +1,167 @@
+# src/core/query_stats.py
+"""
+SQL statement accounting (SQLAlchemy before / after_cursor_execute events).
+
+instrument_queries(engine) times every statement sent on the engine and:
+- adds it to the current request's "db" span (count + time per request and
+  per route, query budget: see core.request_metrics)
+- aggregates it per fingerprint: the statement with literals, bind
+  parameters and IN / VALUES lists normalized, so
+      SELECT ... WHERE users.username IN (?, ?, ?) LIMIT 10
+  and the same query with other values / list lengths count together
+  (calls, total / max time, rows); GET /metrics/queries shows the top N
+- statements that take SLOW_QUERY_THRESHOLD_MS or more are counted, and a
+  SLOW_QUERY_SAMPLE_RATE share of them is logged (fingerprint only, never
+  the parameters) and kept in the last SLOW_QUERY_LOG_SIZE entries
+
+Unlike ECHO_SQL, nothing is logged for normal statements, so this stays on
+in production. Statements that fail are not timed.
+"""
+
+import collections
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.config import (
+    SLOW_QUERY_THRESHOLD_MS,
+    SLOW_QUERY_SAMPLE_RATE,
+    SLOW_QUERY_LOG_SIZE,
+    QUERY_STATS_MAX_FINGERPRINTS,
+)
+from core.request_metrics import current_request
+
+# Fingerprints beyond QUERY_STATS_MAX_FINGERPRINTS are counted here
+OTHER = "<other>"
+
+logger = logging.getLogger("app.sql")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+# %(name)s / %s (psycopg2), $1 (asyncpg), :name (not ::casts), ? (sqlite)
+_PARAM = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"(\((?:\?|\.\.\.)\))(?:\s*,\s*\(\s*(?:\?|\.\.\.)\s*\))+")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Normalized SQL: values -> ?, lists -> (...), one line."""
+    sql = _STRING.sub("?", statement)
+    sql = _PARAM.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _LIST.sub("(...)", sql)         # IN (?, ?, ?) / VALUES (?, ?)
+    sql = _ROWS.sub(r"\1, ...", sql)      # VALUES (...), (...), (...)
+    return _SPACE.sub(" ", sql).strip()[:2000]
+
+
+class QueryStats:
+    def __init__(self, slow_threshold_ms: float, sample_rate: float, log_size: int, max_fingerprints: int):
+        self.slow_threshold = slow_threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        # fingerprint -> [calls, total seconds, max seconds, rows]
+        self._queries: dict[str, list] = {}
+        self.slow_log: collections.deque[dict] = collections.deque(maxlen=log_size)
+        self.statements = 0
+        self.slow = 0
+
+    def observe(self, statement: str, seconds: float, rows: int) -> None:
+        key = fingerprint(statement)
+        slow = seconds >= self.slow_threshold
+        with self._lock:
+            self.statements += 1
+            entry = self._queries.get(key)
+            if entry is None:
+                if len(self._queries) >= self.max_fingerprints:
+                    key = OTHER
+                entry = self._queries.setdefault(key, [0, 0.0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            entry[3] += max(rows, 0)  # -1 = unknown (e.g. SELECT on some drivers)
+            if slow:
+                self.slow += 1
+        if slow and random.random() < self.sample_rate:
+            self._log_slow(key, seconds, rows)
+
+    def _log_slow(self, key: str, seconds: float, rows: int) -> None:
+        request = current_request()
+        route = f"{request.scope['method']} {request.route()}" if request is not None else None
+        self.slow_log.append({
+            "at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "ms": round(seconds * 1000, 3),
+            "rows": rows,
+            "route": route,
+            "fingerprint": key,
+        })
+        # Fingerprint in the message itself (not as an argument): the log's
+        # rate limiting of repeated records then applies per query
+        logger.warning("Slow query: " + key, extra={"fields": {"query_ms": round(seconds * 1000, 3), "rows": rows}})
+
+    def top(self, limit: int = 20, order_by: str = "total") -> list[dict]:
+        """The `limit` heaviest fingerprints by total / calls / max / mean time."""
+        with self._lock:
+            rows = [
+                {
+                    "fingerprint": key,
+                    "calls": calls,
+                    "total_ms": total * 1000,
+                    "mean_ms": total * 1000 / calls,
+                    "max_ms": longest * 1000,
+                    "rows": rows,
+                }
+                for key, (calls, total, longest, rows) in self._queries.items()
+            ]
+        sort_key = {"total": "total_ms", "calls": "calls", "max": "max_ms", "mean": "mean_ms"}[order_by]
+        rows.sort(key=lambda row: row[sort_key], reverse=True)
+        return rows[:limit]
+
+    def snapshot(self, limit: int = 20, order_by: str = "total") -> dict:
+        with self._lock:
+            counters = {
+                "statements": self.statements,
+                "slow": self.slow,
+                "slow_threshold_ms": self.slow_threshold * 1000,
+                "fingerprints": len(self._queries),
+            }
+            slow_log = list(self.slow_log)
+        return {**counters, "top": self.top(limit, order_by), "slow_log": slow_log}
+
+
+# Process-wide instance fed by every instrumented engine
+query_stats = QueryStats(
+    slow_threshold_ms=SLOW_QUERY_THRESHOLD_MS,
+    sample_rate=SLOW_QUERY_SAMPLE_RATE,
+    log_size=SLOW_QUERY_LOG_SIZE,
+    max_fingerprints=QUERY_STATS_MAX_FINGERPRINTS,
+)
+
+
+def instrument_queries(engine: Engine) -> None:
+    """Attach the statement timers (pass AsyncEngine.sync_engine for async)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        request = current_request()
+        if request is not None:
+            request.record("db", seconds)
+        query_stats.observe(statement, seconds, cursor.rowcount)
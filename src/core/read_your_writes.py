@@ -0,0 +1,95 @@
+# src/core/read_your_writes.py
+"""
+Read-your-writes for read replicas, per client.
+
+After a client writes, its next reads must not go to a replica that has not
+replayed the write yet. The state of that is kept with the client, not in
+the process: with several workers and instances the follow-up request
+usually lands somewhere else, and other clients' writes are no reason to
+skip the replicas.
+
+- a commit on the primary during a request (database.py's commit listener)
+  marks the request as a writer
+- the response then sets a cookie with the time of the write
+  (Max-Age = REPLICA_STICKY_SECONDS)
+- while a request carries a recent write time - from the cookie or from a
+  commit earlier in the same request - get_read_db / get_async_read_db
+  sessions use the primary
+
+Clients that do not keep cookies (API clients without a cookie jar) get no
+stickiness: their reads right after a write may lag by the replication delay.
+Only installed when DATABASE_REPLICA_URLS is set.
+"""
+
+import time
+from contextvars import ContextVar
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import cookie_parser
+
+COOKIE = "last_write"
+
+
+class ClientWrites:
+    """The last write (wall-clock time) known for the client of this request."""
+
+    __slots__ = ("last_write", "wrote")
+
+    def __init__(self, last_write: float = 0.0):
+        self.last_write = last_write
+        self.wrote = False
+
+    def mark_write(self) -> None:
+        self.last_write = time.time()
+        self.wrote = True
+
+    def recent(self, sticky_seconds: float) -> bool:
+        return time.time() - self.last_write < sticky_seconds
+
+
+_current: ContextVar[ClientWrites | None] = ContextVar("client_writes", default=None)
+
+
+def current_writes() -> ClientWrites | None:
+    """The read-your-writes state of the running request (None outside one)."""
+    return _current.get()
+
+
+def _cookie_value(scope: dict) -> float:
+    for name, value in scope["headers"]:
+        if name == b"cookie":
+            try:
+                return float(cookie_parser(value.decode("latin-1")).get(COOKIE, 0))
+            except ValueError:
+                return 0.0
+    return 0.0
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app, sticky_seconds: float):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Shared by reference: commits in threadpool threads (copied contexts) update it too
+        writes = ClientWrites(_cookie_value(scope))
+        token = _current.set(writes)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and writes.wrote:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Set-Cookie",
+                    f"{COOKIE}={writes.last_write:.3f}; Max-Age={max(1, round(self.sticky_seconds))}; "
+                    "Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _current.reset(token)
@@ -0,0 +1,303 @@
+# src/core/request_metrics.py
+"""
+Per-request timing (Server-Timing) and the request metrics behind GET /metrics.
+
+TimingMiddleware (plain ASGI, so streamed responses are not buffered) records
+for every HTTP request:
+- latency per method + route template (histogram)
+- responses per method + route + status
+- requests in flight
+- SQL statements and DB time per route; requests that run more than
+  QUERY_BUDGET_PER_REQUEST statements are counted (and logged, at most once
+  a minute per route) - N+1 patterns and redundant lookups show up here
+Paths that match no route are counted under "<unmatched>", so scanners cannot
+blow up the number of series. Every request also gets an id (the client's
+X-Request-ID when it sends a sane one), echoed in the X-Request-ID response
+header and attached to its log records (core.app_logging).
+
+span(name) times one step inside a request:
+- jwt      token decode (get_current_user)
+- bcrypt   password hash / verify, including the wait for a hashing worker
+- db       every SQL statement (engine events, see core.query_stats)
+- encode / compress   response serialization
+The durations of a request are summed per name and, with
+SERVER_TIMING_ENABLED=1, returned as
+    Server-Timing: jwt;dur=0.41, db;dur=2.13;desc="3 calls", encode;dur=0.05, total;dur=3.20
+(only what ran before the response headers; the body of a streamed response
+comes later) and each span also feeds a per-name histogram. The header only
+goes to admins and METRICS_TOKEN callers, never on login / registration: the
+spans tell whether bcrypt ran (i.e. whether a username exists) and how many
+queries a route makes.
+
+The request's state lives in a ContextVar: run_in_threadpool copies the
+context into its worker threads and SQLAlchemy's async greenlets share the
+task's context, so sync and async code paths record into the same request.
+Spans outside a request (background tasks) cost one ContextVar lookup.
+
+Metrics are per process: with several workers, each one reports its own.
+"""
+
+import logging
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from starlette.datastructures import MutableHeaders
+
+from core.config import QUERY_BUDGET_PER_REQUEST
+
+# Upper bounds (seconds) of the latency / span histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNMATCHED = "<unmatched>"
+
+# Seconds between two "query budget exceeded" log lines for the same route
+BUDGET_LOG_INTERVAL = 60.0
+
+# No Server-Timing on these, whoever asks (see the module docstring)
+_AUTH_ROUTES = {("POST", "/login"), ("POST", "/users")}
+
+# Client-supplied request ids are only trusted in this shape
+_REQUEST_ID = re.compile(r"[\w.:-]{1,64}")
+
+logger = logging.getLogger("app.requests")
+
+
+class Histogram:
+    """Non-cumulative counts per bucket (the last slot is +Inf) and a sum."""
+
+    __slots__ = ("counts", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.sum += seconds
+
+    def snapshot(self) -> dict:
+        cumulative, buckets = 0, {}
+        for bound, count in zip((*LATENCY_BUCKETS, float("inf")), self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {"count": cumulative, "sum": self.sum, "buckets": buckets}
+
+
+class RouteQueries:
+    """SQL accounting of one route."""
+
+    __slots__ = ("queries", "db_seconds", "max_queries", "over_budget", "last_logged")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.max_queries = 0
+        self.over_budget = 0
+        self.last_logged = float("-inf")
+
+    def snapshot(self) -> dict:
+        return {
+            "queries": self.queries,
+            "db_seconds": self.db_seconds,
+            "max_queries": self.max_queries,
+            "over_budget": self.over_budget,
+        }
+
+
+class RequestContext:
+    """One request: its id, user, and the time / calls recorded per span name."""
+
+    __slots__ = ("scope", "request_id", "user", "timing_allowed", "started", "spans", "calls")
+
+    def __init__(self, scope: dict, request_id: str):
+        self.scope = scope
+        self.request_id = request_id
+        self.user: str | None = None  # set by get_current_user
+        self.timing_allowed = False   # Server-Timing: set for admins / the metrics token
+        self.started = time.perf_counter()
+        self.spans: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def record(self, name: str, seconds: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+        request_metrics.observe_span(name, seconds)
+
+    def route(self) -> str:
+        # Set by the router on the matched route: the template, not the raw path
+        return getattr(self.scope.get("route"), "path", UNMATCHED)
+
+    def server_timing(self, total: float) -> str:
+        parts = []
+        for name, seconds in self.spans.items():
+            calls = self.calls[name]
+            parts.append(f"{name};dur={seconds * 1000:.2f}" + (f';desc="{calls} calls"' if calls > 1 else ""))
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+class RequestMetrics:
+    def __init__(self, query_budget: int = 10):
+        self.query_budget = query_budget
+        # Spans are observed from threadpool threads too
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.latency: dict[tuple[str, str], Histogram] = {}    # (method, route)
+        self.responses: dict[tuple[str, str, int], int] = {}   # (method, route, status)
+        self.queries: dict[tuple[str, str], RouteQueries] = {}  # (method, route)
+        self.spans: dict[str, Histogram] = {}
+
+    def observe_request(self, method: str, context: RequestContext, status: int, seconds: float) -> None:
+        route = context.route()
+        queries = context.calls.get("db", 0)
+        log_budget = False
+        with self._lock:
+            histogram = self.latency.get((method, route))
+            if histogram is None:
+                histogram = self.latency[(method, route)] = Histogram()
+            histogram.observe(seconds)
+            key = (method, route, status)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+            if queries:
+                accounting = self.queries.get((method, route))
+                if accounting is None:
+                    accounting = self.queries[(method, route)] = RouteQueries()
+                accounting.queries += queries
+                accounting.db_seconds += context.spans["db"]
+                accounting.max_queries = max(accounting.max_queries, queries)
+                if queries > self.query_budget:
+                    accounting.over_budget += 1
+                    now = time.monotonic()
+                    if now - accounting.last_logged >= BUDGET_LOG_INTERVAL:
+                        accounting.last_logged, log_budget = now, True
+        if log_budget:
+            logger.warning(
+                "Query budget exceeded: %s %s ran %d SQL statements (budget %d)",
+                method, route, queries, self.query_budget,
+                extra={"fields": {"queries": queries, "db_ms": round(context.spans["db"] * 1000, 3)}},
+            )
+
+    def observe_span(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.spans.get(name)
+            if histogram is None:
+                histogram = self.spans[name] = Histogram()
+            histogram.observe(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "query_budget": self.query_budget,
+                "routes": [
+                    {"method": method, "route": route, "seconds": histogram.snapshot()}
+                    for (method, route), histogram in sorted(self.latency.items())
+                ],
+                "responses": [
+                    {"method": method, "route": route, "status": status, "count": count}
+                    for (method, route, status), count in sorted(self.responses.items())
+                ],
+                "queries": [
+                    {"method": method, "route": route, **accounting.snapshot()}
+                    for (method, route), accounting in sorted(self.queries.items())
+                ],
+                "spans": {name: histogram.snapshot() for name, histogram in sorted(self.spans.items())},
+            }
+
+
+# Process-wide instance: TimingMiddleware, span() and GET /metrics
+request_metrics = RequestMetrics(query_budget=QUERY_BUDGET_PER_REQUEST)
+
+# The request being handled (None outside requests)
+_current: ContextVar[RequestContext | None] = ContextVar("request_context", default=None)
+
+
+def current_request() -> RequestContext | None:
+    return _current.get()
+
+
+def request_context(scope: dict) -> RequestContext | None:
+    """The context of a request from its scope (also after TimingMiddleware returned)."""
+    return scope.get("app.request_context")
+
+
+@contextmanager
+def use_request(context: RequestContext | None):
+    """
+    Make `context` current again. For the 500 handler, which Starlette runs
+    outside all middleware, i.e. after TimingMiddleware has finished.
+    """
+    token = _current.set(context)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str):
+    """Time the block as `name` in the current request (no-op outside one)."""
+    context = _current.get()
+    if context is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        context.record(name, time.perf_counter() - started)
+
+
+def _request_id(scope: dict) -> str:
+    for name, value in scope["headers"]:
+        if name == b"x-request-id":
+            candidate = value.decode("latin-1")
+            if _REQUEST_ID.fullmatch(candidate):
+                return candidate
+            break
+    return uuid.uuid4().hex
+
+
+class TimingMiddleware:
+    def __init__(self, app, server_timing_header: bool = False):
+        self.app = app
+        self.server_timing_header = server_timing_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            # WebSockets: long-lived, no latency to speak of
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _request_id(scope)
+        context = scope["app.request_context"] = RequestContext(scope, request_id)
+        token = _current.set(context)
+        status = 500  # unless a response starts (unhandled errors become 500s outside)
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-ID", request_id)
+                if (self.server_timing_header and context.timing_allowed
+                        and (scope["method"], scope["path"]) not in _AUTH_ROUTES):
+                    headers.append("Server-Timing", context.server_timing(context.elapsed()))
+            await send(message)
+
+        request_metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            request_metrics.in_flight -= 1
+            request_metrics.observe_request(scope["method"], context, status, context.elapsed())
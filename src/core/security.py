@@ -5,32 +5,85 @@ Security helpers and dependencies used across the app.
 What's inside:
 - Small user helper (get_user_by_username)
 - JWT creation (create_access_token)
-- "Who am I?" dependency that decodes JWT and returns current user (get_current_user)
+- "Who am I?" dependency that decodes JWT and returns current user (get_current_user),
+  backed by the in-process principal cache (core.principal_cache).
+  get_current_user resolves to the sync or async (DB_ASYNC=1) implementation.
+  get_stream_user does the same for WebSocket / SSE (token also as ?access_token=).
 - "Admin gate" that enforces admin-only access (ensure_admin)
-- Password Hashing utilities (bcrypt)
+- Password Hashing utilities (bcrypt), executed on core.hashing_pool
+- METRICS_TOKEN check for Prometheus scrapes (verify_metrics_token)
+- the admin check of profiled requests (?profile=1, core.profiling)
+- the per-user rate limit of core.admission (429), on the verified JWT sub
+JWT decoding and bcrypt are timed as "jwt" / "bcrypt" spans (core.request_metrics).
 """
 
+import secrets
 from datetime import datetime, timedelta
 
+from functools import cache
+
 from fastapi import Depends, HTTPException
-from jose import jwt, JWTError
-from passlib.context import CryptContext  # encryption library
+from starlette.requests import HTTPConnection
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from database import DB_ASYNC, get_read_db, get_async_read_db
 from models import UserDB
+from repositories.async_user_repository import AsyncUserRepository
 from schemas.user_schema import UserOut
-from core.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, oauth2_scheme
+from core.config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, METRICS_TOKEN, ADMISSION_ENABLED, oauth2_scheme,
+)
+from core.principal_cache import principal_cache
+from core.request_metrics import current_request, span
+from core.profiling import current_profile
+from core.admission import admission_controller
+from core import hashing_pool
 
 # === Password Hashing Config ===
 # (bcrypt)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib / python-jose (+ cryptography) are imported on first use rather than
+# at startup: they are not needed to serve traffic until the first login /
+# authenticated request, and importing them slows down cold starts.
+@cache
+def pwd_context():
+    from passlib.context import CryptContext  # encryption library
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# The actual bcrypt work. Module-level so it can also run in a process pool.
+def _hash_password(password: str) -> str:
+    return pwd_context().hash(password)
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context().verify(plain_password, hashed_password)
 
+# Public helpers: run on the dedicated hashing pool (503 when it is saturated)
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with span("bcrypt"):
+        return hashing_pool.password_pool.run(_hash_password, password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with span("bcrypt"):
+        return hashing_pool.password_pool.run(_verify_password, plain_password, hashed_password)
+
+def hash_passwords(passwords: list[str]) -> list[str]:
+    """Hash many passwords in parallel on the pool (bulk import)."""
+    with span("bcrypt"):
+        return hashing_pool.password_pool.map(_hash_password, passwords)
+
+def is_password_hash(value: str) -> bool:
+    """True if `value` is already a hash in a scheme we can verify (bcrypt)."""
+    return pwd_context().identify(value, required=False) is not None
+
+# Async variants: await the pool without holding a threadpool thread
+async def get_password_hash_async(password: str) -> str:
+    with span("bcrypt"):
+        return await hashing_pool.password_pool.run_async(_hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    with span("bcrypt"):
+        return await hashing_pool.password_pool.run_async(_verify_password, plain_password, hashed_password)
 
 
 # === helpers ===
@@ -46,6 +99,8 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     """
     Creates a signed JWT.
     """
+    from jose import jwt
+
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
     to_encode.update({"exp": expire})
@@ -53,21 +108,25 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
 
 
 # === auth dependencies ===
-def get_current_user(
-    token: str = Depends(oauth2_scheme),  # extracts Bearer token from Authorization header
-    db: Session = Depends(get_db),        
-) -> UserOut:
-    """
-    FastAPI dependency that decodes token and returns current user.
-    """
-    cred_exc = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=401,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _decode_username(token: str) -> str:
+    """
+    Decode & verify the JWT and return its subject, or raise 401.
+    """
+    from jose import jwt, JWTError
+
+    cred_exc = _credentials_exception()
     try:
         # Decode & verify JWT (raises JWTError on invalid/expired tokens)
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with span("jwt"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str | None = payload.get("sub")
         is_admin: bool | None = payload.get("is_admin")
         if username is None or is_admin is None:
@@ -76,14 +135,128 @@ def get_current_user(
     except JWTError:
         # Any JWT decoding/verification error -> unauthorized
         raise cred_exc
+    return username
+
+
+def get_current_user_sync(
+    token: str = Depends(oauth2_scheme),  # extracts Bearer token from Authorization header
+    db: Session = Depends(get_read_db),   # read-only lookup -> may be served by a replica
+) -> UserOut:
+    """
+    FastAPI dependency that decodes token and returns current user.
+    """
+    username = _decode_username(token)
+    _check_rate(username)
+
+    # Ensure the user still exists in the DB (token may outlive user deletion).
+    # Served from the principal cache when possible; the cache is invalidated
+    # by UserRepository whenever the user row changes.
+    current_user = principal_cache.get(username, lambda: _load_principal(db, username))
+    if current_user is None:
+        raise _credentials_exception()
+
+    _tag_request(current_user)
+    return current_user
 
-    # Ensure the user still exists in the DB (token may outlive user deletion)
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_read_db),  # may be served by a replica too
+) -> UserOut:
+    """
+    Async counterpart of get_current_user_sync (DB_ASYNC=1).
+    Runs on the event loop, so no threadpool thread is used per request.
+    """
+    username = _decode_username(token)
+    _check_rate(username)
+
+    async def load() -> UserOut | None:
+        db_user = await AsyncUserRepository(db).get_by_username(username)
+        principal = None
+        if db_user is not None:
+            principal = UserOut(username=db_user.username, is_admin=db_user.is_admin)
+        await db.rollback()
+        return principal
+
+    current_user = await principal_cache.get_async(username, load)
+    if current_user is None:
+        raise _credentials_exception()
+
+    _tag_request(current_user)
+    return current_user
+
+
+def _check_rate(username: str) -> None:
+    # Per-user token bucket (core.admission), before the principal lookup:
+    # a rate-limited client costs no DB / cache work
+    if ADMISSION_ENABLED:
+        admission_controller.check_user_rate(username)
+
+
+def _tag_request(current_user: UserOut) -> None:
+    # The user shows up in the request's log records (core.app_logging)
+    request = current_request()
+    if request is not None:
+        request.user = current_user.username
+        request.timing_allowed = current_user.is_admin  # Server-Timing: admins only
+    # ?profile=1 / X-Profile: 1 (core.profiling): admins only
+    profile = current_profile()
+    if profile is not None and not profile.authorized:
+        ensure_admin(current_user)
+        profile.authorized = True
+
+
+def _load_principal(db: Session, username: str) -> UserOut | None:
     db_user = get_user_by_username(db, username)
-    if db_user is None:
-        raise cred_exc
+    principal = None
+    if db_user is not None:
+        # Return a sanitized data model (not the ORM row)
+        principal = UserOut(username=db_user.username, is_admin=db_user.is_admin)
 
-    # Return a sanitized data model (not the ORM row)
-    return UserOut(username=db_user.username, is_admin=db_user.is_admin)
+    # End the read transaction right away: the pooled connection goes back to
+    # the pool now instead of being held until the end of the request.
+    db.rollback()
+    return principal
+
+
+# The dependency used by all routers: picks the implementation for the DB mode
+get_current_user = get_current_user_async if DB_ASYNC else get_current_user_sync
+
+
+# === streaming endpoints (WebSocket / SSE) ===
+# Browsers cannot set an Authorization header on a WebSocket or an
+# EventSource, so the token may also come as ?access_token=...
+def _connection_token(connection: HTTPConnection) -> str:
+    scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token
+    token = connection.query_params.get("access_token")
+    if not token:
+        raise _credentials_exception()
+    return token
+
+
+def get_stream_user_sync(connection: HTTPConnection, db: Session = Depends(get_read_db)) -> UserOut:
+    return get_current_user_sync(_connection_token(connection), db)
+
+
+async def get_stream_user_async(connection: HTTPConnection, db: AsyncSession = Depends(get_async_read_db)) -> UserOut:
+    return await get_current_user_async(_connection_token(connection), db)
+
+
+get_stream_user = get_stream_user_async if DB_ASYNC else get_stream_user_sync
+
+
+def verify_metrics_token(connection: HTTPConnection) -> None:
+    """
+    Dependency for GET /metrics when METRICS_TOKEN is set: the scraper sends
+    that token as a Bearer token instead of a user's JWT.
+    """
+    if not secrets.compare_digest(_connection_token(connection), METRICS_TOKEN):
+        raise _credentials_exception()
+    request = current_request()
+    if request is not None:
+        request.timing_allowed = True
 
 
 def ensure_admin(current_user: UserOut):
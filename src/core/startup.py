@@ -0,0 +1,33 @@
+# src/core/startup.py
+"""
+Startup phase timing.
+
+main.py wraps each startup phase (imports, DDL, DB check, pool warm-up, ...)
+in startup_timer.phase(...) and prints the breakdown once the app is ready,
+so cold-start regressions on Cloud Run are visible in the logs.
+"""
+
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: list[tuple[str, float]] = []
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def report(self) -> str:
+        total = time.perf_counter() - self.started
+        parts = ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.phases)
+        return f"Startup timing: total={total * 1000:.1f}ms ({parts})"
@@ -6,16 +6,33 @@ DATABASE CONFIGURATION
 
 Responsibilities:
 - Build the connection string (supports env-first; works in local & Docker)
-- Create SQLAlchemy Engine (the “gateway” to PostgreSQL)
+- Create SQLAlchemy Engine (the “gateway” to PostgreSQL) with an env-driven,
+  instrumented connection pool (DB_POOL_*, DB_EXTERNAL_POOLER; see core.pool_metrics)
 - Create the Session factory (used per request)
 - Create the Base class (parent for all ORM models)
 - Provide the get_db dependency for FastAPI
+- Optional read replicas (DATABASE_REPLICA_URLS): get_read_db (and, in async
+  mode, get_async_read_db) routes read-only sessions to a healthy replica, with
+  per-client read-your-writes stickiness (core.read_your_writes)
+- Optional async mode (DB_ASYNC=1): AsyncEngine + AsyncSession factory and the
+  get_async_db / get_async_read_db dependencies, used by the async repositories / services
+- Every engine's statements are timed and fingerprinted (core.query_stats)
 """
 
+import itertools
 import os
-from typing import Generator
-from sqlalchemy import create_engine
+import time
+from functools import partial
+from typing import AsyncGenerator, Generator
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from core import pool_metrics
+from core.query_stats import instrument_queries
+from core.read_your_writes import current_writes
 
 # -------- Resolve connection string from environment (env-first) ----------
 def _build_db_url() -> str:
@@ -34,17 +51,266 @@ def _build_db_url() -> str:
 
 SQLALCHEMY_DATABASE_URL = _build_db_url()
 
+# Async drivers for the same databases (asyncpg for Postgres, aiosqlite for local SQLite)
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def _async_driver_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+def _build_async_db_url(url: str) -> str:
+    explicit = os.getenv("ASYNC_DATABASE_URL")
+    if explicit:
+        return explicit
+    return _async_driver_url(url)
+
+# -------- Mode: sync (default) or async ------------------------------------
+# DB_ASYNC=1 serves the user/auth stack through AsyncSession on the event loop
+# instead of sync sessions on the threadpool.
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+
+# -------- Connection pool (env-driven) ------------------------------------
+# Cloud SQL db-f1-micro allows very few connections: keep the pool small,
+# recycle connections before the server / proxy drops idle ones, and
+# pre-ping so a stale connection is replaced instead of failing the request.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+# DB_EXTERNAL_POOLER=1: connections are pooled outside the app (e.g. PgBouncer),
+# so every checkout opens / closes a real connection to the pooler (NullPool).
+DB_EXTERNAL_POOLER = os.getenv("DB_EXTERNAL_POOLER", "0") == "1"
+
+def _engine_options(metrics: pool_metrics.PoolMetrics, async_mode: bool) -> dict:
+    if DB_EXTERNAL_POOLER:
+        return {"poolclass": pool_metrics.timed_pool_class(NullPool, metrics)}
+
+    base = AsyncAdaptedQueuePool if async_mode else QueuePool
+    return {
+        "poolclass": pool_metrics.timed_pool_class(base, metrics),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
 # -------- Engine (echo=True only if you want SQL logs) --------------------
 # Tip: you can toggle echo via env (ECHO_SQL=1) if you like.
 echo_flag = os.getenv("ECHO_SQL", "0") == "1"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, echo=echo_flag)
+_primary_metrics = pool_metrics.metrics_for("primary")
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, echo=echo_flag, **_engine_options(_primary_metrics, async_mode=False)
+)
+pool_metrics.instrument_engine(engine, _primary_metrics)
+instrument_queries(engine)  # per-request "db" span, slow-query log, top queries
 
 # -------- Session factory per-request -------------------------------------
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# -------- Read replicas (optional) ------------------------------------------
+# DATABASE_REPLICA_URLS="postgresql://...,postgresql://..." enables read routing:
+# get_read_db sessions send their queries to a healthy replica (round robin),
+# and fall back to the primary when no replica is usable. With DB_ASYNC=1 the
+# same replicas are also reached through async engines (get_async_read_db).
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+# Read-your-writes: after a client's commit on the primary, that client's reads
+# stay on the primary for this many seconds (should cover the usual replication
+# lag). Tracked per client with a cookie, so it holds across workers / instances.
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "2"))
+# A replica that raised a connection error is skipped for this many seconds.
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+
+
+class ReplicaSet:
+    """Replica engines and their health (per process)."""
+
+    def __init__(self, engines: list[Engine], async_engines: list[AsyncEngine] | None = None):
+        self.engines = engines
+        # DB_ASYNC=1: async engines for the same replicas (same index, same health)
+        self.async_engines = async_engines or []
+        self._unhealthy_until = [0.0] * len(engines)
+        self._next = itertools.count()
+
+    def mark_unhealthy(self, index: int) -> None:
+        self._unhealthy_until[index] = time.monotonic() + REPLICA_RETRY_SECONDS
+
+    def mark_healthy(self, index: int) -> None:
+        self._unhealthy_until[index] = 0.0
+
+    def _pick_index(self) -> int | None:
+        if not self.engines:
+            return None
+        writes = current_writes()
+        if writes is not None and writes.recent(REPLICA_STICKY_SECONDS):
+            return None  # this client wrote recently: read its own writes
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            index = next(self._next) % len(self.engines)
+            if self._unhealthy_until[index] <= now:
+                return index
+        return None
+
+    def pick(self) -> Engine | None:
+        """A healthy replica, or None -> use the primary."""
+        index = self._pick_index()
+        return None if index is None else self.engines[index]
+
+    def pick_async(self) -> Engine | None:
+        """Like pick, for async sessions: the sync_engine of a replica's AsyncEngine."""
+        index = self._pick_index()
+        return None if index is None else self.async_engines[index].sync_engine
+
+    def status(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {"replica": i, "healthy": until <= now, "retry_in_seconds": max(0.0, until - now)}
+            for i, until in enumerate(self._unhealthy_until)
+        ]
+
+
+def _on_replica_error(context, index: int) -> None:
+    dbapi = context.engine.dialect.loaded_dbapi
+    if context.is_disconnect or isinstance(context.original_exception, dbapi.OperationalError):
+        replicas.mark_unhealthy(index)
+
+def _build_replica_set() -> ReplicaSet:
+    engines, async_engines = [], []
+    for i, url in enumerate(DATABASE_REPLICA_URLS):
+        metrics = pool_metrics.metrics_for(f"replica-{i}")
+        replica = create_engine(url, echo=echo_flag, **_engine_options(metrics, async_mode=False))
+        pool_metrics.instrument_engine(replica, metrics)
+        instrument_queries(replica)
+        event.listen(replica, "handle_error", partial(_on_replica_error, index=i))
+        engines.append(replica)
+
+        if DB_ASYNC:
+            async_metrics = pool_metrics.metrics_for(f"replica-{i}-async")
+            async_replica = create_async_engine(
+                _async_driver_url(url), echo=echo_flag, **_engine_options(async_metrics, async_mode=True)
+            )
+            pool_metrics.instrument_engine(async_replica.sync_engine, async_metrics)
+            instrument_queries(async_replica.sync_engine)
+            event.listen(async_replica.sync_engine, "handle_error", partial(_on_replica_error, index=i))
+            async_engines.append(async_replica)
+    return ReplicaSet(engines, async_engines)
+
+replicas = _build_replica_set()
+
+# Any commit on the primary is a write (reads end with rollback / close):
+# the client of the running request reads from the primary for a while
+@event.listens_for(engine, "commit")
+def _on_primary_commit(conn):
+    writes = current_writes()
+    if writes is not None:
+        writes.mark_write()
+
+
+class RoutingSession(Session):
+    """
+    Read-only session: every query goes to a replica picked at execution time
+    (primary when none is healthy or during the read-your-writes window).
+    Never use it for writes - those belong to get_db sessions.
+    """
+
+    _last_bind: Engine | None = None
+
+    def _replica(self) -> Engine | None:
+        return replicas.pick()
+
+    def _primary(self) -> Engine:
+        return engine
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        self._last_bind = self._replica() or self._primary()
+        return self._last_bind
+
+    def execute(self, *args, **kw):
+        try:
+            return super().execute(*args, **kw)
+        except exc.OperationalError:
+            if self._last_bind is self._primary():
+                raise
+            # The replica is now marked unhealthy (handle_error): retry once,
+            # which routes to another replica or the primary
+            self.rollback()
+            return super().execute(*args, **kw)
+
+ReadSessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
+
+
+class AsyncRoutingSession(RoutingSession):
+    """
+    The sync Session behind get_async_read_db's AsyncSession: same routing,
+    to the async engines (an AsyncSession binds to their sync_engine).
+    """
+
+    def _replica(self) -> Engine | None:
+        return replicas.pick_async()
+
+    def _primary(self) -> Engine:
+        return async_engine.sync_engine
+
+# -------- Async engine + session factory (only in async mode) -------------
+# Created only when enabled, so sync deployments do not need asyncpg installed.
+async_engine: AsyncEngine | None = None
+AsyncSessionLocal: async_sessionmaker[AsyncSession] | None = None
+AsyncReadSessionLocal: async_sessionmaker[AsyncSession] | None = None
+if DB_ASYNC:
+    _async_metrics = pool_metrics.metrics_for("primary-async")
+    async_engine = create_async_engine(
+        _build_async_db_url(SQLALCHEMY_DATABASE_URL),
+        echo=echo_flag,
+        **_engine_options(_async_metrics, async_mode=True),
+    )
+    pool_metrics.instrument_engine(async_engine.sync_engine, _async_metrics)
+    instrument_queries(async_engine.sync_engine)
+    event.listen(async_engine.sync_engine, "commit", _on_primary_commit)
+    # expire_on_commit=False: attributes stay readable after commit without
+    # an implicit (and, in async, forbidden) lazy refresh
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_engine, sync_session_class=AsyncRoutingSession, autoflush=False, expire_on_commit=False
+    )
+
+def dispose_pools() -> None:
+    """Close the pooled connections of the primary and replica engines (shutdown)."""
+    engine.dispose()
+    for replica in replicas.engines:
+        replica.dispose()
+
+async def dispose_async_pools() -> None:
+    """Same for the async engines (DB_ASYNC=1)."""
+    if async_engine is not None:
+        await async_engine.dispose()
+    for replica in replicas.async_engines:
+        await replica.dispose()
+
 # -------- Declarative base for ORM models ---------------------------------
 Base = declarative_base()
 
+# -------- Pool warm-up ------------------------------------------------------
+def warm_pool(connections: int) -> None:
+    """
+    Open `connections` pooled connections (one SELECT 1 each) and return them
+    to the pool, so the first requests do not pay for TCP + TLS + auth.
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+
 # -------- Dependency: DB session per request ------------------------------
 def get_db() -> Generator[Session, None, None]:
     """
@@ -60,6 +326,40 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+# -------- Dependency: read-only DB session per request --------------------
+def get_read_db() -> Generator[Session, None, None]:
+    """
+    Like get_db, but for read-only work (user lookups, listings): queries are
+    routed to a read replica when DATABASE_REPLICA_URLS is configured.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# -------- Dependency: async DB session per request -----------------------
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Async counterpart of get_db (requires DB_ASYNC=1).
+    The session is closed when the request finishes.
+    """
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database mode is disabled (set DB_ASYNC=1)")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# -------- Dependency: async read-only DB session per request --------------
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Async counterpart of get_read_db: routed to a read replica when
+    DATABASE_REPLICA_URLS is configured (requires DB_ASYNC=1).
+    """
+    if AsyncReadSessionLocal is None:
+        raise RuntimeError("Async database mode is disabled (set DB_ASYNC=1)")
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
 # -------- Dev helper: create tables when run directly ---------------------
 if __name__ == "__main__":
     # Import models so SQLAlchemy registers them
@@ -1,71 +1,164 @@
 import sys
 import os
+import asyncio
+import logging
+import time
 from contextlib import asynccontextmanager
-from sqlalchemy import text
 
 # Add current directory to python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# Started first, so the "imports" phase covers everything below
+from core.startup import StartupTimer
+startup_timer = StartupTimer()
+
+import anyio.to_thread
+from sqlalchemy import text
 from fastapi import FastAPI, Depends, Request
-from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
+from starlette.concurrency import run_in_threadpool
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
-from routers import auth, users, array
+from routers import auth, users, array, metrics
 # from core.config import settings
-from database import Base, engine, SessionLocal
+from core.config import (
+    FAST_STARTUP, DB_POOL_WARM_CONNECTIONS, METRICS_ENABLED, SERVER_TIMING_ENABLED, PROFILING_ENABLED,
+    THREADPOOL_SIZE, ADMISSION_ENABLED,
+)
+from database import (
+    Base, engine, SessionLocal, warm_pool, dispose_pools, dispose_async_pools, replicas, REPLICA_STICKY_SECONDS,
+)
 from core.security import get_current_user
+from core import hashing_pool
+from core.health import db_health, run_prober
+from core.encoding import FastJSONResponse
+from core.request_metrics import TimingMiddleware, request_context, use_request
+from core.app_logging import setup_logging
+from core.profiling import ProfilingMiddleware, continuous_profiler
+from core.admission import AdmissionMiddleware
+from core.read_your_writes import ReadYourWritesMiddleware
+from services import array_service
+
+startup_timer.record("imports", time.perf_counter() - startup_timer.started)
+
+# Queued JSON logging (core.app_logging): nothing below writes to stdout itself
+setup_logging()
+logger = logging.getLogger("app.main")
+
+
+async def warm_pool_in_background():
+    """FAST_STARTUP: open pooled DB connections without delaying readiness."""
+    started = time.perf_counter()
+    try:
+        await run_in_threadpool(warm_pool, DB_POOL_WARM_CONNECTIONS)
+        logger.info("DB pool warmed: %d connections in %.1fms",
+                    DB_POOL_WARM_CONNECTIONS, (time.perf_counter() - started) * 1000)
+    except Exception:
+        logger.critical("CRITICAL DATABASE ERROR: Could not warm the DB pool!", exc_info=True)
+
 
 # LIFESPAN: Manage Application Startup & Shutdown
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # --- STARTUP LOGIC ---
-    print("Server is starting up...")
-
-    # 1. Create Database Tables
-    try:
-        Base.metadata.create_all(bind=engine)
-        print("Tables created successfully (or already exist).")
-    except Exception as e:
-        print(f"Error creating tables: {e}")
-
-    # 2. Database Health Check (Internal Log)
-    # This verifies that the API can talk to the DB during startup.
-    try:
-        db = SessionLocal()
-        db.execute(text("SELECT 1"))  # Simple query to check connection
-        db.close()
-        print("DATABASE HEALTH CHECK PASSED: Connection is alive and ready!")
-    except Exception as e:
-        print(f"CRITICAL DATABASE ERROR: Could not connect to DB! Error: {e}")
-        # The server will still start, but logs will show the critical failure.
+    logger.info("Server is starting up...")
+    warmup_task = None
+    # Threads for sync endpoints / dependencies (per worker, see THREADPOOL_SIZE)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+    if FAST_STARTUP:
+        # Production: the schema is managed out of band (no DDL), and the DB
+        # connection is established in the background while we start serving.
+        warmup_task = asyncio.create_task(warm_pool_in_background())
+    else:
+        # 1. Create Database Tables
+        with startup_timer.phase("create_tables"):
+            try:
+                Base.metadata.create_all(bind=engine)
+                logger.info("Tables created successfully (or already exist).")
+            except Exception:
+                logger.error("Error creating tables", exc_info=True)
+
+        # 2. Database Health Check (Internal Log)
+        # This verifies that the API can talk to the DB during startup.
+        with startup_timer.phase("db_check"):
+            started = time.perf_counter()
+            try:
+                db = SessionLocal()
+                db.execute(text("SELECT 1"))  # Simple query to check connection
+                db.close()
+                db_health.record(True, (time.perf_counter() - started) * 1000)
+                logger.info("DATABASE HEALTH CHECK PASSED: Connection is alive and ready!")
+            except Exception as e:
+                db_health.record(False, None, str(e))
+                logger.critical("CRITICAL DATABASE ERROR: Could not connect to DB!", exc_info=True)
+                # The server will still start, but logs will show the critical failure.
+
+    # 3. Background health prober: keeps db_health fresh for /, /livez, /readyz
+    prober_task = asyncio.create_task(run_prober())
+
+    logger.info(startup_timer.report())
 
     yield  # Application runs here...
 
     # --- SHUTDOWN LOGIC ---
-    print("Server is shutting down...")
+    logger.info("Server is shutting down...")
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    prober_task.cancel()
+    # End /array/stream subscriptions, so open streams do not hold up the shutdown
+    array_service.feed.close()
+    hashing_pool.password_pool.shutdown()
+    continuous_profiler.stop()
+    await dispose_async_pools()
+    # Close pooled connections now rather than leaving them for the database
+    # to time out (matters when a redeploy replaces every worker at once)
+    await run_in_threadpool(dispose_pools)
 
 
 # Initialize FastAPI with the lifespan manager
 app = FastAPI(
     title="FastAPI Exercise - Layered Architecture",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson-based JSON for every route that returns dicts / models
+    default_response_class=FastJSONResponse,
 )
 
-# GLOBAL EXCEPTION HANDLERS
+# READ REPLICAS: a client that just wrote reads from the primary (cookie)
+if replicas.engines:
+    app.add_middleware(ReadYourWritesMiddleware, sticky_seconds=REPLICA_STICKY_SECONDS)
+
+# PROFILING: ?profile=1 / X-Profile: 1 from an admin samples that request
+# (added first, so it runs inside TimingMiddleware and knows the request id)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# ADMISSION CONTROL: per-class concurrency limits, 503 / 429 when overloaded
+# (inside TimingMiddleware, so rejections show up in the request metrics)
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
+# REQUEST METRICS: per-route latency / status counts, Server-Timing header for admins
+# (scraped from GET /metrics)
+if METRICS_ENABLED:
+    app.add_middleware(TimingMiddleware, server_timing_header=SERVER_TIMING_ENABLED)
+
+# GLOBAL EXCEPTION HANDLERS (same encoder as the routes)
 # 1. Handle standard HTTP exceptions (like 404, 401, 403)
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail, "success": False}
+        content={"detail": exc.detail, "success": False},
+        # Keep headers such as WWW-Authenticate / Retry-After
+        headers=getattr(exc, "headers", None)
     )
 
 # 2. Handle validation errors (invalid JSON structure or types)
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=422,
         content={"detail": str(exc), "type": "Validation Error"}
     )
@@ -73,36 +166,42 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 # 3. Handle unexpected server errors (500 - System Crashes)
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    # Log the full error for the developer to debug
-    print(f"CRITICAL UNEXPECTED ERROR: {exc}")
-    
-    # Return a generic friendly message to the client
-    return JSONResponse(
+    # Log the full error for the developer to debug (queued: formatting the
+    # traceback and writing it happen off the event loop; repeats are rate limited)
+    context = request_context(request.scope)
+    with use_request(context):
+        logger.error("CRITICAL UNEXPECTED ERROR: %s", type(exc).__name__, exc_info=exc)
+
+    # Return a generic friendly message to the client, with the id to quote
+    request_id = context.request_id if context is not None else None
+    return FastJSONResponse(
         status_code=500,
         content={
             "success": False,
             "detail": "An unexpected error occurred. Please contact support.",
-            "error_type": "Internal Server Error"
+            "error_type": "Internal Server Error",
+            "request_id": request_id,
         },
+        headers={"X-Request-ID": request_id} if request_id is not None else None,
     )
 
 # ROUTER REGISTRATION
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(array.router)
+app.include_router(metrics.router)
 
 # ENDPOINTS
-# Public root endpoint - Includes Real-Time DB Check for the Client
+# Public root endpoint - Reports the DB status cached by the background prober
+# (no connection is opened here, so the endpoint stays cheap under load)
 @app.get("/")
-def root():
-    # Attempt to connect to the DB right now to give the client a status report
-    try:
-        db = SessionLocal()
-        db.execute(text("SELECT 1"))
-        db.close()
+async def root():
+    if db_health.ok is None:
+        db_status = "Checking..."
+    elif db_health.ok:
         db_status = "Connected and Alive! "
-    except Exception as e:
-        db_status = f"Disconnected / Error  ({str(e)})"
+    else:
+        db_status = f"Disconnected / Error  ({db_health.error})"
 
     # Return the status to the terminal/browser
     return {
@@ -113,7 +212,21 @@ def root():
         "environment": "Google Cloud Run (Proxy Access)"
     }
 
+# Liveness probe - the process is up and the event loop answers (never checks the DB,
+# so a DB outage does not get healthy containers restarted)
+@app.get("/livez")
+async def livez():
+    return {"status": "alive"}
+
+# Readiness probe - 200 only while the last background DB check passed and is recent
+@app.get("/readyz")
+async def readyz():
+    state = db_health.snapshot()
+    if not db_health.ready:
+        return FastJSONResponse(status_code=503, content={"status": "not ready", "database": state})
+    return {"status": "ready", "database": state}
+
 # Protected health endpoint - Requires valid JWT token
 @app.get("/health")
-def health(current_user = Depends(get_current_user)):
+async def health(current_user = Depends(get_current_user)):
     return {"status": "ok", "user": current_user.username}
\ No newline at end of file
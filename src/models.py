@@ -1,5 +1,5 @@
 # backend-project/models.py
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, func
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, JSON, func
 from database import Base
 
 # ============================================================
@@ -24,4 +24,25 @@ class UserDB(Base):
     is_admin = Column(Boolean, nullable=False, default=False)
 
     # Timestamp - automatically set by PostgreSQL using NOW()
-    created_at = Column(DateTime, server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime, server_default=func.now())
+
+class ArrayItemDB(Base):
+    __tablename__ = "array_items"  # Shared array (ARRAY_STORAGE=database)
+
+    # 0-based position in the array - the primary key keeps the items ordered
+    position = Column(Integer, primary_key=True, autoincrement=False)
+
+    # The element itself (str / int / float, stored as JSON to keep its type)
+    value = Column(JSON, nullable=False)
+
+
+class ArrayMetaDB(Base):
+    __tablename__ = "array_meta"  # Single row (id=1) describing the array
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+
+    # Bumped by every mutation; caches compare it to know if they are current
+    version = Column(BigInteger, nullable=False, default=0)
+
+    # Number of elements (positions 0 .. length-1)
+    length = Column(Integer, nullable=False, default=0)
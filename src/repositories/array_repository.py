@@ -0,0 +1,355 @@
+# src/repositories/array_repository.py
+"""
+Storage backends for the shared array (services/array_service).
+
+Every backend implements the ArrayBackend interface. Each mutation bumps a
+monotonically increasing version, which the versioned cache
+(core/array_cache) uses to tell whether its local copy is still current.
+
+- MemoryArrayBackend: a Python list in this process (ARRAY_STORAGE=memory).
+  Every uvicorn worker / instance has its own array, lost on restart.
+- SqlArrayBackend: the array_items / array_meta tables (ARRAY_STORAGE=database),
+  shared by every worker and instance. Each mutation is one short transaction
+  that starts by bumping the single array_meta row: that row lock serializes
+  concurrent writers, so positions stay dense and versions strictly increase.
+
+Every mutation takes an optional expected_version (optimistic concurrency):
+if the array is no longer at that version the write is not applied and
+VersionConflict is raised.
+"""
+
+import itertools
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+
+from models import ArrayItemDB, ArrayMetaDB
+
+# Contents of a brand-new array (same demo data for every backend)
+DEFAULT_ITEMS = ["first", "second", "third"]
+
+
+# Batch operations (apply()): ("append", value) | ("set", index, value) | ("pop",)
+ArrayOp = tuple
+
+
+class ArrayOpError(Exception):
+    """An operation of a batch cannot be applied; the whole batch is rejected."""
+
+    def __init__(self, position: int, reason: str):
+        super().__init__(f"operation {position}: {reason}")
+        self.position = position  # 0-based position of the op in the batch
+        self.reason = reason      # "index out of range" | "array is empty"
+
+
+class VersionConflict(Exception):
+    """The array is not at the version the caller expected (nothing was written)."""
+
+    def __init__(self, current: int):
+        super().__init__(f"array is at version {current}")
+        self.current = current
+
+
+def check_ops(ops: list[ArrayOp], length: int) -> int:
+    """Validate a batch against an array of `length` items; returns the final length."""
+    for position, op in enumerate(ops):
+        if op[0] == "append":
+            length += 1
+        elif op[0] == "set":
+            if not 0 <= op[1] < length:
+                raise ArrayOpError(position, "index out of range")
+        else:  # pop
+            if length == 0:
+                raise ArrayOpError(position, "array is empty")
+            length -= 1
+    return length
+
+
+def apply_ops(items: list, ops: list[ArrayOp]) -> list:
+    """Apply an already validated batch to a list in place; returns the popped values."""
+    popped = []
+    for op in ops:
+        if op[0] == "append":
+            items.append(op[1])
+        elif op[0] == "set":
+            items[op[1]] = op[2]
+        else:
+            popped.append(items.pop())
+    return popped
+
+
+class ArrayBackend(ABC):
+    """
+    Interface of the array storage backends. All methods may block.
+    `epoch` identifies one incarnation of the array: versions are only
+    comparable within the same epoch.
+    """
+
+    epoch: str
+
+    @abstractmethod
+    def version(self) -> int:
+        """Current version (cheap: called on reads to validate caches)."""
+
+    @abstractmethod
+    def load(self) -> tuple[int, list]:
+        """(version, all items in order)."""
+
+    @abstractmethod
+    def append(self, value: Any, expected_version: int | None = None) -> int:
+        """Append value; returns the new version."""
+
+    @abstractmethod
+    def set(self, index: int, value: Any, expected_version: int | None = None) -> int | None:
+        """Replace items[index]; returns the new version, or None if out of range."""
+
+    @abstractmethod
+    def pop(self, expected_version: int | None = None) -> tuple[int, Any] | None:
+        """Remove the last item; returns (new version, removed value), or None if empty."""
+
+    @abstractmethod
+    def apply(self, ops: list[ArrayOp], expected_version: int | None = None) -> tuple[int, list]:
+        """
+        Apply a batch atomically (all or nothing, one version bump).
+        Returns (new version, popped values); raises ArrayOpError.
+        """
+
+
+class MemoryArrayBackend(ArrayBackend):
+    def __init__(self, items: list | None = None):
+        self._items = list(DEFAULT_ITEMS if items is None else items)
+        self._version = 0
+        self._lock = threading.Lock()
+        # Each process starts its own array at version 0
+        self.epoch = uuid.uuid4().hex[:8]
+
+    def _check_version(self, expected_version: int | None) -> None:
+        # Caller holds self._lock
+        if expected_version is not None and expected_version != self._version:
+            raise VersionConflict(self._version)
+
+    def version(self) -> int:
+        return self._version
+
+    def load(self) -> tuple[int, list]:
+        with self._lock:
+            return self._version, list(self._items)
+
+    def append(self, value: Any, expected_version: int | None = None) -> int:
+        with self._lock:
+            self._check_version(expected_version)
+            self._items.append(value)
+            self._version += 1
+            return self._version
+
+    def set(self, index: int, value: Any, expected_version: int | None = None) -> int | None:
+        with self._lock:
+            if not 0 <= index < len(self._items):
+                return None
+            self._check_version(expected_version)
+            self._items[index] = value
+            self._version += 1
+            return self._version
+
+    def pop(self, expected_version: int | None = None) -> tuple[int, Any] | None:
+        with self._lock:
+            if not self._items:
+                return None
+            self._check_version(expected_version)
+            value = self._items.pop()
+            self._version += 1
+            return self._version, value
+
+    def apply(self, ops: list[ArrayOp], expected_version: int | None = None) -> tuple[int, list]:
+        with self._lock:
+            self._check_version(expected_version)
+            check_ops(ops, len(self._items))
+            popped = apply_ops(self._items, ops)
+            self._version += 1
+            return self._version, popped
+
+
+# ----- SQL statements (built once, see repositories/user_statements) -----
+_META_ID = 1
+_meta = ArrayMetaDB.id == _META_ID
+
+_SELECT_VERSION = select(ArrayMetaDB.version).where(_meta)
+_SELECT_ITEMS = select(ArrayItemDB.value).order_by(ArrayItemDB.position)
+
+# The meta row update comes first in every write transaction (row lock)
+_BUMP_APPEND = (
+    update(ArrayMetaDB)
+    .where(_meta)
+    .values(version=ArrayMetaDB.version + 1, length=ArrayMetaDB.length + 1)
+    .returning(ArrayMetaDB.version, ArrayMetaDB.length)
+)
+# Params: index -> no row if index >= length
+_BUMP_SET = (
+    update(ArrayMetaDB)
+    .where(_meta, ArrayMetaDB.length > bindparam("index"))
+    .values(version=ArrayMetaDB.version + 1)
+    .returning(ArrayMetaDB.version)
+)
+# No row if the array is empty
+_BUMP_POP = (
+    update(ArrayMetaDB)
+    .where(_meta, ArrayMetaDB.length > 0)
+    .values(version=ArrayMetaDB.version + 1, length=ArrayMetaDB.length - 1)
+    .returning(ArrayMetaDB.version, ArrayMetaDB.length)
+)
+
+# Params: position, value
+_INSERT_ITEM = insert(ArrayItemDB)
+# Params: index, new_value
+_SET_ITEM = (
+    update(ArrayItemDB)
+    .where(ArrayItemDB.position == bindparam("index"))
+    .values(value=bindparam("new_value"))
+)
+# Params: index
+_DELETE_ITEM = (
+    delete(ArrayItemDB)
+    .where(ArrayItemDB.position == bindparam("index"))
+    .returning(ArrayItemDB.value)
+)
+
+# Params: index -> removes every item at position >= index
+_DELETE_FROM = (
+    delete(ArrayItemDB)
+    .where(ArrayItemDB.position >= bindparam("index"))
+    .returning(ArrayItemDB.position, ArrayItemDB.value)
+)
+# Batch: bump (and lock) first, store the final length at the end
+_BUMP_BATCH = (
+    update(ArrayMetaDB)
+    .where(_meta)
+    .values(version=ArrayMetaDB.version + 1)
+    .returning(ArrayMetaDB.version, ArrayMetaDB.length)
+)
+# Params: new_length
+_SET_LENGTH = update(ArrayMetaDB).where(_meta).values(length=bindparam("new_length"))
+
+# Creates the meta row once; returns no row if another process got there first
+_INSERT_META = {
+    name: dialect_insert(ArrayMetaDB)
+    .values(id=_META_ID, version=0, length=len(DEFAULT_ITEMS))
+    .on_conflict_do_nothing(index_elements=[ArrayMetaDB.id])
+    .returning(ArrayMetaDB.id)
+    for name, dialect_insert in (("postgresql", postgresql.insert), ("sqlite", sqlite.insert))
+}
+
+
+def _check_bumped(version: int, expected_version: int | None) -> None:
+    # `version` was just bumped under the row lock, so version - 1 is the
+    # version this write applies to. Raising rolls the transaction back.
+    if expected_version is not None and version - 1 != expected_version:
+        raise VersionConflict(version - 1)
+
+
+class SqlArrayBackend(ArrayBackend):
+    # One shared array for every process
+    epoch = "db"
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _ensure_initialized(self) -> None:
+        # Lazy: the tables are created by the app lifespan, after import
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            with self.engine.begin() as conn:
+                created = conn.execute(_INSERT_META[self.engine.dialect.name]).first()
+                if created is not None:
+                    conn.execute(
+                        _INSERT_ITEM,
+                        [{"position": i, "value": v} for i, v in enumerate(DEFAULT_ITEMS)],
+                    )
+            self._initialized = True
+
+    def version(self) -> int:
+        self._ensure_initialized()
+        with self.engine.connect() as conn:
+            return conn.execute(_SELECT_VERSION).scalar_one()
+
+    def load(self) -> tuple[int, list]:
+        self._ensure_initialized()
+        with self.engine.connect() as conn:
+            # Each statement may see a newer commit (READ COMMITTED): re-read
+            # the version after the items until no write landed in between,
+            # so the items are exactly that version (the cache keys bodies by it)
+            version = conn.execute(_SELECT_VERSION).scalar_one()
+            while True:
+                items = list(conn.execute(_SELECT_ITEMS).scalars())
+                after = conn.execute(_SELECT_VERSION).scalar_one()
+                if after == version:
+                    return version, items
+                version = after
+
+    def append(self, value: Any, expected_version: int | None = None) -> int:
+        self._ensure_initialized()
+        with self.engine.begin() as conn:
+            version, length = conn.execute(_BUMP_APPEND).one()
+            _check_bumped(version, expected_version)
+            conn.execute(_INSERT_ITEM, {"position": length - 1, "value": value})
+        return version
+
+    def set(self, index: int, value: Any, expected_version: int | None = None) -> int | None:
+        if index < 0:
+            return None
+        self._ensure_initialized()
+        with self.engine.begin() as conn:
+            version = conn.execute(_BUMP_SET, {"index": index}).scalar()
+            if version is None:
+                return None
+            _check_bumped(version, expected_version)
+            conn.execute(_SET_ITEM, {"index": index, "new_value": value})
+        return version
+
+    def pop(self, expected_version: int | None = None) -> tuple[int, Any] | None:
+        self._ensure_initialized()
+        with self.engine.begin() as conn:
+            bumped = conn.execute(_BUMP_POP).first()
+            if bumped is None:
+                return None
+            version, length = bumped
+            _check_bumped(version, expected_version)
+            value = conn.execute(_DELETE_ITEM, {"index": length}).scalar_one()
+        return version, value
+
+    def apply(self, ops: list[ArrayOp], expected_version: int | None = None) -> tuple[int, list]:
+        self._ensure_initialized()
+        with self.engine.begin() as conn:
+            version, length = conn.execute(_BUMP_BATCH).one()
+            _check_bumped(version, expected_version)
+            # Raising here rolls the whole transaction back (bump included)
+            final_length = check_ops(ops, length)
+
+            # Runs of the same operation become one executemany / one DELETE
+            popped = []
+            for kind, run in itertools.groupby(ops, key=lambda op: op[0]):
+                run = list(run)
+                if kind == "append":
+                    conn.execute(
+                        _INSERT_ITEM,
+                        [{"position": length + k, "value": op[1]} for k, op in enumerate(run)],
+                    )
+                    length += len(run)
+                elif kind == "set":
+                    conn.execute(_SET_ITEM, [{"index": op[1], "new_value": op[2]} for op in run])
+                else:
+                    length -= len(run)
+                    rows = conn.execute(_DELETE_FROM, {"index": length}).all()
+                    popped.extend(value for _, value in sorted(rows, reverse=True))
+
+            conn.execute(_SET_LENGTH, {"new_length": final_length})
+        return version, popped
@@ -0,0 +1,100 @@
+from typing import AsyncIterator
+
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import UserDB
+from core.principal_cache import principal_cache
+from repositories.user_statements import (
+    INSERT_USER,
+    SELECT_BY_USERNAME,
+    SELECT_EXISTING_USERNAMES,
+    SET_ADMIN,
+)
+
+
+class AsyncUserRepository:
+    """
+    Async counterpart of UserRepository (used when DB_ASYNC=1).
+    Same methods and semantics, but every DB call is awaited on the event loop.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_by_username(self, username: str) -> UserDB | None:
+        """
+        Fetch a single user by username.
+        """
+        result = await self.db.scalars(SELECT_BY_USERNAME, {"username": username})
+        return result.first()
+
+    async def existing_usernames(self, usernames: list[str]) -> set[str]:
+        """
+        Return which of `usernames` exist.
+        """
+        return set(await self.db.scalars(SELECT_EXISTING_USERNAMES, {"usernames": usernames}))
+
+    async def create_user(self, username: str, password_hash: str, is_admin: bool) -> Row | None:
+        """
+        Create a new user in the database (one INSERT ... ON CONFLICT round trip).
+        Returns (username, is_admin), or None if the username is already taken.
+        """
+        stmt = INSERT_USER[self.db.get_bind().dialect.name]
+        result = await self.db.execute(
+            stmt, {"username": username, "password": password_hash, "is_admin": is_admin}
+        )
+        row = result.first()
+        await self.db.commit()
+        if row is not None:
+            principal_cache.invalidate(username)
+        return row
+
+    async def set_admin(self, username: str, is_admin: bool) -> Row | None:
+        """
+        Update the user's admin flag (one UPDATE ... RETURNING round trip).
+        Returns (username, is_admin), or None if the user does not exist or
+        already has that flag.
+        """
+        updated = await self.set_admin_many([username], is_admin)
+        return updated[0] if updated else None
+
+    async def set_admin_many(self, usernames: list[str], is_admin: bool) -> list[Row]:
+        """
+        Set the admin flag for many users in one statement.
+        Returns (username, is_admin) for the rows that actually changed.
+        """
+        if not usernames:
+            return []
+
+        result = await self.db.execute(SET_ADMIN, {"usernames": usernames, "new_is_admin": is_admin})
+        rows = list(result)
+        await self.db.commit()
+        for row in rows:
+            principal_cache.invalidate(row.username)
+        return rows
+
+    async def list_users(self, limit: int | None = None, after_id: int | None = None) -> list[Row]:
+        """
+        Return users ordered by id, optionally one keyset page (id > after_id).
+        Only the public columns are selected (never the password hash).
+        """
+        stmt = select(UserDB.id, UserDB.username, UserDB.is_admin).order_by(UserDB.id)
+        if after_id is not None:
+            stmt = stmt.where(UserDB.id > after_id)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        result = await self.db.execute(stmt)
+        return list(result.all())
+
+    async def iter_users(self, batch_size: int = 1000) -> AsyncIterator[Row]:
+        """
+        Yield all users (username / is_admin) from a server-side cursor.
+        """
+        stmt = (
+            select(UserDB.username, UserDB.is_admin)
+            .order_by(UserDB.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.db.stream(stmt)
+        async for row in result:
+            yield row
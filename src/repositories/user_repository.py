@@ -1,5 +1,18 @@
+import csv
+import io
+from typing import Iterator
+
+from sqlalchemy import Row, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 from models import UserDB
+from core.principal_cache import principal_cache
+from repositories.user_statements import (
+    INSERT_USER,
+    SELECT_BY_USERNAME,
+    SELECT_EXISTING_USERNAMES,
+    SET_ADMIN,
+)
 
 
 class UserRepository:
@@ -14,37 +27,129 @@ class UserRepository:
         """
         Fetch a single user by username.
         """
-        # Use self.db instead of passing db as a parameter
-        return self.db.query(UserDB).filter(UserDB.username == username).first()
+        return self.db.scalars(SELECT_BY_USERNAME, {"username": username}).first()
 
-    def create_user(self, username: str, password_hash: str, is_admin: bool) -> UserDB:
+    def existing_usernames(self, usernames: list[str]) -> set[str]:
         """
-        Create a new user in the database.
+        Return which of `usernames` exist.
         """
-        user = UserDB(
-            username=username,
-            password=password_hash,
-            is_admin=is_admin
-        )
+        return set(self.db.scalars(SELECT_EXISTING_USERNAMES, {"usernames": usernames}))
 
-        self.db.add(user)
+    def create_user(self, username: str, password_hash: str, is_admin: bool) -> Row | None:
+        """
+        Create a new user in the database (one INSERT ... ON CONFLICT round trip).
+        Returns (username, is_admin), or None if the username is already taken.
+        """
+        stmt = INSERT_USER[self.db.get_bind().dialect.name]
+        row = self.db.execute(
+            stmt, {"username": username, "password": password_hash, "is_admin": is_admin}
+        ).first()
         self.db.commit()
-        return user
+        if row is not None:
+            principal_cache.invalidate(username)
+        return row
 
-    def set_admin(self, username: str, is_admin: bool) -> UserDB | None:
+    def set_admin(self, username: str, is_admin: bool) -> Row | None:
         """
-        Update the user's admin flag.
+        Update the user's admin flag (one UPDATE ... RETURNING round trip).
+        Returns (username, is_admin), or None if the user does not exist or
+        already has that flag.
         """
-        user = self.get_by_username(username)
-        if not user:
-            return None
+        updated = self.set_admin_many([username], is_admin)
+        return updated[0] if updated else None
 
-        user.is_admin = is_admin
+    def set_admin_many(self, usernames: list[str], is_admin: bool) -> list[Row]:
+        """
+        Set the admin flag for many users in one statement.
+        Returns (username, is_admin) for the rows that actually changed.
+        """
+        if not usernames:
+            return []
+
+        rows = list(self.db.execute(SET_ADMIN, {"usernames": usernames, "new_is_admin": is_admin}))
         self.db.commit()
-        return user
+        for row in rows:
+            principal_cache.invalidate(row.username)
+        return rows
 
-    def list_users(self) -> list[UserDB]:
+    def list_users(self, limit: int | None = None, after_id: int | None = None) -> list[Row]:
+        """
+        Return users ordered by id, optionally one keyset page (id > after_id).
+        Only the public columns are selected (never the password hash).
         """
-        Return all users.
+        stmt = select(UserDB.id, UserDB.username, UserDB.is_admin).order_by(UserDB.id)
+        if after_id is not None:
+            stmt = stmt.where(UserDB.id > after_id)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return list(self.db.execute(stmt).all())
+
+    def iter_users(self, batch_size: int = 1000) -> Iterator[Row]:
         """
-        return self.db.query(UserDB).all()
+        Yield all users (username / is_admin) from a server-side cursor,
+        fetching `batch_size` rows at a time instead of loading the table.
+        """
+        stmt = (
+            select(UserDB.username, UserDB.is_admin)
+            .order_by(UserDB.id)
+            .execution_options(yield_per=batch_size)
+        )
+        yield from self.db.execute(stmt)
+
+    def bulk_create_users(self, rows: list[dict]) -> set[str]:
+        """
+        Insert many users (dicts with username / password / is_admin) in one
+        round trip, skipping usernames that already exist.
+        Returns the usernames that were actually created.
+        """
+        if not rows:
+            return set()
+
+        bind = self.db.get_bind()
+        if bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2":
+            created = self._copy_create_users(rows)
+        else:
+            insert = postgresql.insert if bind.dialect.name == "postgresql" else sqlite.insert
+            stmt = (
+                insert(UserDB)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=[UserDB.username])
+                .returning(UserDB.username)
+            )
+            created = set(self.db.execute(stmt).scalars())
+
+        self.db.commit()
+        for username in created:
+            principal_cache.invalidate(username)
+        return created
+
+    def _copy_create_users(self, rows: list[dict]) -> set[str]:
+        """
+        Postgres fast path: COPY the batch into a temp staging table, then
+        INSERT ... SELECT ... ON CONFLICT DO NOTHING into users.
+        """
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for row in rows:
+            writer.writerow((row["username"], row["password"], row["is_admin"]))
+        buf.seek(0)
+
+        # Raw psycopg2 cursor on the session's current connection / transaction
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS users_import "
+                "(username varchar(50), password varchar(255), is_admin boolean) "
+                "ON COMMIT DELETE ROWS"
+            )
+            cursor.copy_expert(
+                "COPY users_import (username, password, is_admin) FROM STDIN WITH (FORMAT csv)", buf
+            )
+            cursor.execute(
+                "INSERT INTO users (username, password, is_admin) "
+                "SELECT username, password, is_admin FROM users_import "
+                "ON CONFLICT (username) DO NOTHING RETURNING username"
+            )
+            return {username for (username,) in cursor.fetchall()}
+        finally:
+            cursor.close()
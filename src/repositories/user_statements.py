@@ -0,0 +1,46 @@
+# src/repositories/user_statements.py
+"""
+Prebuilt SQL statements for the users table, shared by UserRepository and
+AsyncUserRepository.
+
+Every statement is built once at import time with named bind parameters, so
+each call only binds values: SQLAlchemy finds the compiled SQL in its
+statement cache instead of rebuilding the construct per request.
+Writes are single round trips (UPDATE ... RETURNING,
+INSERT ... ON CONFLICT DO NOTHING RETURNING).
+"""
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import UserDB
+
+# Params: username
+SELECT_BY_USERNAME = select(UserDB).where(UserDB.username == bindparam("username"))
+
+# Params: usernames (list)
+SELECT_EXISTING_USERNAMES = select(UserDB.username).where(
+    UserDB.username.in_(bindparam("usernames", expanding=True))
+)
+
+# Params: usernames (list), new_is_admin
+# Only rows whose flag actually changes are touched / returned.
+SET_ADMIN = (
+    update(UserDB)
+    .where(
+        UserDB.username.in_(bindparam("usernames", expanding=True)),
+        UserDB.is_admin != bindparam("new_is_admin"),
+    )
+    .values(is_admin=bindparam("new_is_admin"))
+    .returning(UserDB.username, UserDB.is_admin)
+    .execution_options(synchronize_session=False)
+)
+
+# Params: username, password, is_admin -> returns no row if the username exists
+# (ON CONFLICT is dialect specific: one prebuilt statement per dialect)
+INSERT_USER = {
+    name: insert(UserDB)
+    .on_conflict_do_nothing(index_elements=[UserDB.username])
+    .returning(UserDB.username, UserDB.is_admin)
+    for name, insert in (("postgresql", postgresql.insert), ("sqlite", sqlite.insert))
+}
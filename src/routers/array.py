@@ -1,86 +1,266 @@
-from fastapi import APIRouter, Depends
-from core.security import get_current_user, ensure_admin
-from schemas.array_schema import ArrayItem
+import asyncio
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, WebSocket
+from fastapi.responses import StreamingResponse
+
+from core.conditional import none_match
+from core.encoding import (
+    VARY, FastJSONResponse, encoded_response, model_response, negotiate_encoding, negotiate_media_type,
+)
+from core.config import (
+    ARRAY_PAGE_MAX_LIMIT, ARRAY_MAX_INDICES, ARRAY_STATS_MAX_BINS, ARRAY_FEED_HEARTBEAT_SECONDS,
+)
+from core.security import get_current_user, get_stream_user, ensure_admin
+from schemas.array_schema import ArrayItem, ArrayBatchRequest, ArrayBatchResult, ArrayStatsResult
 from controllers.array_controller import ArrayController, get_array_controller
 
 router = APIRouter(prefix="/array", tags=["Array"])
 
 @router.get("")
-def get_array(
+async def get_array(
+    request: Request,
+    offset: int = Query(0, ge=0, description="Skip this many selected elements (pagination cursor)"),
+    limit: int | None = Query(None, ge=1, le=ARRAY_PAGE_MAX_LIMIT),
+    start: int | None = Query(None, description="Slice start (Python semantics, may be negative)"),
+    stop: int | None = Query(None, description="Slice stop (Python semantics, may be negative)"),
+    step: int | None = Query(None, description="Slice step (non-zero, may be negative)"),
     current_user = Depends(get_current_user),
     controller: ArrayController = Depends(get_array_controller)
 ):
     """
     GET /array
-    Returns the entire array.
+    Returns the array, or the window items[start:stop:step] paginated with
+    offset / limit. X-Total-Count holds the number of selected elements;
+    when more remain, X-Next-Cursor (next offset) and a Link rel="next"
+    header point to the next page.
+    The ETag identifies the array version: send it back in If-None-Match
+    to get 304 Not Modified while the array is unchanged.
+    Accept: application/json (default), application/msgpack or
+    application/vnd.apache.arrow.stream; Accept-Encoding: br / gzip.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    media_type = negotiate_media_type(request.headers.get("accept"))
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+
+    if (start, stop, step, offset, limit) == (None, None, None, 0, None):
+        # Whole array: body pre-serialized once per version and format
+        etag, total, body, content_encoding = await controller.get_all_encoded(media_type, encoding)
+        headers = {"ETag": etag, "X-Total-Count": str(total)}
+        if none_match(if_none_match, etag):
+            return Response(status_code=304, headers={**headers, "Vary": VARY})
+        return encoded_response(body, media_type, content_encoding, headers)
+
+    page = await controller.get_page(start, stop, step, offset, limit)
+    headers = {"ETag": page.etag, "X-Total-Count": str(page.total)}
+    if page.next_offset is not None:
+        next_url = request.url.include_query_params(offset=page.next_offset)
+        headers["X-Next-Cursor"] = str(page.next_offset)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    if none_match(if_none_match, page.etag):
+        return Response(status_code=304, headers={**headers, "Vary": VARY})
+    body, content_encoding = await controller.encode_items(page.items, media_type, encoding)
+    return encoded_response(body, media_type, content_encoding, headers)
+
+
+@router.get("/items")
+async def get_values(
+    i: list[int] = Query(..., max_length=ARRAY_MAX_INDICES, description="Index to read (repeat: ?i=0&i=5&i=-1)"),
+    current_user = Depends(get_current_user),
+    controller: ArrayController = Depends(get_array_controller)
+):
+    """
+    GET /array/items?i=0&i=5&i=-1
+    Returns the values at several indices in one request, in the order asked.
+    Negative indices count from the end; any index out of range -> 404.
     """
-    return controller.get_all()
+    return await controller.get_many(i)
+
+
+@router.get("/stats", response_model=ArrayStatsResult)
+async def get_stats(
+    p: list[float] = Query([50, 90, 95, 99], description="Percentile to compute, 0-100 (repeat: ?p=50&p=99)"),
+    bins: int = Query(10, ge=1, le=ARRAY_STATS_MAX_BINS, description="Histogram bins"),
+    current_user = Depends(get_current_user),
+    controller: ArrayController = Depends(get_array_controller)
+):
+    """
+    GET /array/stats
+    count / sum / min / max / mean / percentiles / histogram over the numeric
+    (int / float) elements; strings are ignored.
+    """
+    return model_response(await controller.get_stats(p, bins))
+
+
+@router.websocket("/stream")
+async def stream_ws(
+    websocket: WebSocket,
+    since: str | None = Query(None, description="id of the last event received (resume)"),
+    current_user = Depends(get_stream_user),
+    controller: ArrayController = Depends(get_array_controller)
+):
+    """
+    WS /array/stream
+    One JSON text message per event: first {"type": "snapshot", "id", "version",
+    "array"} (or only the missed events when resuming with ?since=<id>), then
+    {"type": "change", "id", "version", "ops": [["append", v], ["set", i, v], ["pop"]]}
+    per write. A client that falls too far behind gets {"type": "evicted",
+    "resume": <id>} and is disconnected (code 1013); reconnect with ?since=<resume>.
+    Token: Authorization header or ?access_token=.
+    At ARRAY_FEED_MAX_SUBSCRIBERS the socket is closed right away with 1013 (try again later).
+    """
+    # Accepted first: an HTTP error response is not valid on a WebSocket
+    await websocket.accept()
+    try:
+        subscription = await controller.subscribe(since)
+    except HTTPException as exc:
+        await websocket.close(code=1013, reason=exc.detail)
+        return
+
+    async def send_events():
+        async for event in subscription.events():
+            await websocket.send_text(event.data)
+        await websocket.send_text(subscription.end_message())
+        await websocket.close(code=1013 if subscription.evicted else 1001)
+
+    async def wait_disconnect():
+        # Messages from the client are ignored
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = [asyncio.create_task(send_events()), asyncio.create_task(wait_disconnect())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        controller.unsubscribe(subscription)
+
+
+@router.get("/stream")
+async def stream_sse(
+    request: Request,
+    since: str | None = Query(None, description="id of the last event received (resume)"),
+    current_user = Depends(get_stream_user),
+    controller: ArrayController = Depends(get_array_controller)
+):
+    """
+    GET /array/stream (text/event-stream)
+    Same events as the WebSocket, as SSE frames ("event: snapshot|change",
+    "id: <id>"). EventSource reconnects with Last-Event-ID and resumes from
+    there. Ends with an "end" event ({"type": "evicted" | "closed", "resume"}).
+    """
+    subscription = await controller.subscribe(since or request.headers.get("last-event-id"))
+
+    async def frames():
+        try:
+            async for event in subscription.events(ARRAY_FEED_HEARTBEAT_SECONDS):
+                # None: idle -> comment line, keeps proxies from closing the stream
+                yield event.sse if event is not None else ": keepalive\n\n"
+            yield f"event: end\ndata: {subscription.end_message()}\n\n"
+        finally:
+            controller.unsubscribe(subscription)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/{index}")
-def get_value(
+async def get_value(
     index: int, 
     current_user = Depends(get_current_user),
     controller: ArrayController = Depends(get_array_controller)
 ):
     """
     GET /array/{index}
-    Returns a value by index.
+    Returns a value by index (negative indices count from the end).
     """
-    return controller.get_by_index(index)
+    return await controller.get_by_index(index)
 
 
 @router.post("", status_code=201)
-def add_value(
+async def add_value(
     item: ArrayItem, 
+    if_match: str | None = Header(None),
     current_user = Depends(get_current_user),
     controller: ArrayController = Depends(get_array_controller)
 ):
     """
     POST /array
-    Add a new value. Requires ADMIN.
+    Add a new value. Optional If-Match (412). Requires ADMIN.
+    """
+    ensure_admin(current_user)
+    content, etag = await controller.add_value(item.value, if_match)
+    return FastJSONResponse(content, status_code=201, headers={"ETag": etag})
+
+
+@router.post("/batch", response_model=ArrayBatchResult)
+async def apply_batch(
+    batch: ArrayBatchRequest,
+    if_match: str | None = Header(None),
+    current_user = Depends(get_current_user),
+    controller: ArrayController = Depends(get_array_controller)
+):
+    """
+    POST /array/batch
+    Apply an ordered list of operations atomically, e.g.
+    {"ops": [{"op": "append", "value": 1}, {"op": "set", "index": 0, "value": "x"},
+             {"op": "reset", "index": 2}, {"op": "pop"}]}
+    If any operation fails, nothing is applied. Optional If-Match (412). Requires ADMIN.
     """
     ensure_admin(current_user)
-    return controller.add_value(item.value)
+    result, etag = await controller.apply_batch(batch.ops, if_match)
+    return model_response(result, headers={"ETag": etag})
 
 
 @router.put("/{index}")
-def update_value(
+async def update_value(
     index: int, 
     item: ArrayItem, 
+    if_match: str | None = Header(None),
     current_user = Depends(get_current_user),
     controller: ArrayController = Depends(get_array_controller)
 ):
     """
     PUT /array/{index}
-    Replace value. Requires ADMIN.
+    Replace value. With If-Match, only if the array is still at that
+    version (else 412). Requires ADMIN.
     """
     ensure_admin(current_user)
-    return controller.update_value(index, item.value)
+    content, etag = await controller.update_value(index, item.value, if_match)
+    return FastJSONResponse(content, headers={"ETag": etag})
 
 
 @router.delete("")
-def delete_last(
+async def delete_last(
+    if_match: str | None = Header(None),
     current_user = Depends(get_current_user),
     controller: ArrayController = Depends(get_array_controller)
 ):
     """
     DELETE /array
-    Remove last element. Requires ADMIN.
+    Remove last element. With If-Match, only if the array is still at that
+    version (else 412). Requires ADMIN.
     """
     ensure_admin(current_user)
-    return controller.delete_last()
+    content, etag = await controller.delete_last(if_match)
+    return FastJSONResponse(content, headers={"ETag": etag})
 
 
 @router.delete("/{index}")
-def reset_by_index(
+async def reset_by_index(
     index: int, 
+    if_match: str | None = Header(None),
     current_user = Depends(get_current_user),
     controller: ArrayController = Depends(get_array_controller)
 ):
     """
     DELETE /array/{index}
-    Reset to 0. Requires ADMIN.
+    Reset to 0. With If-Match, only if the array is still at that version
+    (else 412). Requires ADMIN.
     """
     ensure_admin(current_user)
-    return controller.reset_index(index)
\ No newline at end of file
+    content, etag = await controller.reset_index(index, if_match)
+    return FastJSONResponse(content, headers={"ETag": etag})
\ No newline at end of file
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends
 from fastapi.security import OAuth2PasswordRequestForm
+from core.encoding import model_response
 from core.security import get_current_user
 from schemas.token_schema import TokenResponse
 
@@ -13,24 +14,24 @@ router = APIRouter(tags=["Auth"])
 # LOGIN (OAuth2 password)
 # -----------------------
 @router.post("/login", response_model=TokenResponse)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     controller: AuthController = Depends(get_auth_controller),
 ):
-    return controller.login(form_data.username, form_data.password)
+    return model_response(await controller.login(form_data.username, form_data.password))
 
 # -----------------------
 # Who am I (protected)
 # -----------------------
 @router.get("/me")
-def me(current_user = Depends(get_current_user)):
+async def me(current_user = Depends(get_current_user)):
     return {"user": current_user.username}
 
 # -----------------------
 # Echo (protected)
 # -----------------------
 @router.get("/echo")
-def echo_message(
+async def echo_message(
     msg: str,
     current_user = Depends(get_current_user),
 ):
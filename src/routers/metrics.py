@@ -0,0 +1,156 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse, Response
+
+from core.config import METRICS_TOKEN
+from core.security import get_current_user, ensure_admin, verify_metrics_token
+from core.principal_cache import principal_cache
+from core.profiling import profile_store, continuous_profiler
+from core.admission import admission_controller
+from core.query_stats import query_stats
+from core.request_metrics import request_metrics
+from core import pool_metrics, prometheus
+from services import array_service
+
+# Operational counters (caches, DB pool, requests) and profiles. ADMIN only.
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+# GET /metrics: METRICS_TOKEN when configured (Prometheus), otherwise an admin JWT
+scrape_auth = verify_metrics_token if METRICS_TOKEN else get_current_user
+
+@router.get("", response_class=Response)
+def prometheus_metrics(current_user = Depends(scrape_auth)):
+    """
+    GET /metrics
+    Everything below (requests, pools, caches, array feed) in Prometheus text format.
+    """
+    if current_user is not None:
+        ensure_admin(current_user)
+    return Response(prometheus.render(), media_type=prometheus.CONTENT_TYPE)
+
+
+@router.get("/requests")
+def request_stats(current_user = Depends(get_current_user)):
+    """
+    GET /metrics/requests
+    Latency histograms per route, responses per status, requests in flight,
+    SQL statements / DB time / over-budget requests per route and span
+    (jwt / bcrypt / db / encode) histograms.
+    """
+    ensure_admin(current_user)
+    return request_metrics.snapshot()
+
+
+@router.get("/principal-cache")
+def principal_cache_stats(current_user = Depends(get_current_user)):
+    """
+    GET /metrics/principal-cache
+    Hit / miss / coalesced / eviction counters of the get_current_user cache.
+    """
+    ensure_admin(current_user)
+    return principal_cache.stats()
+
+
+@router.get("/pool")
+def pool_stats(current_user = Depends(get_current_user)):
+    """
+    GET /metrics/pool
+    Connection pool statistics per engine (checked out, overflow, wait times).
+    """
+    ensure_admin(current_user)
+    return pool_metrics.snapshot()
+
+
+@router.get("/array-cache")
+def array_cache_stats(current_user = Depends(get_current_user)):
+    """
+    GET /metrics/array-cache
+    Storage backend, cached version and hit / reload counters of the array cache.
+    """
+    ensure_admin(current_user)
+    return array_service.store.stats()
+
+
+@router.get("/array-feed")
+def array_feed_stats(current_user = Depends(get_current_user)):
+    """
+    GET /metrics/array-feed
+    Subscribers, published events, snapshots / resumes and slow-consumer evictions
+    of the /array/stream change feed.
+    """
+    ensure_admin(current_user)
+    return array_service.feed.stats()
+
+
+@router.get("/queries")
+def query_stats_view(
+    limit: int = Query(20, ge=1, le=1000),
+    order_by: Literal["total", "calls", "max", "mean"] = "total",
+    current_user = Depends(get_current_user),
+):
+    """
+    GET /metrics/queries?limit=20&order_by=total
+    Top SQL statements by fingerprint (calls, total / mean / max time, rows)
+    and the sampled slow-query log. Per-route counts are in /metrics/requests.
+    """
+    ensure_admin(current_user)
+    return query_stats.snapshot(limit, order_by)
+
+
+@router.get("/admission")
+def admission_stats(current_user = Depends(get_current_user)):
+    """
+    GET /metrics/admission
+    Per class: limit, in flight, waiting, queue wait, admitted / queued /
+    rejected (queue_full, timeout, overloaded); rate-limited users and login IPs.
+    """
+    ensure_admin(current_user)
+    return admission_controller.stats()
+
+
+@router.get("/profiles")
+def list_profiles(current_user = Depends(get_current_user)):
+    """
+    GET /metrics/profiles
+    Saved profiles (newest first) and the state of continuous sampling.
+    A request is profiled when an admin adds ?profile=1 or "X-Profile: 1".
+    """
+    ensure_admin(current_user)
+    return {"continuous": continuous_profiler.status(), "profiles": profile_store.list()}
+
+
+@router.post("/profiles/continuous")
+def start_continuous_profiling(
+    seconds: float = Query(60, gt=0),
+    current_user = Depends(get_current_user),
+):
+    """
+    POST /metrics/profiles/continuous?seconds=60
+    Sample the whole process for `seconds` (capped by PROFILE_CONTINUOUS_MAX_SECONDS),
+    one profile file per PROFILE_WINDOW_SECONDS. 409 while running,
+    429 within PROFILE_CONTINUOUS_COOLDOWN_SECONDS of the previous run.
+    """
+    ensure_admin(current_user)
+    return continuous_profiler.start(seconds)
+
+
+@router.delete("/profiles/continuous")
+def stop_continuous_profiling(current_user = Depends(get_current_user)):
+    """
+    DELETE /metrics/profiles/continuous
+    Stop continuous sampling early (what was sampled so far is saved).
+    """
+    ensure_admin(current_user)
+    return continuous_profiler.stop()
+
+
+@router.get("/profiles/{name}", response_class=PlainTextResponse)
+def get_profile(name: str, current_user = Depends(get_current_user)):
+    """
+    GET /metrics/profiles/{name}
+    One profile as collapsed stacks ("frame;frame;frame count" per line):
+    open it in https://www.speedscope.app or feed it to flamegraph.pl.
+    """
+    ensure_admin(current_user)
+    return PlainTextResponse(profile_store.read(name))
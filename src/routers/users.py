@@ -1,43 +1,122 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from core.config import USERS_PAGE_MAX_LIMIT
+from core.encoding import JSON, encoded_response, model_response, negotiate_encoding, negotiate_media_type
 
 from core.security import get_current_user, ensure_admin
-from schemas.user_schema import RegisterRequest, UserOut
+from schemas.user_schema import (
+    RegisterRequest, UserOut, UserImportReport, BulkRoleChangeRequest, BulkRoleChangeResult,
+)
 
 # מייבאים גם את המחלקה וגם את פונקציית ה-Dependency
-from controllers.user_controller import UserController, get_user_controller
+from controllers.user_controller import (
+    UserController, get_user_controller, UserImportController, get_user_import_controller,
+)
 
 # All endpoints here are under the /users prefix and tagged as "Users" in Swagger.
 router = APIRouter(prefix="/users", tags=["Users"])
 
 @router.post("", response_model=UserOut, status_code=201)
-def register(
+async def register(
     data: RegisterRequest,
     controller: UserController = Depends(get_user_controller)
 ):
-    return controller.register(data)
+    return model_response(await controller.register(data), status_code=201)
 
 @router.put("/{username}/promote", response_model=UserOut)
-def promote_user(
+async def promote_user(
     username: str,
     current_user = Depends(get_current_user),
     controller: UserController = Depends(get_user_controller)
 ):
     ensure_admin(current_user)
-    return controller.update_admin_status(username, make_admin=True)
+    return model_response(await controller.update_admin_status(username, make_admin=True))
 
 @router.put("/{username}/demote", response_model=UserOut)
-def demote_user(
+async def demote_user(
     username: str,
     current_user = Depends(get_current_user),
     controller: UserController = Depends(get_user_controller)
 ):
     ensure_admin(current_user)
-    return controller.update_admin_status(username, make_admin=False)
+    return model_response(await controller.update_admin_status(username, make_admin=False))
+
+@router.put("/promote", response_model=BulkRoleChangeResult)
+async def promote_users(
+    data: BulkRoleChangeRequest,
+    current_user = Depends(get_current_user),
+    controller: UserController = Depends(get_user_controller)
+):
+    """
+    PUT /users/promote
+    Make every listed user an admin with a single UPDATE statement.
+    Requires ADMIN.
+    """
+    ensure_admin(current_user)
+    return model_response(await controller.update_admin_status_bulk(data.usernames, make_admin=True))
+
+@router.put("/demote", response_model=BulkRoleChangeResult)
+async def demote_users(
+    data: BulkRoleChangeRequest,
+    current_user = Depends(get_current_user),
+    controller: UserController = Depends(get_user_controller)
+):
+    """
+    PUT /users/demote
+    Make every listed user a regular user with a single UPDATE statement.
+    Requires ADMIN.
+    """
+    ensure_admin(current_user)
+    return model_response(await controller.update_admin_status_bulk(data.usernames, make_admin=False))
 
 @router.get("", response_model=list[UserOut])
-def list_all_users(
+async def list_all_users(
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=USERS_PAGE_MAX_LIMIT),
+    after: int | None = Query(None, ge=0, description="next_cursor of the previous page"),
+    stream: bool = False,
     current_user = Depends(get_current_user),
     controller: UserController = Depends(get_user_controller)
 ):
+    """
+    GET /users
+    - ?limit=N[&after=cursor]: one keyset page; the next cursor is returned in
+      the X-Next-Cursor header (and a Link rel="next" header)
+    - ?stream=true: the whole list streamed from a server-side cursor (JSON only)
+    - no parameters: all users
+    Accept: application/json (default), application/msgpack or
+    application/vnd.apache.arrow.stream; Accept-Encoding: br / gzip.
+    Requires ADMIN.
+    """
+    ensure_admin(current_user)
+    if stream:
+        if negotiate_media_type(request.headers.get("accept")) != JSON:
+            raise HTTPException(status_code=406, detail="?stream=true is only available as application/json")
+        return StreamingResponse(controller.stream_all(), media_type="application/json")
+
+    media_type = negotiate_media_type(request.headers.get("accept"))
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    page = await controller.list_all(limit, after)
+    headers = {}
+    if page.next_cursor is not None:
+        next_url = request.url.include_query_params(after=page.next_cursor)
+        headers["X-Next-Cursor"] = str(page.next_cursor)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    body, content_encoding = await controller.encode(page.items, media_type, encoding)
+    return encoded_response(body, media_type, content_encoding, headers)
+
+@router.post("/import", response_model=UserImportReport)
+async def import_users(
+    request: Request,
+    current_user = Depends(get_current_user),
+    controller: UserImportController = Depends(get_user_import_controller)
+):
+    """
+    POST /users/import
+    Bulk-create users from a streamed NDJSON (application/x-ndjson) or CSV
+    (text/csv) body. Existing usernames are skipped. Returns a per-row report.
+    Requires ADMIN.
+    """
     ensure_admin(current_user)
-    return controller.list_all()
\ No newline at end of file
+    return model_response(await controller.import_users(request.stream(), request.headers.get("content-type")))
@@ -1,8 +1,74 @@
-from typing import Union
-from pydantic import BaseModel
+from typing import Annotated, Literal, Union
+from pydantic import BaseModel, Field
+
+from core.config import ARRAY_BATCH_MAX_OPS
 
 class ArrayItem(BaseModel):
     # This model wraps a single "value" field.
     # Updated: Instead of 'Any', restrict it to specific allowed types.
     # This means the value can be a String OR an Integer OR a Float.
-    value: Union[str, int, float]
\ No newline at end of file
+    value: Union[str, int, float]
+
+class ArrayPage(BaseModel):
+    # One window of the array (GET /array with offset / limit / slice params).
+    items: list
+    # Number of elements selected by the slice (all pages together).
+    total: int
+    # offset of the next page (None when this is the last page).
+    next_offset: int | None = None
+    # ETag of the array version the page was read from.
+    etag: str | None = None
+
+# ----- POST /array/batch -----
+# One model per operation, selected by the "op" field.
+class AppendOp(BaseModel):
+    op: Literal["append"]
+    value: Union[str, int, float]
+
+class SetOp(BaseModel):
+    op: Literal["set"]
+    index: int = Field(ge=0)
+    value: Union[str, int, float]
+
+class ResetOp(BaseModel):
+    # Same as DELETE /array/{index}: overwrite with 0.
+    op: Literal["reset"]
+    index: int = Field(ge=0)
+
+class PopOp(BaseModel):
+    op: Literal["pop"]
+
+ArrayOperation = Annotated[Union[AppendOp, SetOp, ResetOp, PopOp], Field(discriminator="op")]
+
+class ArrayBatchRequest(BaseModel):
+    # Applied in order, atomically: if one operation fails, none is applied.
+    ops: list[ArrayOperation] = Field(min_length=1, max_length=ARRAY_BATCH_MAX_OPS)
+
+class ArrayBatchResult(BaseModel):
+    # Number of operations applied.
+    applied: int
+    # Length of the array after the batch.
+    length: int
+    # Values removed by "pop" operations, in order.
+    popped: list = []
+
+# ----- GET /array/stats -----
+class ArrayHistogram(BaseModel):
+    # bins + 1 bin edges, and the number of values per bin.
+    edges: list[float] = []
+    counts: list[int] = []
+
+class ArrayStatsResult(BaseModel):
+    # Array version the stats were computed for.
+    version: int
+    # Number of elements (all types) and of numeric (int / float) elements.
+    length: int
+    count: int
+    # Aggregates over the numeric elements (None when there are none).
+    sum: float
+    min: float | None = None
+    max: float | None = None
+    mean: float | None = None
+    # "p50" -> value, for each requested percentile.
+    percentiles: dict[str, float] = {}
+    histogram: ArrayHistogram = ArrayHistogram()
@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from core.config import USERS_BULK_ROLE_MAX
 
 class RegisterRequest(BaseModel):
     # The username to create (must be unique in DB).
@@ -18,4 +20,48 @@ class UserOut(BaseModel):
     class Config:
         # Allow Pydantic to build this model directly from SQLAlchemy objects
         # (it reads attributes instead of expecting dicts).
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class UserPage(BaseModel):
+    # One keyset page of users.
+    items: list[UserOut]
+    # id of the last user in the page; pass it as ?after= to get the next page
+    # (None when this is the last page).
+    next_cursor: int | None = None
+
+class UserImportRow(BaseModel):
+    # One row of a bulk import (NDJSON object or CSV line).
+    username: str = Field(min_length=1, max_length=50)
+    # Plain password (hashed by the server) ...
+    password: str | None = None
+    # ... or an existing bcrypt hash (e.g. migrating from another system).
+    password_hash: str | None = None
+    # The import is admin-only, so rows may create admins directly.
+    is_admin: bool = False
+
+class UserImportRowResult(BaseModel):
+    # 1-based line number in the uploaded file (header line included for CSV).
+    line: int
+    username: str | None = None
+    # created | exists (already in DB) | duplicate (earlier in the file) | invalid
+    status: str
+    error: str | None = None
+
+class UserImportReport(BaseModel):
+    created: int = 0
+    existing: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    rows: list[UserImportRowResult] = []
+
+class BulkRoleChangeRequest(BaseModel):
+    # Usernames to promote / demote in one statement (duplicates are ignored).
+    usernames: list[str] = Field(min_length=1, max_length=USERS_BULK_ROLE_MAX)
+
+class BulkRoleChangeResult(BaseModel):
+    # Users whose role was changed by this request.
+    updated: list[str] = []
+    # Users that already had the requested role.
+    unchanged: list[str] = []
+    # Usernames that do not exist.
+    not_found: list[str] = []
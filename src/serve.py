@@ -0,0 +1,149 @@
+# src/serve.py
+"""
+Production entry point: uvicorn tuned for the container it runs in.
+
+    python src/serve.py
+
+- workers: SERVER_WORKERS, or (0, the default) one per CPU of the container's
+  CPU quota (cgroup v2 cpu.max / v1 cfs quota, else the CPUs the process may
+  run on). Every worker has its own DB pools (DB_POOL_SIZE + DB_MAX_OVERFLOW
+  each), caches and metrics: size the database's max_connections for all of them.
+- event loop / HTTP parser: uvloop and httptools when installed (SERVER_LOOP,
+  SERVER_HTTP; "asyncio" / "h11" to opt out)
+- PORT (set by Cloud Run), SERVER_HOST, SERVER_BACKLOG, SERVER_KEEPALIVE_SECONDS
+- the threadpool size of every worker (THREADPOOL_SIZE) is applied in main.py's
+  lifespan, where the worker's event loop runs
+
+On SIGTERM (Cloud Run scale-in / redeploy) uvicorn stops accepting
+connections and lets running requests finish for up to
+SERVER_GRACEFUL_TIMEOUT_SECONDS (keep it below the platform's kill delay,
+10s on Cloud Run). /array/stream subscriptions, which would never finish on
+their own, are ended as soon as draining starts. The lifespan shutdown then
+disposes the DB pools.
+
+For development, `uvicorn src.main:app --reload` still works as before.
+"""
+
+import logging
+import math
+import os
+import sys
+from contextlib import contextmanager
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from core.config import (
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_WORKERS,
+    SERVER_LOOP,
+    SERVER_HTTP,
+    SERVER_BACKLOG,
+    SERVER_KEEPALIVE_SECONDS,
+    SERVER_GRACEFUL_TIMEOUT_SECONDS,
+)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_quota() -> int:
+    """CPUs the container may use (at least 1)."""
+    available = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+    quota = None
+    cpu_max = _read("/sys/fs/cgroup/cpu.max")  # cgroup v2: "<quota> <period>" or "max <period>"
+    if cpu_max is not None:
+        limit, _, period = cpu_max.partition(" ")
+        if limit != "max":
+            quota = int(limit) / int(period)
+    else:  # cgroup v1: quota -1 = unlimited
+        limit = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+        period = _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+        if limit is not None and period is not None and int(limit) > 0:
+            quota = int(limit) / int(period)
+
+    if quota is not None:
+        # 1.5 CPUs -> 2 workers; a fraction of a CPU -> 1
+        available = min(available, math.ceil(quota))
+    return max(1, available)
+
+
+def _installed(module: str) -> bool:
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+class DrainingServer(uvicorn.Server):
+    @contextmanager
+    def capture_signals(self):
+        from core.app_logging import shutdown_logging
+
+        with super().capture_signals():
+            try:
+                yield
+            finally:
+                # Flush the log queue before uvicorn re-raises SIGTERM (which
+                # ends the process; workers exit without atexit handlers too)
+                shutdown_logging()
+
+    async def shutdown(self, sockets=None) -> None:
+        # Streaming subscriptions would hold the graceful shutdown until its
+        # timeout: end them first, then let uvicorn drain the rest
+        from services import array_service
+
+        array_service.feed.close()
+        await super().shutdown(sockets)
+
+
+def build_config() -> uvicorn.Config:
+    workers = SERVER_WORKERS or cpu_quota()
+    loop = SERVER_LOOP
+    if loop == "auto":
+        loop = "uvloop" if _installed("uvloop") else "asyncio"
+    http = SERVER_HTTP
+    if http == "auto":
+        http = "httptools" if _installed("httptools") else "h11"
+    return uvicorn.Config(
+        "main:app",
+        host=SERVER_HOST,
+        port=SERVER_PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=SERVER_BACKLOG,
+        timeout_keep_alive=SERVER_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=SERVER_GRACEFUL_TIMEOUT_SECONDS,
+    )
+
+
+def main() -> None:
+    config = build_config()
+    server = DrainingServer(config)
+    logger.info(
+        "Starting %d worker(s) on %s:%d (loop=%s, http=%s, backlog=%d, keep-alive=%ds)",
+        config.workers, config.host, config.port, config.loop, config.http,
+        config.backlog, config.timeout_keep_alive,
+    )
+    if config.workers > 1:
+        sock = config.bind_socket()
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+    if not server.started and config.workers == 1:
+        sys.exit(3)  # uvicorn's STARTUP_FAILURE
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,238 @@
 # services/array_service.py
 from fastapi import HTTPException
 
-# In-memory array storage (simple demo state shared across requests)
-array_storage: list = ["first", "second", "third"]
+from core.array_cache import VersionedArrayCache
+from core.array_feed import ArrayFeed, FeedFull, FeedSubscription
+from core.array_stats import ArrayStats
+from core.conditional import expected_version, make_etag, tag_version
+from core.encoding import JSON, compress, encode_array
+from core.config import (
+    ARRAY_STORAGE, ARRAY_CACHE_ENABLED, ARRAY_CACHE_MAX_STALENESS_SECONDS,
+    ARRAY_FEED_QUEUE_SIZE, ARRAY_FEED_HISTORY, ARRAY_FEED_POLL_SECONDS, ARRAY_FEED_MAX_SUBSCRIBERS,
+)
+from database import engine
+from repositories.array_repository import (
+    ArrayBackend, ArrayOpError, MemoryArrayBackend, SqlArrayBackend, VersionConflict,
+)
+from schemas.array_schema import (
+    ArrayBatchResult, ArrayOperation, ArrayPage, ArrayStatsResult, AppendOp, SetOp, ResetOp,
+)
+
+# Array storage: pluggable backend (ARRAY_STORAGE) behind a versioned,
+# write-through in-process cache. Calls may block on the DB -> threadpool.
+def _build_backend() -> ArrayBackend:
+    if ARRAY_STORAGE == "memory":
+        return MemoryArrayBackend()
+    if ARRAY_STORAGE == "database":
+        return SqlArrayBackend(engine)
+    raise RuntimeError(f"Unknown ARRAY_STORAGE {ARRAY_STORAGE!r} (use 'memory' or 'database')")
+
+store = VersionedArrayCache(
+    _build_backend(),
+    enabled=ARRAY_CACHE_ENABLED,
+    max_staleness=ARRAY_CACHE_MAX_STALENESS_SECONDS,
+)
+
+# Numeric aggregates, kept up to date incrementally from the cache's changes
+stats = ArrayStats()
+store.add_listener(stats)
+
+# Change feed for /array/stream subscribers
+feed = ArrayFeed(
+    store,
+    queue_size=ARRAY_FEED_QUEUE_SIZE,
+    history=ARRAY_FEED_HISTORY,
+    poll_interval=ARRAY_FEED_POLL_SECONDS,
+    max_subscribers=ARRAY_FEED_MAX_SUBSCRIBERS,
+)
+store.add_listener(feed)
+
+# GET /array bodies of the current version, serialized (and compressed) once
+# per format: (epoch, version, {(media type, encoding): (length, body, Content-Encoding)})
+_bodies: tuple[str, int, dict] = ("", -1, {})
+
+def _etag(version: int) -> str:
+    return make_etag(store.epoch, version)
+
+def _expected(if_match: str | None) -> int | None:
+    return expected_version(if_match, store.epoch)
+
+def _precondition_failed(e: VersionConflict) -> HTTPException:
+    return HTTPException(
+        status_code=412,
+        detail="Precondition failed: the array was modified",
+        headers={"ETag": _etag(e.current)},
+    )
 
 def get_all() -> list:
     """Return the whole array."""
-    return array_storage
+    return store.read()[1]
+
+def get_all_encoded(media_type: str = JSON, encoding: str | None = None) -> tuple[str, int, bytes, str | None]:
+    """
+    (ETag, length, body, Content-Encoding) of GET /array in the given format.
+    Each body is serialized once per version and reused until the array changes.
+    """
+    global _bodies
+    # One snapshot: the bodies are built from exactly the version of their ETag
+    version, items = store.read()
+    epoch = store.epoch
+    cached_epoch, cached_version, bodies = _bodies
+    if (epoch, version) != (cached_epoch, cached_version):
+        bodies = {}
+        # A request still on an older snapshot must not replace newer bodies
+        if epoch != cached_epoch or version > cached_version:
+            _bodies = (epoch, version, bodies)
+    key = (media_type, encoding)
+    if key not in bodies:
+        body, content_encoding = compress(encode_array(items, media_type), encoding)
+        bodies[key] = (len(items), body, content_encoding)
+    return (make_etag(epoch, version), *bodies[key])
+
+def encode_items(items: list, media_type: str = JSON, encoding: str | None = None) -> tuple[bytes, str | None]:
+    """(body, Content-Encoding) of a page of the array."""
+    return compress(encode_array(items, media_type), encoding)
+
+def _resolve_index(index: int, length: int) -> int:
+    """Python-style index (negative counts from the end) or 404 if out of range."""
+    resolved = index + length if index < 0 else index
+    if resolved < 0 or resolved >= length:
+        raise HTTPException(status_code=404, detail=f"Index {index} out of range")
+    return resolved
 
 def get_by_index(index: int) -> dict:
-    """Return a single item by index or 404 if out of range."""
-    if index < 0 or index >= len(array_storage):
-        raise HTTPException(status_code=404, detail="Index out of range")
-    return {"value": array_storage[index]}
+    """Return a single item by index (negative = from the end) or 404 if out of range."""
+    items = get_all()
+    return {"value": items[_resolve_index(index, len(items))]}
 
-def add(value) -> list:
+def get_many(indices: list[int]) -> list:
+    """Return the items at the given indices, in request order (404 if any is out of range)."""
+    items = get_all()
+    length = len(items)
+    return [items[_resolve_index(index, length)] for index in indices]
+
+def get_page(
+    start: int | None = None,
+    stop: int | None = None,
+    step: int | None = None,
+    offset: int = 0,
+    limit: int | None = None,
+) -> ArrayPage:
+    """
+    Return items[start:stop:step] (Python slice semantics), paginated with
+    offset / limit over the selected elements.
+    Only the returned window is copied - and nothing when the whole array is asked for.
+    """
+    if step == 0:
+        raise HTTPException(status_code=400, detail="step cannot be zero")
+
+    version, items = store.read()
+    # Index arithmetic on range objects: O(1), no element is touched yet
+    selected = range(len(items))[start:stop:step]
+    window = selected[offset:] if limit is None else selected[offset:offset + limit]
+
+    if window == range(len(items)):
+        values = items
+    elif window.step == 1:
+        values = items[window.start:window.stop]
+    else:
+        values = [items[i] for i in window]
+
+    end = offset + len(window)
+    # model_construct: the values are already valid, skip per-element validation
+    return ArrayPage.model_construct(
+        items=values,
+        total=len(selected),
+        next_offset=end if end < len(selected) else None,
+        etag=_etag(version),
+    )
+
+def get_stats(percentiles: list[float], bins: int) -> ArrayStatsResult:
+    """count / sum / min / max / mean / percentiles / histogram of the numeric elements."""
+    if any(not 0 <= p <= 100 for p in percentiles):
+        raise HTTPException(status_code=400, detail="Percentiles must be between 0 and 100")
+    return ArrayStatsResult(**stats.snapshot(store, tuple(percentiles), bins))
+
+async def subscribe(since: str | None = None) -> FeedSubscription:
+    """
+    Subscribe to the change feed. `since` is the id of the last event the
+    client received: it then gets only the events it missed, when possible.
+    """
+    since_version = tag_version(since, store.epoch) if since else None
+    try:
+        return await feed.subscribe(since_version)
+    except FeedFull:
+        raise HTTPException(status_code=503, detail="Too many subscribers", headers={"Retry-After": "5"})
+
+def unsubscribe(subscription: FeedSubscription) -> None:
+    feed.unsubscribe(subscription)
+
+# Writes take the raw If-Match header (optimistic concurrency, 412 on mismatch)
+# and return (response body, ETag of the new version).
+def add(value, if_match: str | None = None) -> tuple[list, str]:
     """Append a new value to the end of the array and return the array."""
-    array_storage.append(value)
-    return array_storage
+    try:
+        version = store.append(value, _expected(if_match))
+    except VersionConflict as e:
+        raise _precondition_failed(e)
+    return get_all(), _etag(version)
 
-def update(index: int, value):
+def update(index: int, value, if_match: str | None = None) -> tuple[dict, str]:
     """Replace the value at a given index or 404 if out of range."""
-    if index < 0 or index >= len(array_storage):
+    try:
+        version = store.set(index, value, _expected(if_match))
+    except VersionConflict as e:
+        raise _precondition_failed(e)
+    if version is None:
         raise HTTPException(status_code=404, detail="Index out of range")
-    array_storage[index] = value
-    return {"index": index, "value": value}
+    return {"index": index, "value": value}, _etag(version)
 
-def delete_last():
+def delete_last(if_match: str | None = None) -> tuple[dict, str]:
     """Pop the last value or 400 if the array is empty."""
-    if not array_storage:
+    try:
+        popped = store.pop(_expected(if_match))
+    except VersionConflict as e:
+        raise _precondition_failed(e)
+    if popped is None:
         raise HTTPException(status_code=400, detail="Array is empty")
-    deleted = array_storage.pop()
-    return {"deleted": deleted, "array": array_storage}
+    return {"deleted": popped[1], "array": get_all()}, _etag(popped[0])
 
-def reset_index(index: int):
+def reset_index(index: int, if_match: str | None = None) -> tuple[dict, str]:
     """
     Set a given index to 0 (per assignment requirement) or 404 if out of range.
     This does NOT remove the element — it overwrites it with 0.
     """
-    if index < 0 or index >= len(array_storage):
+    try:
+        version = store.set(index, 0, _expected(if_match))
+    except VersionConflict as e:
+        raise _precondition_failed(e)
+    if version is None:
         raise HTTPException(status_code=404, detail="Index out of range")
-    array_storage[index] = 0
-    return {"index": index, "array": array_storage}
+    return {"index": index, "array": get_all()}, _etag(version)
+
+def apply_batch(operations: list[ArrayOperation], if_match: str | None = None) -> tuple[ArrayBatchResult, str]:
+    """
+    Apply append / set / reset / pop operations in order, atomically
+    (one transaction, one version bump). Errors mirror the single endpoints:
+    404 for an index out of range, 400 for a pop on an empty array.
+    """
+    ops = []
+    for operation in operations:
+        if isinstance(operation, AppendOp):
+            ops.append(("append", operation.value))
+        elif isinstance(operation, SetOp):
+            ops.append(("set", operation.index, operation.value))
+        elif isinstance(operation, ResetOp):
+            ops.append(("set", operation.index, 0))
+        else:
+            ops.append(("pop",))
+
+    try:
+        version, popped = store.apply(ops, _expected(if_match))
+    except VersionConflict as e:
+        raise _precondition_failed(e)
+    except ArrayOpError as e:
+        status_code = 404 if e.reason == "index out of range" else 400
+        raise HTTPException(status_code=status_code, detail=f"Operation {e.position}: {e.reason}")
+
+    return ArrayBatchResult(applied=len(ops), length=len(get_all()), popped=popped), _etag(version)
@@ -0,0 +1,42 @@
+from datetime import timedelta
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import ACCESS_TOKEN_EXPIRE_MINUTES
+from core.security import create_access_token, verify_password_async
+from repositories.async_user_repository import AsyncUserRepository
+from schemas.token_schema import TokenResponse
+
+# Async counterpart of auth_service (used when DB_ASYNC=1)
+
+async def login(db: AsyncSession, username: str, password: str) -> TokenResponse:
+    repo = AsyncUserRepository(db)
+
+    # Fetch user record from DB by username
+    db_user = await repo.get_by_username(username)
+
+    if db_user is None:
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+
+    # Payload
+    token_data = {
+        "sub": db_user.username,
+        "is_admin": db_user.is_admin
+    }
+    password_hash = db_user.password
+
+    # End the read transaction so the pooled DB connection is not held
+    # during the slow bcrypt check
+    await db.rollback()
+
+    # Login check
+    if not await verify_password_async(password, password_hash):
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+
+    # Create JWT
+    token = create_access_token(
+        token_data,
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+    return TokenResponse(access_token=token, token_type="bearer")
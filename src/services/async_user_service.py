@@ -0,0 +1,111 @@
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.encoding import encode_json
+from core.security import get_password_hash_async
+from core.config import ADMIN_SECRET, USERS_STREAM_BATCH_SIZE
+from repositories.async_user_repository import AsyncUserRepository
+from schemas.user_schema import BulkRoleChangeResult, RegisterRequest, UserOut, UserPage
+
+# Async counterpart of user_service (used when DB_ASYNC=1)
+
+async def register_user(db: AsyncSession, data: RegisterRequest) -> UserOut:
+    repo = AsyncUserRepository(db)
+
+    # Cheap existence check first (same 400-before-403 order as always): a
+    # taken username must not cost a bcrypt hash on the bounded hashing pool
+    if await repo.existing_usernames([data.username]):
+        raise HTTPException(status_code=400, detail="Username already exists")
+    # End the read transaction: no pooled connection is held during the hash
+    await db.rollback()
+
+    # Determine if new user should be admin
+    is_admin = False
+
+    # If admin_secret is provided → validate it
+    if data.admin_secret not in (None, ""):
+        if data.admin_secret != ADMIN_SECRET:
+            raise HTTPException(status_code=403, detail="Invalid admin secret")
+        is_admin = True
+
+    # Hash the password
+    hashed_password = await get_password_hash_async(data.password)
+
+    # Create user in the database: INSERT ... ON CONFLICT DO NOTHING covers a
+    # concurrent registration of the same username since the check above
+    new_user = await repo.create_user(data.username, hashed_password, is_admin)
+    if new_user is None:
+        raise HTTPException(status_code=400, detail="Username already exists")
+
+    return UserOut(username=new_user.username, is_admin=new_user.is_admin)
+
+
+async def update_admin_status(db: AsyncSession, username: str, make_admin: bool) -> UserOut:
+    """
+    Unified function to promote or demote a user.
+    """
+    repo = AsyncUserRepository(db)
+
+    # 1. Update status (one UPDATE ... RETURNING; only changes a different role)
+    user = await repo.set_admin(username, make_admin)
+    if user is not None:
+        return UserOut(username=user.username, is_admin=user.is_admin)
+
+    # 2. Nothing changed: tell "unknown user" from "already has that role"
+    if not await repo.existing_usernames([username]):
+        raise HTTPException(status_code=404, detail="User not found")
+    status_str = "an admin" if make_admin else "a regular user"
+    raise HTTPException(status_code=400, detail=f"User is already {status_str}")
+
+
+async def update_admin_status_bulk(db: AsyncSession, usernames: list[str], make_admin: bool) -> BulkRoleChangeResult:
+    """
+    Promote or demote many users with one UPDATE statement.
+    """
+    repo = AsyncUserRepository(db)
+    usernames = list(dict.fromkeys(usernames))  # dedupe, keep order
+
+    updated = {row.username for row in await repo.set_admin_many(usernames, make_admin)}
+    # Only the usernames that were not changed need an existence lookup
+    skipped = [u for u in usernames if u not in updated]
+    existing = await repo.existing_usernames(skipped) if skipped else set()
+
+    return BulkRoleChangeResult(
+        updated=[u for u in usernames if u in updated],
+        unchanged=[u for u in skipped if u in existing],
+        not_found=[u for u in skipped if u not in existing],
+    )
+
+
+async def list_users(db: AsyncSession, limit: int | None = None, after: int | None = None) -> UserPage:
+    repo = AsyncUserRepository(db)
+
+    # Fetch one keyset page (or all users when no limit is given)
+    rows = await repo.list_users(limit=limit, after_id=after)
+    next_cursor = rows[-1].id if limit is not None and len(rows) == limit else None
+    return UserPage(
+        items=[UserOut(username=u.username, is_admin=u.is_admin) for u in rows],
+        next_cursor=next_cursor,
+    )
+
+
+async def stream_users(db: AsyncSession) -> AsyncIterator[bytes]:
+    """
+    Async counterpart of user_service.stream_users.
+    """
+    repo = AsyncUserRepository(db)
+
+    yield b"["
+    separator = b""
+    chunk: list[dict] = []
+    async for u in repo.iter_users(batch_size=USERS_STREAM_BATCH_SIZE):
+        chunk.append({"username": u.username, "is_admin": u.is_admin})
+        if len(chunk) >= USERS_STREAM_BATCH_SIZE:
+            # One encode per batch; [1:-1] drops the list's brackets
+            yield separator + encode_json(chunk)[1:-1]
+            separator, chunk = b",", []
+    if chunk:
+        yield separator + encode_json(chunk)[1:-1]
+    yield b"]"
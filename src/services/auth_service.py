@@ -14,8 +14,7 @@ def login(db: Session, username: str, password: str) -> TokenResponse:
     # Fetch user record from DB by username
     db_user = repo.get_by_username(username)
 
-    # Login check
-    if db_user is None or not verify_password(password, db_user.password):
+    if db_user is None:
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
     # Payload
@@ -23,6 +22,15 @@ def login(db: Session, username: str, password: str) -> TokenResponse:
         "sub": db_user.username,
         "is_admin": db_user.is_admin
     }
+    password_hash = db_user.password
+
+    # End the read transaction so the pooled DB connection is not held
+    # during the slow bcrypt check
+    db.rollback()
+
+    # Login check
+    if not verify_password(password, password_hash):
+        raise HTTPException(status_code=401, detail="Invalid username or password")
 
     # Create JWT
     token = create_access_token(
@@ -0,0 +1,168 @@
+import csv
+import json
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from core.config import BULK_IMPORT_BATCH_SIZE
+from core.security import hash_passwords, is_password_hash
+from repositories.user_repository import UserRepository
+from schemas.user_schema import UserImportRow, UserImportRowResult, UserImportReport
+
+# Supported upload formats (by Content-Type)
+NDJSON = "ndjson"
+CSV = "csv"
+_CONTENT_TYPES = {
+    "application/x-ndjson": NDJSON,
+    "application/ndjson": NDJSON,
+    "application/jsonl": NDJSON,
+    "text/csv": CSV,
+}
+
+
+def format_from_content_type(content_type: str | None) -> str:
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type not in _CONTENT_TYPES:
+        raise HTTPException(
+            status_code=415,
+            detail="Send the import as application/x-ndjson or text/csv",
+        )
+    return _CONTENT_TYPES[media_type]
+
+
+def _decode(raw: bytes) -> str | None:
+    """The text of one line, None if it is not valid UTF-8."""
+    try:
+        return raw.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError:
+        return None
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, str | None]]:
+    """Split the streamed body into (line number, text) without buffering it all."""
+    buffer = b""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            line_no += 1
+            yield line_no, _decode(raw)
+    if buffer:
+        yield line_no + 1, _decode(buffer)
+
+
+async def _iter_rows(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[tuple[int, dict | str]]:
+    """
+    Yield (line number, row dict) or (line number, error message).
+    CSV needs a header line (username,password[,password_hash][,is_admin]);
+    quoted fields spanning several lines are not supported.
+    """
+    header: list[str] | None = None
+    async for line_no, text in _iter_lines(chunks):
+        if text is None:
+            yield line_no, "Invalid UTF-8"
+            continue
+        if not text.strip():
+            continue
+
+        if fmt == NDJSON:
+            try:
+                row = json.loads(text)
+            except json.JSONDecodeError as e:
+                yield line_no, f"Invalid JSON: {e.msg}"
+                continue
+            yield line_no, row if isinstance(row, dict) else "Expected a JSON object"
+            continue
+
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [h.strip() for h in values]
+            if "username" not in header:
+                raise HTTPException(status_code=400, detail="CSV header must contain 'username'")
+            continue
+        # Empty CSV cells mean "not provided"
+        yield line_no, {k: v for k, v in zip(header, values) if v != ""}
+
+
+def _import_batch(db: Session, batch: list[tuple[int, dict]], seen: set[str]) -> list[UserImportRowResult]:
+    """Validate, hash (in parallel) and insert one batch. Runs on the threadpool."""
+    results: dict[int, UserImportRowResult] = {}
+    valid: list[tuple[int, UserImportRow]] = []
+
+    for line_no, raw in batch:
+        try:
+            row = UserImportRow.model_validate(raw)
+            if (row.password is None) == (row.password_hash is None):
+                raise ValueError("Provide exactly one of 'password' or 'password_hash'")
+            if row.password_hash is not None and not is_password_hash(row.password_hash):
+                raise ValueError("'password_hash' is not a bcrypt hash")
+        except (ValidationError, ValueError) as e:
+            error = e.errors()[0]["msg"] if isinstance(e, ValidationError) else str(e)
+            # Echo the username only when it is one (e.g. not {"username": 123})
+            username = raw.get("username")
+            results[line_no] = UserImportRowResult(
+                line=line_no, username=username if isinstance(username, str) else None,
+                status="invalid", error=error,
+            )
+            continue
+
+        if row.username in seen:
+            results[line_no] = UserImportRowResult(line=line_no, username=row.username, status="duplicate")
+            continue
+        seen.add(row.username)
+        valid.append((line_no, row))
+
+    # Hash the plain passwords of the batch in parallel on the hashing pool
+    to_hash = [row for _, row in valid if row.password is not None]
+    for row, hashed in zip(to_hash, hash_passwords([row.password for row in to_hash])):
+        row.password_hash = hashed
+
+    created = UserRepository(db).bulk_create_users([
+        {"username": row.username, "password": row.password_hash, "is_admin": row.is_admin}
+        for _, row in valid
+    ])
+    for line_no, row in valid:
+        status = "created" if row.username in created else "exists"
+        results[line_no] = UserImportRowResult(line=line_no, username=row.username, status=status)
+
+    return [results[line_no] for line_no, _ in batch]
+
+
+async def import_users(db: Session, chunks: AsyncIterator[bytes], fmt: str) -> UserImportReport:
+    """
+    Stream-parse the upload and import it in batches of BULK_IMPORT_BATCH_SIZE:
+    one hashing fan-out and one INSERT/COPY round trip per batch.
+    """
+    report = UserImportReport()
+    seen: set[str] = set()
+    batch: list[tuple[int, dict]] = []
+
+    async def flush():
+        report.rows.extend(await run_in_threadpool(_import_batch, db, batch, seen))
+        batch.clear()
+
+    async for line_no, row in _iter_rows(chunks, fmt):
+        if isinstance(row, str):
+            report.rows.append(UserImportRowResult(line=line_no, status="invalid", error=row))
+            continue
+        batch.append((line_no, row))
+        if len(batch) >= BULK_IMPORT_BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+
+    report.rows.sort(key=lambda result: result.line)
+    for result in report.rows:
+        if result.status == "created":
+            report.created += 1
+        elif result.status == "exists":
+            report.existing += 1
+        elif result.status == "duplicate":
+            report.duplicates += 1
+        else:
+            report.invalid += 1
+    return report
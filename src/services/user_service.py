@@ -1,21 +1,25 @@
+from typing import Iterator
+
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
+from core.encoding import JSON, compress, dump_models, encode_json, encode_records
 from core.security import get_password_hash
-from core.config import ADMIN_SECRET
+from core.config import ADMIN_SECRET, USERS_STREAM_BATCH_SIZE
 from repositories.user_repository import UserRepository 
-from schemas.user_schema import RegisterRequest, UserOut
+from schemas.user_schema import BulkRoleChangeResult, RegisterRequest, UserOut, UserPage
 
 
 def register_user(db: Session, data: RegisterRequest) -> UserOut:
     # אתחול ה-Repository עם החיבור לדאטה-בייס
     repo = UserRepository(db)
 
-    # Check if username already exists
-    # שימוש במחלקה: repo.get_by_username
-    existing = repo.get_by_username(data.username)
-    if existing:
+    # Cheap existence check first (same 400-before-403 order as always): a
+    # taken username must not cost a bcrypt hash on the bounded hashing pool
+    if repo.existing_usernames([data.username]):
         raise HTTPException(status_code=400, detail="Username already exists")
+    # End the read transaction: no pooled connection is held during the hash
+    db.rollback()
 
     # Determine if new user should be admin
     is_admin = False
@@ -29,8 +33,11 @@ def register_user(db: Session, data: RegisterRequest) -> UserOut:
     # Hash the password
     hashed_password = get_password_hash(data.password)
 
-    # Create user in the database
+    # Create user in the database: INSERT ... ON CONFLICT DO NOTHING covers a
+    # concurrent registration of the same username since the check above
     new_user = repo.create_user(data.username, hashed_password, is_admin)
+    if new_user is None:
+        raise HTTPException(status_code=400, detail="Username already exists")
 
     return UserOut(username=new_user.username, is_admin=new_user.is_admin)
 
@@ -39,28 +46,77 @@ def update_admin_status(db: Session, username: str, make_admin: bool) -> UserOut
     """
     Unified function to promote or demote a user.
     """
-    repo = UserRepository(db) 
+    repo = UserRepository(db)
+
+    # 1. Update status (one UPDATE ... RETURNING; only changes a different role)
+    user = repo.set_admin(username, make_admin)
+    if user is not None:
+        return UserOut(username=user.username, is_admin=user.is_admin)
 
-    # 1. Find user
-    user = repo.get_by_username(username)
-    if not user:
+    # 2. Nothing changed: tell "unknown user" from "already has that role"
+    if not repo.existing_usernames([username]):
         raise HTTPException(status_code=404, detail="User not found")
+    status_str = "an admin" if make_admin else "a regular user"
+    raise HTTPException(status_code=400, detail=f"User is already {status_str}")
 
-    # 2. Check logic
-    if user.is_admin == make_admin:
-        status_str = "an admin" if make_admin else "a regular user"
-        raise HTTPException(status_code=400, detail=f"User is already {status_str}")
 
-    # 3. Update status
-    user = repo.set_admin(username, make_admin)
-    return UserOut(username=user.username, is_admin=user.is_admin)
+def update_admin_status_bulk(db: Session, usernames: list[str], make_admin: bool) -> BulkRoleChangeResult:
+    """
+    Promote or demote many users with one UPDATE statement.
+    """
+    repo = UserRepository(db)
+    usernames = list(dict.fromkeys(usernames))  # dedupe, keep order
+
+    updated = {row.username for row in repo.set_admin_many(usernames, make_admin)}
+    # Only the usernames that were not changed need an existence lookup
+    skipped = [u for u in usernames if u not in updated]
+    existing = repo.existing_usernames(skipped) if skipped else set()
 
+    return BulkRoleChangeResult(
+        updated=[u for u in usernames if u in updated],
+        unchanged=[u for u in skipped if u in existing],
+        not_found=[u for u in skipped if u not in existing],
+    )
 
-def list_users(db: Session) -> list[UserOut]:
+
+def list_users(db: Session, limit: int | None = None, after: int | None = None) -> UserPage:
+    repo = UserRepository(db)
+
+    # Fetch one keyset page (or all users when no limit is given)
+    rows = repo.list_users(limit=limit, after_id=after)
+    next_cursor = rows[-1].id if limit is not None and len(rows) == limit else None
+    return UserPage(
+        items=[UserOut(username=u.username, is_admin=u.is_admin) for u in rows],
+        next_cursor=next_cursor,
+    )
+
+
+def encode_users(users: list[UserOut], media_type: str = JSON, encoding: str | None = None) -> tuple[bytes, str | None]:
+    """(body, Content-Encoding) of a GET /users list in the negotiated format."""
+    if media_type == JSON:
+        body = dump_models(users)
+    else:
+        records = [{"username": u.username, "is_admin": u.is_admin} for u in users]
+        body = encode_records(records, media_type, {"username": "string", "is_admin": "bool_"})
+    return compress(body, encoding)
+
+
+def stream_users(db: Session) -> Iterator[bytes]:
+    """
+    Yield GET /users as a JSON array, chunk by chunk, straight from a
+    server-side cursor (the full list is never built in memory).
+    """
     repo = UserRepository(db)
-    
-    # Fetch all users
-    return [
-        UserOut(username=u.username, is_admin=u.is_admin)
-        for u in repo.list_users()
-    ]
\ No newline at end of file
+
+    yield b"["
+    separator = b""
+    chunk: list[dict] = []
+    for u in repo.iter_users(batch_size=USERS_STREAM_BATCH_SIZE):
+        chunk.append({"username": u.username, "is_admin": u.is_admin})
+        if len(chunk) >= USERS_STREAM_BATCH_SIZE:
+            # One encode per batch; [1:-1] drops the list's brackets
+            yield separator + encode_json(chunk)[1:-1]
+            separator, chunk = b",", []
+    if chunk:
+        yield separator + encode_json(chunk)[1:-1]
+    yield b"]"
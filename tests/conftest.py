@@ -0,0 +1,41 @@
+# tests/conftest.py
+"""
+Shared setup for the tests in this folder.
+
+Like the benchmarks, the tests import the app from src/ directly and use a
+throwaway SQLite database, so neither a server nor Postgres is required:
+
+    pip install -r tests/requirements.txt
+    python -m pytest tests
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must happen before anything from src/ is imported (database.py reads it at import time)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client) -> dict:
+    from core.config import ADMIN_SECRET
+
+    client.post("/users", json={"username": "test-admin", "password": "test-pass", "admin_secret": ADMIN_SECRET})
+    r = client.post("/login", data={"username": "test-admin", "password": "test-pass"})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
@@ -0,0 +1,28 @@
+# tests/test_admission.py
+import asyncio
+
+from core import admission
+from core.admission import ClassLimiter
+
+
+def test_slot_handed_over_as_the_queue_timeout_fires(monkeypatch):
+    async def scenario():
+        limiter = ClassLimiter("test", limit=1, max_queue=10, queue_timeout=1.0, target_wait=10.0)
+        assert await limiter.acquire() is None  # the holder
+
+        async def wait_for(fut, timeout):
+            # Python 3.12's wait_for, with release() and the timeout callback
+            # both ready in the same loop iteration (release() runs first)
+            asyncio.get_running_loop().call_soon(limiter.release)
+            async with asyncio.timeout(0):
+                return await fut
+
+        monkeypatch.setattr(admission.asyncio, "wait_for", wait_for)
+        assert await limiter.acquire() is None  # the slot released to it is taken, not lost
+        assert limiter.in_flight == 1
+        assert limiter.rejected["timeout"] == 0
+
+        limiter.release()
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,20 @@
+# tests/test_conditional.py
+from core.conditional import none_match
+
+
+def test_if_none_match_uses_weak_comparison():
+    assert none_match('W/"abc.3"', '"abc.3"')
+    assert none_match('"abc.2", W/"abc.3"', '"abc.3"')
+
+
+def test_if_match_with_the_current_strong_tag_writes(client, admin_headers):
+    etag = client.get("/array", headers=admin_headers).headers["ETag"]
+    r = client.put("/array/0", json={"value": 1}, headers={**admin_headers, "If-Match": etag})
+    assert r.status_code == 200
+
+
+def test_if_match_with_a_weak_tag_is_412(client, admin_headers):
+    etag = client.get("/array", headers=admin_headers).headers["ETag"]
+    r = client.put("/array/0", json={"value": 2}, headers={**admin_headers, "If-Match": f"W/{etag}"})
+    assert r.status_code == 412
+    assert client.get("/array", headers=admin_headers).headers["ETag"] == etag  # nothing was written
@@ -0,0 +1,62 @@
+# tests/test_profiling.py
+import asyncio
+
+import pytest
+
+from core import profiling
+from core.profiling import ProfilingMiddleware
+from core.security import create_access_token
+
+
+class RecordingSampler:
+    started = 0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def start(self, duration=None):
+        RecordingSampler.started += 1
+
+    def stop(self) -> str:
+        return ""
+
+
+async def ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def run(authorization: str | None) -> int:
+    headers = [(b"x-profile", b"1")]
+    if authorization is not None:
+        headers.append((b"authorization", authorization.encode()))
+    scope = {"type": "http", "method": "GET", "path": "/livez", "query_string": b"", "headers": headers}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    RecordingSampler.started = 0
+    asyncio.run(ProfilingMiddleware(ok)(scope, receive, send))
+    return RecordingSampler.started
+
+
+@pytest.fixture(autouse=True)
+def recording_sampler(monkeypatch):
+    monkeypatch.setattr(profiling, "StackSampler", RecordingSampler)
+
+
+@pytest.mark.parametrize("authorization", [
+    None,
+    "x",
+    "Bearer not-a-jwt",
+    "Bearer " + create_access_token({"sub": "bob", "is_admin": False}),
+])
+def test_non_admin_requests_are_not_sampled(authorization):
+    assert run(authorization) == 0
+
+
+def test_admin_token_starts_the_sampler():
+    assert run("Bearer " + create_access_token({"sub": "admin", "is_admin": True})) == 1